@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'KoreanCosmetics.settings')
 
-application = get_asgi_application()
+
+class StorefrontASGIHandler(ASGIHandler):
+    """
+    Как get_asgi_application(), только запросы разрешаются по
+    settings.ASGI_URLCONF: горячие GET витрины идут в async-вьюхи
+    (main/async_views.py) и не занимают поток на всё время запроса.
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = getattr(settings, 'ASGI_URLCONF', settings.ROOT_URLCONF)
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = StorefrontASGIHandler()
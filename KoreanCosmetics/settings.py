@@ -10,10 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
-from pathlib import Path
-from pickle import APPEND
-from unittest.mock import DEFAULT
 import os
+from pathlib import Path
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,7 +36,10 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     'rest_framework',
-    'django.contrib.admin',
+    # admin.py подхватывается в urls.py (admin.autodiscover), а не при django.setup():
+    # management-командам и воркерам без URLconf админка не нужна;
+    # системные проверки подхватывают её сами (main.apps.check_admin_app)
+    'main.apps.StorefrontAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -46,18 +48,99 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.locale.LocaleMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.PerformanceMiddleware',
+    # CORS — как можно выше: заголовки нужны и редиректам CommonMiddleware, и 403 от CSRF
     'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware'
+    # main.middleware.* — те же мидлвари Django, только под ASGI без перехода в поток;
+    # Session/Authentication/Message вдобавок пропускают STATELESS_PATHS
+    'main.middleware.SecurityMiddleware',
+    'main.middleware.SessionMiddleware',
+    'main.middleware.CommonMiddleware',
+    'main.middleware.LocaleMiddleware',
+    # сразу после Locale: ключ кэша — уже нормализованный язык запроса
+    'main.middleware.ResponseCacheMiddleware',
+    'main.middleware.CsrfViewMiddleware',
+    'main.middleware.AuthenticationMiddleware',
+    'main.middleware.MessageMiddleware',
+    'main.middleware.XFrameOptionsMiddleware',
 ]
 
+# GET/HEAD на эти пути обходятся без сессии, пользователя (всегда аноним) и сообщений:
+# витрина одинакова для всех. Вьюхи здесь не должны смотреть на request.user/session.
+STATELESS_PATHS = (
+    '/api/products/',
+    '/api/categories/',
+    '/api/brands/',
+    '/api/news/',
+    '/api/home/',
+    '/api/feeds/',
+)
+
+# Общий кэш JSON-ответов STATELESS_PATHS по (версии каталога, языку из LANGUAGES, URL без ?lang=)
+RESPONSE_CACHE = True
+RESPONSE_CACHE_MAX_AGE = 60          # сек, Cache-Control: public, max-age для прокси/CDN
+RESPONSE_CACHE_MAX_SIZE = 1_000_000  # байт, ответы больше не кладём в кэш
+
+# Метрики запросов (Server-Timing + гистограммы по маршрутам, см. /api/perf/)
+PERF_INSTRUMENTATION = True
+PERF_SERVER_TIMING = True
+
+# Детектор медленных запросов и N+1 (JSONL-лог, сводка: manage.py perf_query_report)
+PERF_QUERY_INSPECTOR = True
+PERF_SLOW_QUERY_MS = 100
+PERF_DUPLICATE_QUERY_THRESHOLD = 5
+PERF_QUERY_LOG = BASE_DIR / 'perf_queries.jsonl'
+
+# Кэш витрины: ключи включают версию каталога (main/caching.py)
+CATALOG_VERSION_TTL = 5          # сек, сколько воркер доверяет закэшированной версии
+CATALOG_CACHE_TIMEOUT = 300
+HOME_PRODUCTS_LIMIT = 8
+HOME_NEWS_LIMIT = 5
+PRODUCT_BATCH_MAX = 200          # id за один /api/products/batch/
+NEWS_ARCHIVE_PAGE_SIZE = 20      # /api/news/archive/, keyset-пагинация
+ADMIN_EXACT_COUNT_LIMIT = 10_000  # дальше счётчик строк в админке — оценка
+AUTOCOMPLETE_LIMIT = 10          # подсказок на /api/products/autocomplete/ (limit — до 5×)
+PRODUCT_CHANGES_OVERLAP = 5      # сек, на сколько новый токен /api/products/changes/ отстаёт от «сейчас»
+PRODUCT_TOMBSTONE_DAYS = 90      # столько помним удалённые товары; токен старше → полная синхронизация
+CATALOG_INDEX = False            # /api/products/ из индекса в памяти процесса (main/catalog_index.py)
+
+# Фиды товаров для маркетплейсов (manage.py export_feeds, /api/feeds/<lang>.<fmt>)
+FEED_DIR = BASE_DIR / 'feeds'
+FEED_BASE_URL = ''                # напр. https://shop.example.uz — для абсолютных ссылок
+
+# Бюджет импорта на холодном старте, мс (manage.py import_profile --target ...)
+IMPORT_TIME_BUDGET_MS = {
+    'setup': 300,   # manage.py-команды без системных проверок
+    'wsgi': 450,    # web-воркер до первого ответа
+    'asgi': 450,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'raw': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'perf_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PERF_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'raw',
+        },
+    },
+    'loggers': {
+        'main.perf.queries': {
+            'handlers': ['perf_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Разрешаем CSRF-мидлвари запросы с вашего ngrok-доменa:
 CSRF_TRUSTED_ORIGINS = [
@@ -102,6 +185,8 @@ CORS_ALLOW_ALL_ORIGINS = True
 APPEND_SLASH = True
 
 ROOT_URLCONF = 'KoreanCosmetics.urls'
+# под ASGI (asgi.py) горячие GET витрины обслуживают async-вьюхи, остальное — ROOT_URLCONF
+ASGI_URLCONF = 'KoreanCosmetics.urls_asgi'
 
 TEMPLATES = [
     {
@@ -124,10 +209,25 @@ WSGI_APPLICATION = 'KoreanCosmetics.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Режим SQLite для нескольких воркеров в деплое (DJANGO_SQLITE_CONCURRENT=1):
+# WAL — чтение не ждёт записи; IMMEDIATE — пишущая транзакция берёт блокировку
+# сразу на BEGIN, а не падает с "database is locked" посреди резервирования
+# остатков. По умолчанию выключен: journal_mode=WAL переписывает заголовок
+# файла базы на любом подключении, а db.sqlite3 лежит в репозитории.
+SQLITE_CONCURRENT = os.environ.get('DJANGO_SQLITE_CONCURRENT') == '1'
+SQLITE_CONCURRENT_OPTIONS = {
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            **(SQLITE_CONCURRENT_OPTIONS if SQLITE_CONCURRENT else {}),
+        },
     }
 }
 
@@ -162,9 +262,6 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
-from pathlib import Path
-
-BASE_DIR = Path(__file__).resolve().parent.parent
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
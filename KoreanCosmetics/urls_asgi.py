@@ -0,0 +1,14 @@
+# KoreanCosmetics/urls_asgi.py
+"""
+URLconf ASGI-воркера (см. asgi.py): товары, категории, новости и уведомления
+отдают нативные async-вьюхи из main/async_urls.py, все остальные маршруты —
+те же, что и под WSGI.
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path("api/", include("main.async_urls")),
+    *wsgi_urlpatterns,
+]
@@ -1,32 +1,107 @@
 # main/admin.py
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count, Max, Min, Q
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from .models import Category, Product, Profile, Order, Notification, News
+from . import exports, search
+from .caching import cached_catalog
+from .models import (
+    Brand, Category, Product, Profile, Order, Notification, News,
+    DailyCategorySales, DailyPaymentSales, DailyProductSales,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    COUNT(*) по большой таблице на каждой странице админки дорог.
+    Считаем честно до ADMIN_EXACT_COUNT_LIMIT строк; дальше — без фильтров
+    берём оценку (статистика PostgreSQL или диапазон pk в SQLite),
+    с фильтрами — останавливаемся на пороге.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, "ADMIN_EXACT_COUNT_LIMIT", 10_000)
+        queryset = self.object_list
+        capped = queryset[:limit + 1].count()
+        if capped <= limit:
+            return capped
+        if queryset.query.where:
+            return limit
+        return max(self._estimate(queryset), capped)
+
+    def _estimate(self, queryset):
+        model = queryset.model
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+        # MIN/MAX по первичному ключу — два шага по индексу; дыры в id завышают оценку
+        bounds = model._default_manager.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["high"] is None:
+            return 0
+        return bounds["high"] - bounds["low"] + 1
+
+
+class BrandFilter(admin.SimpleListFilter):
+    """Бренды из справочника (через кэш витрины); фильтр — по индексу brand_ref_id."""
+    title = "brand"
+    parameter_name = "brand"
+
+    def lookups(self, request, model_admin):
+        brands = cached_catalog(("admin-brands",), lambda: list(
+            Brand.objects.order_by("name").values_list("name", flat=True)
+        ))
+        return [(brand, brand) for brand in brands]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(brand_ref__in=Brand.objects.filter(slug=Brand.key(self.value())).values("pk"))
+        return queryset
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name')
+    list_display = ('id', 'name', 'product_count', 'min_price', 'max_price')
     search_fields = ('name',)
 
 
+@admin.register(Brand)
+class BrandAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug', 'product_count')
+    search_fields = ('name', 'slug')
+    readonly_fields = ('product_count',)
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     # ---------- список объектов ----------
     list_display  = (
         "id", "title", "brand", "category",
-        "price", "available", "thumb",
+        "price", "stock", "available", "thumb",
     )
-    list_filter   = ("available", "category", "brand")
+    list_filter   = ("available", "category", BrandFilter)
     search_fields = ("title", "brand")
+    list_select_related = ("category",)
+    # на 100k товаров точный счётчик не нужен — см. EstimatedCountPaginator
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # ---------- только для формы ----------
     readonly_fields = ("thumb", "category_slug")
 
     # ---------- расположение блоков ----------
     fieldsets = (
-        ('Основное', {'fields': ('title', 'brand', 'category', ('price', 'available'))}),
+        ('Основное', {'fields': ('title', 'brand', 'category', ('price', 'stock', 'available'))}),
         ('Картинки', {'fields': ('img', 'big_img', 'thumb')}),
         ('Короткие описания', {  # ⚠️ шесть отдельных полей
             'fields': (('desc_ru', 'desc_uz', 'desc_en'),)
@@ -39,17 +114,18 @@ class ProductAdmin(admin.ModelAdmin):
     # ---------- превью картинки ----------
     def thumb(self, obj):
         """
-        Показывает мини-картинку, если img – FileField.
-        Если там просто строка (путь или имя), выводит её текстом,
-        чтобы список товаров хотя бы открылся.
+        Мини-картинка: готовое превью (img_thumb), если оно уже есть,
+        иначе оригинал. Если в img просто строка (путь или имя) —
+        выводит её текстом, чтобы список товаров хотя бы открылся.
         """
-        if obj.img:
+        image = obj.img_thumb or obj.img
+        if image:
             # вариант «нормального» Image/FileField
-            if hasattr(obj.img, "url"):
-                return format_html('<img src="{}" style="height:60px;" />', obj.img.url)
+            if hasattr(image, "url"):
+                return format_html('<img src="{}" style="height:60px;" loading="lazy" />', image.url)
 
             # вариант импортированной строки
-            return obj.img  # будет показан текстом
+            return image  # будет показан текстом
 
         return "—"
 
@@ -58,6 +134,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display  = ("id", "user_display", "name", "surname", "phone", "address")
+    list_select_related = ("user",)
     search_fields = ("user__username", "name", "surname", "phone", "email", "address")
 
     @admin.display(description="User", ordering="user__username")
@@ -85,7 +162,9 @@ class OrderAdmin(admin.ModelAdmin):
         'created_at',
         'all_read',
     )
-    list_filter = ('payment_method',)
+    list_filter = ('payment_method', 'created_at')
+    actions = ('export_csv', 'export_jsonl')
+    # на SQLite ищем по FTS5-индексу (get_search_results), здесь — запасной вариант
     search_fields = ('user__username', 'user__profile__name', 'items')
     readonly_fields = (
         'get_customer_firstname',
@@ -106,6 +185,34 @@ class OrderAdmin(admin.ModelAdmin):
         'created_at',
     )
     inlines = (NotificationInline,)
+    # профиль покупателя — в том же запросе, что и заказы
+    list_select_related = ('user__profile',)
+
+    def get_queryset(self, request):
+        # непрочитанные уведомления считаем одним подзапросом, а не exists() на строку
+        return super().get_queryset(request).annotate(
+            unread_notifications=Count('notifications', filter=Q(notifications__is_read=False))
+        )
+
+    # ---------- выгрузка (main/exports.py) ----------
+    def _export(self, queryset, fmt):
+        # queryset админки с аннотацией/GROUP BY — выгружаем по id, построчно
+        orders = Order.objects.filter(pk__in=queryset.values('pk'))
+        return exports.streaming_response(orders, fmt)
+
+    @admin.action(description="Выгрузить в CSV (по позициям)")
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+
+    @admin.action(description="Выгрузить в JSONL (по позициям)")
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl')
+
+    def get_search_results(self, request, queryset, search_term):
+        expression = search.match_expression(search_term)
+        if expression is None or not search.available():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=search.matching_orders(expression)), False
 
     # Имя клиента (для формы)
     def get_customer_firstname(self, obj):
@@ -174,8 +281,12 @@ class OrderAdmin(admin.ModelAdmin):
     get_customer_name.short_description = "Клиент"
 
     def all_read(self, obj):
-        return not obj.notifications.filter(is_read=False).exists()
+        unread = getattr(obj, 'unread_notifications', None)
+        if unread is None:
+            return not obj.notifications.filter(is_read=False).exists()
+        return not unread
     all_read.boolean = True
+    all_read.admin_order_field = 'unread_notifications'
     all_read.short_description = 'Прочитано'
 
 @admin.register(News)
@@ -209,4 +320,37 @@ class NewsAdmin(admin.ModelAdmin):
             "classes": ("collapse",),
         }),
     )
-    readonly_fields = ("created_at",)
\ No newline at end of file
+    readonly_fields = ("created_at",)
+
+
+class SalesRollupAdmin(admin.ModelAdmin):
+    """Итоги продаж только читаются — их ведут сигналы и rebuild_sales_rollups."""
+    date_hierarchy = "day"
+    list_per_page = 90
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyPaymentSales)
+class DailyPaymentSalesAdmin(SalesRollupAdmin):
+    list_display = ("day", "payment_method", "orders", "units", "revenue")
+    list_filter = ("payment_method",)
+
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(SalesRollupAdmin):
+    list_display = ("day", "category_id", "orders", "units", "revenue")
+    list_filter = ("category_id",)
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(SalesRollupAdmin):
+    list_display = ("day", "product_id", "orders", "units", "revenue")
+    search_fields = ("=product_id",)
@@ -1,5 +1,10 @@
 # main/apps.py
 from django.apps import AppConfig
+from django.contrib import admin
+from django.contrib.admin import checks as admin_checks
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.core import checks
+
 
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
@@ -9,8 +14,16 @@ class MainConfig(AppConfig):
         from . import signals            # noqa
 
 
-class MainConfig(AppConfig):
-    name = "main"
+def check_admin_app(app_configs, **kwargs):
+    # admin.py подхватываются из URLconf, а проверки идут и без него —
+    # без autodiscover здесь проверялся бы пустой реестр
+    admin.autodiscover()
+    return admin_checks.check_admin_app(app_configs, **kwargs)
+
+
+class StorefrontAdminConfig(SimpleAdminConfig):
+    """Админка без autodiscover при django.setup(), но с проверками всех ModelAdmin."""
 
     def ready(self):
-        import main.signals
\ No newline at end of file
+        checks.register(admin_checks.check_dependencies, checks.Tags.admin)
+        checks.register(check_admin_app, checks.Tags.admin)
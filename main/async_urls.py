@@ -0,0 +1,20 @@
+# main/async_urls.py
+"""
+Маршруты async-вьюх (подключаются только в KoreanCosmetics/urls_asgi.py).
+Имена — как у DefaultRouter в main/urls.py: reverse() и метрики /api/perf/
+не зависят от того, какой воркер ответил. pk — только числа, чтобы
+products/autocomplete/ и прочие action-ы доходили до вьюсета.
+"""
+from django.urls import path, re_path
+
+from . import async_views
+
+urlpatterns = [
+    path('products/', async_views.product_list, name='product-list'),
+    path('products/<int:pk>/', async_views.product_detail, name='product-detail'),
+    path('categories/', async_views.category_list, name='category-list'),
+    re_path(r'^categories/(?P<slug>[^/.]+)/$', async_views.category_detail, name='category-detail'),
+    path('news/', async_views.news_list, name='news-list'),
+    path('news/<int:pk>/', async_views.news_detail, name='news-detail'),
+    path('notifications/', async_views.notifications_list, name='api_notifications_list'),
+]
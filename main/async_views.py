@@ -0,0 +1,125 @@
+# main/async_views.py
+"""
+Нативные async-версии горячих GET витрины для ASGI-воркера
+(KoreanCosmetics/urls_asgi.py): список и карточка товара, категории,
+новости, уведомления.
+
+DRF не умеет async, поэтому вьюсет здесь — только «справочник»: из него
+берём queryset, фильтры, сортировку и сериализатор (всё ленивое, без SQL),
+а сам запрос к базе идёт через async ORM (async for / aget). Поток asgiref
+занимается только на время SQL, а не на весь запрос; ответ байт в байт
+тот же, что у синхронного вьюсета.
+
+Всё, что не «GET с JSON-ответом» (OPTIONS, browsable API, ?format=,
+пагинация), отдаётся синхронному вьюсету через sync_to_async.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_http_methods
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import catalog_index
+from .i18n import request_language
+from .models import Notification
+from .views import CategoryViewSet, NewsViewSet, ProductViewSet, notification_data
+
+_renderer = JSONRenderer()
+
+
+def _viewset(viewset_class, request, action, kwargs):
+    """Экземпляр вьюсета без dispatch: аутентификации и SQL нет."""
+    view = viewset_class(action=action, args=(), kwargs=kwargs, format_kwarg=None)
+    # как в ViewSetMixin.as_view: от привязки методов зависит заголовок Allow
+    view.action_map = {"get": action, "head": action}
+    for method, name in view.action_map.items():
+        setattr(view, method, getattr(view, name))
+    view.request = Request(request)
+    return view
+
+
+def _is_json(view):
+    if view.paginator is not None and view.paginator.get_page_size(view.request):
+        return False
+    try:
+        renderer, _ = view.perform_content_negotiation(view.request)
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+def _json(view, data, status=200):
+    # те же байты и заголовки, что у Response вьюсета с JSONRenderer
+    response = HttpResponse(_renderer.render(data), status=status, content_type="application/json")
+    response["Allow"] = ", ".join(view.allowed_methods)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def _async_viewset(viewset_class, action, handler):
+    sync_view = sync_to_async(viewset_class.as_view({"get": action}))
+
+    async def view(request, **kwargs):
+        viewset = _viewset(viewset_class, request, action, kwargs)
+        if request.method != "GET" or not _is_json(viewset):
+            return await sync_view(request, **kwargs)
+        return await handler(viewset)
+
+    view.__name__ = f"{viewset_class.__name__}.{action}"
+    view.csrf_exempt = True
+    return view
+
+
+async def _list(view):
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+    except ValidationError as exc:
+        return _json(view, exc.detail, status=400)
+    objects = [obj async for obj in queryset]
+    return _json(view, view.get_serializer(objects, many=True).data)
+
+
+async def _retrieve(view):
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+    except ValidationError as exc:
+        return _json(view, exc.detail, status=400)
+    lookup = view.kwargs[view.lookup_url_kwarg or view.lookup_field]
+    model = queryset.model
+    try:
+        obj = await queryset.aget(**{view.lookup_field: lookup})
+    except model.DoesNotExist:
+        return _json(view, {"detail": f"No {model._meta.object_name} matches the given query."}, status=404)
+    return _json(view, view.get_serializer(obj).data)
+
+
+async def _product_list(view):
+    params = view.request.query_params
+    if not catalog_index.enabled() or not catalog_index.CatalogIndex.supports(params):
+        return await _list(view)
+    index = await catalog_index.aget_index()
+    lang = request_language(view.request)
+    if lang not in index.full_descriptions:
+        # описания на этом языке ещё не читали — это SQL
+        await sync_to_async(index.descriptions)(lang)
+    return _json(view, index.render(index.select(params), lang, view.request))
+
+
+product_list = _async_viewset(ProductViewSet, "list", _product_list)
+product_detail = _async_viewset(ProductViewSet, "retrieve", _retrieve)
+category_list = _async_viewset(CategoryViewSet, "list", _list)
+category_detail = _async_viewset(CategoryViewSet, "retrieve", _retrieve)
+news_list = _async_viewset(NewsViewSet, "list", _list)
+news_detail = _async_viewset(NewsViewSet, "retrieve", _retrieve)
+
+
+@login_required
+@require_http_methods(["GET"])
+async def notifications_list(request):
+    """Async-двойник views.api_notifications_list."""
+    user = await request.auser()
+    data = [notification_data(n) async for n in Notification.objects.filter(order__user=user)]
+    return JsonResponse(data, safe=False)
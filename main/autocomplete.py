@@ -0,0 +1,332 @@
+# main/autocomplete.py
+"""
+Подсказки поиска по названию и бренду: /api/products/autocomplete/?q=
+
+Все слова title/brand приводятся к одной «латинской болванке» (normalize):
+кириллица транслитерируется, диакритика и апострофы узбекской латиницы
+убираются, близкие по звучанию буквы склеиваются (c/k/q, y/i, w/v…), так
+что «Периое», «perioe» и «PERIOE» — одно и то же слово.
+
+Словарь слов лежит в префиксном дереве (печатаемое слово — префикс) и в
+индексе триграмм (опечатка: префикса нет, ищем похожие слова). Каждое
+слово знает свои товары. Индекс живёт в памяти процесса, собирается при
+первом запросе и дальше правится по одному товару из сигналов Product;
+если версия каталога сдвинулась мимо сигналов (другой воркер, UPDATE без
+save), пересобирается целиком.
+"""
+import re
+import threading
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .caching import catalog_version
+from .models import Product
+
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+    # узбекская кириллица
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+# после транслитерации, по порядку: сначала диграфы, потом одиночные буквы
+FOLDS = (
+    ("ch", "ʧ"), ("kh", "h"), ("ph", "f"), ("ck", "k"),
+    ("c", "k"), ("q", "k"), ("x", "ks"), ("w", "v"), ("y", "i"),
+)
+APOSTROPHES = "'‘’ʻʼ`"
+_TRANSLATE = str.maketrans({**TRANSLIT, **dict.fromkeys(APOSTROPHES, "")})
+_WORD_RE = re.compile(r"\w+")
+_REPEATS_RE = re.compile(r"(.)\1+")
+
+FIELDS = ("id", "title", "brand", "category_slug", "price")
+MIN_FUZZY_LENGTH = 3
+EXPAND_WORDS = 64   # до стольких слов под префиксом токен раскрывается в множество id
+FUZZY_THRESHOLD = 0.35
+
+
+def normalize(text):
+    """Строка → список нормализованных слов."""
+    text = (text or "").lower().translate(_TRANSLATE)
+    if not text.isascii():
+        text = "".join(
+            char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+        )
+    return [_fold(word) for word in _WORD_RE.findall(text)]
+
+
+@lru_cache(maxsize=50_000)
+def _fold(word):
+    # слова в названиях повторяются — каждое складываем один раз
+    for old, new in FOLDS:
+        word = word.replace(old, new)
+    return _REPEATS_RE.sub(r"\1", word)
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    # count — сколько пар (слово, товар) под узлом: по нему выбирается ведущий токен
+    __slots__ = ("children", "terminal", "count")
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+        self.count = 0
+
+
+class _Entry:
+    __slots__ = ("id", "title", "brand", "category", "price", "words", "brand_words")
+
+    def __init__(self, pk, title, brand, category, price):
+        self.id, self.title, self.brand, self.category, self.price = pk, title, brand, category, price
+        self.brand_words = frozenset(normalize(brand))
+        self.words = frozenset(normalize(title)) | self.brand_words
+
+    @classmethod
+    def of(cls, product):
+        return cls(*(getattr(product, field) for field in FIELDS))
+
+    def as_dict(self):
+        return {
+            "id": self.id, "title": self.title, "brand": self.brand,
+            "category": self.category, "price": self.price,
+        }
+
+
+class AutocompleteIndex:
+    def __init__(self, version=None, products=()):
+        self.version = version
+        self.root = _Node()
+        self.word_products = {}     # слово → {id товара}
+        self.brand_products = {}    # то же, только где слово — из бренда
+        self.trigram_words = {}     # триграмма → {слово}
+        self.entries = {}           # id → _Entry
+        self.lock = threading.Lock()
+        for row in products:
+            self._add(_Entry(*row))
+
+    @classmethod
+    def build(cls, version):
+        rows = Product.objects.filter(available=True).order_by("id").values_list(*FIELDS)
+        return cls(version, rows.iterator(chunk_size=2000))
+
+    # ---------- правки ----------
+    def update(self, product):
+        """Товар сохранили: переиндексировать (или убрать, если снят с продажи)."""
+        with self.lock:
+            self._remove(product.pk)
+            if product.available:
+                self._add(_Entry.of(product))
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+
+    def _add(self, entry):
+        self.entries[entry.id] = entry
+        for word in entry.words:
+            ids = self.word_products.get(word)
+            if ids is None:
+                ids = self.word_products[word] = set()
+                self._insert_word(word)
+            ids.add(entry.id)
+            self._count(word, 1)
+        for word in entry.brand_words:
+            self.brand_products.setdefault(word, set()).add(entry.id)
+
+    def _remove(self, product_id):
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        for word in entry.brand_words:
+            ids = self.brand_products[word]
+            ids.discard(product_id)
+            if not ids:
+                del self.brand_products[word]
+        for word in entry.words:
+            ids = self.word_products[word]
+            ids.discard(product_id)
+            self._count(word, -1)
+            if not ids:
+                del self.word_products[word]
+                self._delete_word(word)
+
+    def _count(self, word, delta):
+        node = self.root
+        for char in word:
+            node = node.children[char]
+            node.count += delta
+
+    def _insert_word(self, word):
+        node = self.root
+        for char in word:
+            node = node.children.setdefault(char, _Node())
+        node.terminal = True
+        for gram in trigrams(word):
+            self.trigram_words.setdefault(gram, set()).add(word)
+
+    def _delete_word(self, word):
+        path = [self.root]
+        for char in word:
+            path.append(path[-1].children[char])
+        path[-1].terminal = False
+        # срезаем опустевшие ветки снизу вверх
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if node.terminal or node.children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+        for gram in trigrams(word):
+            words = self.trigram_words[gram]
+            words.discard(word)
+            if not words:
+                del self.trigram_words[gram]
+
+    # ---------- поиск ----------
+    def _node(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def _walk(prefix, node):
+        """Слова под узлом, короткие (ближе к введённому) первыми; лениво — поиск останавливается на limit."""
+        queue = deque([(prefix, node)])
+        while queue:
+            word, node = queue.popleft()
+            if node.terminal:
+                yield word
+            for char in sorted(node.children):
+                queue.append((word + char, node.children[char]))
+
+    def _similar(self, token):
+        """Слова, похожие на token по триграммам (коэффициент Жаккара), лучшие первыми."""
+        grams = trigrams(token)
+        shared = {}
+        for gram in grams:
+            for word in self.trigram_words.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        scored = []
+        for word, common in shared.items():
+            score = common / (len(grams) + len(trigrams(word)) - common)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, len(word), word))
+        return [word for _, _, word in sorted(scored)]
+
+    def _plan(self, token):
+        """(сколько товаров, слова по близости, проверка товара) для токена или None."""
+        node = self._node(token)
+        if node is None:
+            words = self._similar(token) if len(token) >= MIN_FUZZY_LENGTH else ()
+            if not words:
+                return None
+            count = sum(len(self.word_products[word]) for word in words)
+        else:
+            count = node.count
+            words = list(islice(self._walk(token, node), EXPAND_WORDS + 1))
+            if len(words) > EXPAND_WORDS:
+                # под префиксом слишком много слов — проверяем сами слова товара
+                return (
+                    count, self._walk(token, node),
+                    lambda entry: any(word.startswith(token) for word in entry.words),
+                )
+        ids = set().union(*(self.word_products[word] for word in words))
+        return count, iter(words), lambda entry: entry.id in ids
+
+    def search(self, query, limit=10):
+        tokens = list(dict.fromkeys(normalize(query)))
+        if not tokens:
+            return []
+        with self.lock:
+            plans = []
+            for token in tokens:
+                plan = self._plan(token)
+                if plan is None:
+                    return []
+                plans.append(plan)
+            # ведущий токен — с наименьшим числом товаров: идём по его словам в порядке
+            # близости, остальные токены проверяем по словам найденного товара
+            plans.sort(key=lambda plan: plan[0])
+            words = plans[0][1]
+            others = [matches for _, _, matches in plans[1:]]
+
+            found, seen = [], set()
+            for word in words:
+                # внутри слова: сначала товары, где это слово — бренд
+                for ids in (self.brand_products.get(word, ()), self.word_products[word]):
+                    for pid in ids:
+                        if pid in seen:
+                            continue
+                        seen.add(pid)
+                        entry = self.entries[pid]
+                        if all(matches(entry) for matches in others):
+                            found.append(entry.as_dict())
+                            if len(found) >= limit:
+                                return found
+            return found
+
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def get_index():
+    global _current
+    version = catalog_version()
+    index = _current
+    if index is not None and index.version == version:
+        return index
+    with _build_lock:
+        if _current is None or _current.version != version:
+            _current = AutocompleteIndex.build(version)
+        return _current
+
+
+def reset():
+    global _current
+    _current = None
+
+
+def search(query, limit=None):
+    if limit is None:
+        limit = getattr(settings, "AUTOCOMPLETE_LIMIT", 10)
+    return get_index().search(query, limit)
+
+
+def _after_commit(apply, version):
+    """
+    Правка из сигнала — после коммита (откат не должен попасть в индекс).
+    version — версия каталога, которую дала именно эта правка. Индекс
+    догоняет её, только если до правки был ровно на версию ниже; иначе между
+    ними чужая правка (другой воркер, UPDATE без save), которой в индексе нет, —
+    версия остаётся старой, и get_index пересоберёт индекс целиком.
+    """
+    def callback():
+        index = _current
+        if index is None or index.version != version - 1:
+            return
+        apply(index)
+        index.version = version
+    transaction.on_commit(callback)
+
+
+def product_saved(product, version):
+    _after_commit(lambda index: index.update(product), version)
+
+
+def product_deleted(product_id, version):
+    _after_commit(lambda index: index.remove(product_id), version)
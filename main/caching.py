@@ -0,0 +1,68 @@
+# main/caching.py
+"""
+Кэш витрины. Ключи включают версию каталога: любое изменение товара,
+категории или новости поднимает CatalogVersion, и старые записи просто
+перестают читаться — явная инвалидация не нужна.
+
+Саму версию держим в кэше CATALOG_VERSION_TTL секунд: с локальным
+(per-process) кэшем соседние воркеры увидят новую версию не позже этого срока.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .i18n import LANG_PARAM
+from .models import CatalogVersion
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = CatalogVersion.current()
+        cache.set(CATALOG_VERSION_KEY, version, getattr(settings, "CATALOG_VERSION_TTL", 5))
+    return version
+
+
+async def acatalog_version():
+    """catalog_version для async-вьюх: кэш через aget, в поток — только за версией из базы."""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        version = await sync_to_async(CatalogVersion.current)()
+        await cache.aset(CATALOG_VERSION_KEY, version, getattr(settings, "CATALOG_VERSION_TTL", 5))
+    return version
+
+
+def bump_catalog_version():
+    """Новая версия каталога — та, что получится после коммита этой правки."""
+    version = CatalogVersion.bump()
+    # сбрасываем после коммита, иначе параллельный запрос закэширует старую версию
+    transaction.on_commit(lambda: cache.delete(CATALOG_VERSION_KEY))
+    return version
+
+
+def catalog_key(*parts):
+    return ":".join(["catalog", str(catalog_version()), *map(str, parts)])
+
+
+def cached_catalog(parts, builder, timeout=None):
+    """Значение из кэша по ключу (версия каталога + parts) или builder()."""
+    if timeout is None:
+        timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+    return cache.get_or_set(catalog_key(*parts), builder, timeout)
+
+
+def response_key(version, lang, request):
+    """
+    Ключ готового ответа: версия каталога, язык (уже один из LANGUAGES), хост
+    (в ответах абсолютные URL картинок), путь и параметры без lang в
+    отсортированном виде — порядок параметров на ответ не влияет.
+    """
+    query = sorted((name, values) for name, values in request.GET.lists() if name != LANG_PARAM)
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return ":".join(["catalog", str(version), "response", lang, digest])
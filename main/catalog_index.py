@@ -0,0 +1,257 @@
+# main/catalog_index.py
+"""
+Каталог в памяти процесса для /api/products/: фильтры и сортировки без SQL.
+
+Строки — товары available=True в порядке id (номер строки = позиция в
+массивах). Колонки id / price — array('q'), для каждой сортировки из
+ProductViewSet.ordering_fields (в обе стороны) — готовая перестановка
+строк, для каждой категории и бренда — возрастающий список строк.
+Диапазон цен — bisect по отсортированным ценам (всего каталога или
+категории), так что ?price_min/price_max стоит O(log n + ответ).
+Готовое представление товара (вывод ProductSerializer без descFull и с
+относительными URL картинок) собирается один раз; descFull — отдельным
+столбцом на язык, подгружается при первом запросе на этом языке.
+
+Индекс привязан к версии каталога (main/caching.py): когда она меняется,
+следующий запрос собирает новый индекс, старый просто перестаёт
+использоваться. Включается настройкой CATALOG_INDEX.
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .caching import acatalog_version, catalog_version
+from .i18n import PRODUCT_FULL_DESC, defer_product_texts
+from .models import Brand, Product
+from .serializers import ProductSerializer
+
+# параметры запроса, на которые индекс умеет ответить; с любым другим
+# фильтром ProductViewSet идёт в базу как раньше
+FILTER_PARAMS = ("category", "category__slug", "brand", "brand__icontains", "price_min", "price_max")
+PRICE_PARAMS = ("price_min", "price_max")
+IGNORED_PARAMS = ("ordering", "format", "page", "page_size", "limit", "offset", "cursor", "lang")
+ORDERING_FIELDS = ("id", "price", "title")
+IMAGE_FIELDS = ("img", "big_img")
+
+
+class _RowSerializer(ProductSerializer):
+    class Meta(ProductSerializer.Meta):
+        fields = tuple(f for f in ProductSerializer.Meta.fields if f != "descFull")
+
+
+class CatalogIndex:
+    __slots__ = (
+        "version", "ids", "prices", "titles", "brands", "brand_rows",
+        "category_rows", "price_ranges", "orderings", "ranks", "rows",
+        "full_descriptions", "_lock",
+    )
+
+    def __init__(self, version, products):
+        self.version = version
+        count = len(products)
+        self.ids = array("q", (p.pk for p in products))
+        self.prices = array("q", (p.price for p in products))
+        self.titles = [p.title for p in products]
+        self.brands = sorted({p.brand for p in products})
+
+        brand_rows, category_rows = {}, {}
+        for row, product in enumerate(products):
+            brand_rows.setdefault(Brand.key(product.brand), array("l")).append(row)
+            # как ProductFilter: по копии slug в самом товаре
+            category_rows.setdefault(product.category_slug, array("l")).append(row)
+        self.brand_rows, self.category_rows = brand_rows, category_rows
+
+        # перестановки строк; sorted устойчив и с reverse=True, так что при
+        # равных значениях строки остаются по возрастанию id
+        self.orderings, self.ranks = {}, {}
+        for field in ORDERING_FIELDS:
+            column = self._column(field)
+            for descending in (False, True):
+                permutation = array("l", sorted(range(count), key=column.__getitem__, reverse=descending))
+                rank = array("l", bytes(permutation.itemsize * count))
+                for position, row in enumerate(permutation):
+                    rank[row] = position
+                self.orderings[field, descending] = permutation
+                self.ranks[field, descending] = rank
+        # цены по возрастанию и строки в том же порядке: весь каталог (None) и каждая категория
+        by_price = self.orderings["price", False]
+        self.price_ranges = {None: (array("q", (self.prices[row] for row in by_price)), by_price)}
+        for slug, rows in category_rows.items():
+            rows = array("l", sorted(rows, key=self.prices.__getitem__))
+            self.price_ranges[slug] = (array("q", (self.prices[row] for row in rows)), rows)
+
+        self.rows = list(_RowSerializer(products, many=True, context={}).data)
+        self.full_descriptions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, version):
+        products = list(
+            defer_product_texts(Product.objects.filter(available=True).select_related("category"))
+            .order_by("id")
+        )
+        return cls(version, products)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- запрос ----------
+    @staticmethod
+    def supports(params):
+        if not all(name in FILTER_PARAMS or name in IGNORED_PARAMS for name in params):
+            return False
+        # кривое число пусть разбирает django-filter — он ответит 400
+        try:
+            for name in PRICE_PARAMS:
+                _price(params.get(name))
+        except (InvalidOperation, ValueError):
+            return False
+        return True
+
+    def select(self, params):
+        """Строки, прошедшие фильтры, в порядке ?ordering= (как OrderingFilter)."""
+        selected = None
+        slugs = {params.get(name) for name in ("category", "category__slug")} - {None, ""}
+        low, high = _price(params.get("price_min")), _price(params.get("price_max"))
+        filters = [
+            # как ProductFilter: ?brand= — slug или любое написание названия
+            ("brand", lambda value: self.brand_rows.get(Brand.key(value), ())),
+            ("brand__icontains", self._brand_contains),
+        ]
+        if low is not None or high is not None:
+            # одна категория — диапазон сразу внутри неё, иначе по всему каталогу
+            slug = next(iter(slugs)) if len(slugs) == 1 else None
+            selected = set(self._price_range(slug, low, high))
+            if slug is not None:
+                slugs = ()
+        selected = self._intersect(selected, [self.category_rows.get(slug, ()) for slug in slugs])
+        selected = self._intersect(selected, [
+            rows(params[name]) for name, rows in filters if params.get(name) not in (None, "")
+        ])
+
+        ordering = self._ordering(params.get("ordering"))
+        if len(ordering) == 1:
+            if selected is None:
+                return list(self.orderings[ordering[0]])
+            # сортируем только найденное: позиция строки в готовой перестановке — ключ
+            return sorted(selected, key=self.ranks[ordering[0]].__getitem__)
+
+        rows = range(len(self)) if selected is None else sorted(selected)
+        # несколько полей: устойчивая сортировка с последнего поля к первому
+        result = list(rows)
+        for field, descending in reversed(ordering):
+            result.sort(key=self._column(field).__getitem__, reverse=descending)
+        return result
+
+    @staticmethod
+    def _intersect(selected, matches):
+        for rows in matches:
+            rows = set(rows)
+            selected = rows if selected is None else selected & rows
+        return selected
+
+    def _price_range(self, slug, low, high):
+        prices, rows = self.price_ranges.get(slug, ((), ()))
+        start = 0 if low is None else bisect_left(prices, low)
+        stop = len(prices) if high is None else bisect_right(prices, high)
+        return rows[start:stop]
+
+    def _brand_contains(self, value):
+        needle = value.casefold()
+        rows = []
+        for brand in self.brands:
+            if needle in brand.casefold():
+                rows.extend(self.brand_rows[Brand.key(brand)])
+        return rows
+
+    def _column(self, field):
+        return {"id": self.ids, "price": self.prices, "title": self.titles}[field]
+
+    @staticmethod
+    def _ordering(raw):
+        ordering = []
+        for part in (raw or "").split(","):
+            part = part.strip()
+            field = part.lstrip("-")
+            if field in ORDERING_FIELDS:
+                ordering.append((field, part.startswith("-")))
+        return ordering or [("id", False)]
+
+    # ---------- представление ----------
+    def descriptions(self, lang):
+        column = self.full_descriptions.get(lang)
+        if column is None:
+            with self._lock:
+                column = self.full_descriptions.get(lang)
+                if column is None:
+                    by_id = dict(
+                        Product.objects.filter(pk__in=self.ids)
+                        .values_list("pk", PRODUCT_FULL_DESC[lang]).iterator(chunk_size=2000)
+                    )
+                    column = self.full_descriptions[lang] = [by_id.get(pk, "") for pk in self.ids]
+        return column
+
+    def render(self, rows, lang, request):
+        descriptions = self.descriptions(lang)
+        absolute = {}
+        result = []
+        for row in rows:
+            item = dict(self.rows[row])
+            for field in IMAGE_FIELDS:
+                url = item[field]
+                if url:
+                    if url not in absolute:
+                        absolute[url] = request.build_absolute_uri(url)
+                    item[field] = absolute[url]
+            item["descFull"] = descriptions[row]
+            result.append(item)
+        return result
+
+
+def _price(value):
+    if value in (None, ""):
+        return None
+    price = Decimal(value)
+    if not price.is_finite():
+        raise ValueError(value)
+    # как IntegerField.get_prep_value в ORM: дробная граница усекается
+    return int(price)
+
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, "CATALOG_INDEX", False)
+
+
+def get_index():
+    """Индекс для текущей версии каталога; собирается один раз на версию."""
+    global _current
+    version = catalog_version()
+    index = _current
+    if index is not None and index.version == version:
+        return index
+    with _build_lock:
+        if _current is None or _current.version != version:
+            _current = CatalogIndex.build(version)
+        return _current
+
+
+async def aget_index():
+    """get_index для async-вьюх: прогретый индекс отдаётся без похода в поток."""
+    version = await acatalog_version()
+    index = _current
+    if index is not None and index.version == version:
+        return index
+    return await sync_to_async(get_index)()
+
+
+def reset():
+    global _current
+    _current = None
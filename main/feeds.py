@@ -0,0 +1,142 @@
+# main/feeds.py
+"""
+Фиды товаров для маркетплейсов и агрегаторов: XML / CSV / JSONL на каждом
+языке. Товары читаются через values_list(...).iterator() — только колонки
+нужного языка, без сериализаторов, — и пишутся кусками в gzip-файл
+(команда export_feeds) или в StreamingHttpResponse.
+
+Рядом с файлом лежит <файл>.json с версией каталога, из которой он собран:
+если версия не изменилась, перегенерация пропускается.
+"""
+import csv
+import gzip
+import json
+import os
+import pathlib
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .i18n import LANGUAGE_CODES
+from .models import CatalogVersion, Product
+
+FEED_CHUNK_SIZE = 2000
+FEED_FORMATS = {
+    "xml": "application/xml; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+COLUMNS = ("id", "title", "brand", "price", "category", "category_slug", "url", "image", "description")
+
+
+def feed_dir():
+    return pathlib.Path(getattr(settings, "FEED_DIR", settings.BASE_DIR / "feeds"))
+
+
+def feed_path(lang, fmt):
+    return feed_dir() / f"products-{lang}.{fmt}.gz"
+
+
+def feed_rows(lang, base_url="", chunk_size=FEED_CHUNK_SIZE):
+    """Кортежи в порядке COLUMNS; в наличии, полное описание на языке lang."""
+    products = (
+        Product.objects.filter(available=True).order_by("id")
+        .values_list("id", "title", "brand", "price", "category__name", "category__slug",
+                     "img", f"desc_full_{lang}", f"desc_{lang}")
+    )
+    # маршрут SPA: /products/:category/:id
+    product_url = getattr(settings, "FEED_PRODUCT_URL", "/products/{category}/{id}")
+    for pid, title, brand, price, category, slug, img, full, short in products.iterator(chunk_size=chunk_size):
+        image = base_url + default_storage.url(img) if img else ""
+        yield (pid, title, brand, price, category, slug,
+               base_url + product_url.format(category=slug, id=pid), image, full or short)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_chunks(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n"
+
+
+def xml_chunks(rows, lang):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<feed lang={quoteattr(lang)} generated={quoteattr(timezone.now().isoformat())}>\n'
+    for row in rows:
+        item = dict(zip(COLUMNS, row))
+        yield (
+            f'  <offer id="{item["id"]}">'
+            + "".join(
+                f"<{name}>{escape(str(item[name] or ''))}</{name}>"
+                for name in COLUMNS[1:]
+            )
+            + "</offer>\n"
+        )
+    yield "</feed>\n"
+
+
+def feed_chunks(lang, fmt, base_url="", chunk_size=FEED_CHUNK_SIZE):
+    rows = feed_rows(lang, base_url, chunk_size)
+    if fmt == "xml":
+        return xml_chunks(rows, lang)
+    if fmt == "csv":
+        return csv_chunks(rows)
+    return jsonl_chunks(rows)
+
+
+def read_meta(path):
+    try:
+        return json.loads(pathlib.Path(f"{path}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(path, version=None, base_url=None):
+    """Файл собран из текущей версии каталога (и с тем же base_url, если он задан)."""
+    meta = read_meta(path)
+    if not meta or not pathlib.Path(path).exists():
+        return False
+    if version is None:
+        version = CatalogVersion.current()
+    if base_url is not None and meta.get("base_url") != base_url:
+        return False
+    return meta.get("catalog_version") == version
+
+
+def write_feed(lang, fmt, base_url="", force=False):
+    """
+    Собрать gzip-фид, если каталог менялся с прошлой выгрузки.
+    Возвращает (path, written: bool). Файл подменяется атомарно.
+    """
+    if lang not in LANGUAGE_CODES or fmt not in FEED_FORMATS:
+        raise ValueError(f"неизвестный фид: {lang}.{fmt}")
+    path = feed_path(lang, fmt)
+    # версию читаем до выборки: правка во время выгрузки даст новую версию и следующий прогон
+    version = CatalogVersion.current()
+    if not force and is_current(path, version, base_url):
+        return path, False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", newline="") as fh:
+        for chunk in feed_chunks(lang, fmt, base_url):
+            fh.write(chunk)
+    os.replace(tmp, path)
+    pathlib.Path(f"{path}.json").write_text(json.dumps({
+        "catalog_version": version,
+        "generated_at": timezone.now().isoformat(),
+        "base_url": base_url,
+    }), encoding="utf-8")
+    return path, True
@@ -1,12 +1,39 @@
 # main/filters.py
 from django_filters import rest_framework as filters
-from .models import Product
+from rest_framework.filters import OrderingFilter
+from .models import Brand, Product
+
+
+class StableOrderingFilter(OrderingFilter):
+    """?ordering=-price: при равных ценах порядок по id, иначе он зависит от плана запроса."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {"id", "-id", "pk", "-pk"} & set(ordering):
+            ordering = [*ordering, "id"]
+        return ordering
 
 
 class ProductFilter(filters.FilterSet):
-    # ?category=hair-care
-    category = filters.CharFilter(field_name="category__slug", lookup_expr="exact")
+    # ?category=hair-care — по денормализованному category_slug, без JOIN
+    category = filters.CharFilter(field_name="category_slug", lookup_expr="exact")
+    # старое имя параметра, им уже пользуется фронт
+    category__slug = filters.CharFilter(field_name="category_slug", lookup_expr="exact")
+    # ?brand=perioe / ?brand=Perioe — бренд по slug или названию → brand_ref_id IN (…), по индексу FK
+    brand = filters.CharFilter(method="filter_brand")
+    brand__icontains = filters.CharFilter(method="filter_brand_contains")
+    brand_id = filters.NumberFilter(field_name="brand_ref_id")
+    # ?price_min=10000&price_max=50000 — границы включительно
+    price_min = filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price_max = filters.NumberFilter(field_name="price", lookup_expr="lte")
 
     class Meta:
         model  = Product
-        fields = ("category", "brand", "available")
+        fields = ("available",)
+
+    def filter_brand(self, queryset, name, value):
+        # slug — это Brand.key(название), так что подходит любое написание
+        return queryset.filter(brand_ref__in=Brand.objects.filter(slug=Brand.key(value)).values("pk"))
+
+    def filter_brand_contains(self, queryset, name, value):
+        return queryset.filter(brand_ref__in=Brand.objects.filter(name__icontains=value).values("pk"))
@@ -0,0 +1,81 @@
+# main/i18n.py
+"""
+Язык витрины определяется один раз на запрос: 'ru' | 'uz' | 'en'.
+Сериализаторы выбирают колонки языка один раз на список (serializers.LanguageField),
+а не разбирают request.LANGUAGE_CODE на каждой строке; лишние языковые
+колонки не читаются.
+"""
+from django.conf import settings
+
+# на русском заполнены все тексты — на него падаем, если перевода нет
+BASE_LANGUAGE = "ru"
+LANGUAGE_CODES = tuple(code for code, _ in settings.LANGUAGES)
+# ?lang=uz — явный выбор языка в URL (сильнее Accept-Language)
+LANG_PARAM = "lang"
+
+# для каждого языка: поле → (колонка языка, колонка-fallback)
+NEWS_FIELDS = {
+    lang: {name: (f"{name}_{lang}", f"{name}_{BASE_LANGUAGE}") for name in ("title", "desc")}
+    for lang in LANGUAGE_CODES
+}
+PRODUCT_FULL_DESC = {lang: f"desc_full_{lang}" for lang in LANGUAGE_CODES}
+
+
+def normalize_language(code):
+    """'en-us' → 'en', неизвестное → BASE_LANGUAGE."""
+    code = (code or "").lower()
+    for lang in LANGUAGE_CODES:
+        if code.startswith(lang):
+            return lang
+    return BASE_LANGUAGE
+
+
+def query_language(request):
+    """Язык из ?lang=, если он один из LANGUAGES, иначе None."""
+    lang = request.GET.get(LANG_PARAM, "").lower()
+    return lang if lang in LANGUAGE_CODES else None
+
+
+def request_language(request):
+    """Язык запроса (кэшируется на HttpRequest, DRF Request тоже подходит)."""
+    if request is None:
+        return BASE_LANGUAGE
+    request = getattr(request, "_request", request)
+    lang = getattr(request, "_storefront_language", None)
+    if lang is None:
+        lang = normalize_language(getattr(request, "LANGUAGE_CODE", ""))
+        request._storefront_language = lang
+    return lang
+
+
+def serializer_language(serializer):
+    """
+    Язык из контекста сериализатора. При many=True все строки проходят через
+    один и тот же child-экземпляр, так что запрос разбирается один раз на список,
+    а дальше это чтение атрибута.
+    """
+    lang = serializer.__dict__.get("_language")
+    if lang is None:
+        context = serializer.context
+        lang = context.get("language") or request_language(context.get("request"))
+        serializer._language = lang
+    return lang
+
+
+def localize_news(queryset, lang):
+    """
+    Только колонки, которые нужны NewsSerializer на этом языке: текст языка
+    и русский для fallback. Сам fallback — в сериализаторе (LanguageField):
+    Coalesce в SQL обходился дороже, чем «or» на строке.
+    """
+    columns = {column for pair in NEWS_FIELDS[lang].values() for column in pair}
+    return queryset.only(
+        "id", "banner_bg", "large_img", "thumbnail", "is_featured", "created_at", *sorted(columns)
+    )
+
+
+def defer_product_texts(queryset, lang=None):
+    """Не читать полные описания на других языках (lang=None — ни на каких)."""
+    return queryset.defer(*(
+        column for code, column in PRODUCT_FULL_DESC.items() if code != lang
+    ))
@@ -0,0 +1,369 @@
+# main/loadreplay.py
+"""
+Воспроизведение смешанной нагрузки прямо на объектах приложения
+(KoreanCosmetics.wsgi.application / asgi.application), без внешнего сервера.
+
+Scenario собирает взвешенный поток запросов из реальных id/slug в базе,
+WsgiDriver гоняет его пулом потоков, AsgiDriver — пулом корутин.
+"""
+import asyncio
+import io
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+
+HOST = "127.0.0.1"
+LANGS = ("ru", "uz", "en")
+
+DEFAULT_MIX = {
+    "catalog": 30,
+    "product": 20,
+    "categories": 10,
+    "news": 10,
+    "profile": 5,
+    "order": 5,
+    "notifications": 20,
+}
+
+
+class Call:
+    __slots__ = ("endpoint", "method", "path", "query", "body", "lang", "auth")
+
+    def __init__(self, endpoint, method, path, query="", body=b"", lang="ru", auth=False):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+        self.lang = lang
+        self.auth = auth
+
+
+class Scenario:
+    """Генератор запросов по весам mix; данные берёт из текущей базы."""
+
+    def __init__(self, mix, seed=0, sample=1000):
+        from main.models import Category, News, Product
+
+        self.rng = random.Random(seed)
+        self.names = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.names]
+        # выборка — через rng, а не ORDER BY RANDOM(): тот же --seed даёт тот же трафик
+        products = list(
+            Product.objects.filter(available=True).order_by("id").values_list("id", "title", "price")
+        )
+        if not products:
+            raise ValueError("в базе нет доступных товаров")
+        self.products = self.rng.sample(products, min(sample, len(products)))
+        self.categories = list(Category.objects.order_by("slug").values_list("slug", flat=True)[:sample]) or [""]
+        self.brands = list(
+            Product.objects.order_by("brand").values_list("brand", flat=True).distinct()[:sample]
+        ) or [""]
+        self.news = list(News.objects.order_by("id").values_list("id", flat=True)[:sample])
+
+    def next(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        return getattr(self, f"_{name}")()
+
+    # ---------- сценарии ------------------------------------------------------
+    def _catalog(self):
+        rng = self.rng
+        params = {}
+        roll = rng.random()
+        if roll < 0.5:
+            params["category__slug"] = rng.choice(self.categories)
+        elif roll < 0.7:
+            params["brand"] = rng.choice(self.brands)
+        elif roll < 0.8:
+            params["brand__icontains"] = rng.choice(self.brands)[:4]
+        if rng.random() < 0.5:
+            params["ordering"] = rng.choice(("price", "-price", "title", "id"))
+        return Call("catalog", "GET", "/api/products/", urlencode(params), lang=rng.choice(LANGS))
+
+    def _product(self):
+        pid = self.rng.choice(self.products)[0]
+        return Call("product", "GET", f"/api/products/{pid}/", lang=self.rng.choice(LANGS))
+
+    def _categories(self):
+        return Call("categories", "GET", "/api/categories/", lang=self.rng.choice(LANGS))
+
+    def _news(self):
+        if self.news and self.rng.random() < 0.3:
+            return Call("news", "GET", f"/api/news/{self.rng.choice(self.news)}/")
+        return Call("news", "GET", "/api/news/", lang=self.rng.choice(LANGS))
+
+    def _profile(self):
+        rng = self.rng
+        body = {
+            "name": rng.choice(("Алишер", "Мадина", "Jasur")),
+            "surname": rng.choice(("Каримов", "Nazarova")),
+            "email": "",
+            "phone": f"+99890{rng.randint(0, 9_999_999):07d}",
+        }
+        return Call("profile", "POST", "/api/profile/", body=json.dumps(body).encode())
+
+    def _order(self):
+        rng = self.rng
+        picked = rng.sample(self.products, min(len(self.products), rng.randint(1, 5)))
+        body = {
+            "items": [
+                {"id": pid, "title": title, "price": price, "quantity": rng.randint(1, 3)}
+                for pid, title, price in picked
+            ],
+            "payment_method": rng.choice(("cash", "payme", "click", "apelsin")),
+            "customer_name": "Load",
+            "customer_phone": "+998900000000",
+        }
+        return Call("order", "POST", "/api/orders/", body=json.dumps(body).encode(),
+                    auth=rng.random() < 0.5)
+
+    def _notifications(self):
+        return Call("notifications", "GET", "/api/notifications/", auth=True)
+
+
+def bench_session_cookie(username="loadreplay"):
+    """Сессия для авторизованных сценариев (без логина через форму)."""
+    User = get_user_model()
+    user, created = User.objects.get_or_create(username=username)
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=["password"])
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+
+class Results:
+    """Задержки и статусы по эндпоинтам."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+
+    def add(self, endpoint, status, ms):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(ms)
+            by_status = self.statuses.setdefault(endpoint, {})
+            by_status[status] = by_status.get(status, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        total = errors = 0
+        for endpoint, samples in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            failed = sum(n for status, n in statuses.items() if status >= 400 or status == 0)
+            total += len(samples)
+            errors += failed
+            endpoints[endpoint] = dict(
+                summarize(samples),
+                errors=failed,
+                error_rate=round(failed / len(samples), 4),
+                statuses={str(k): v for k, v in sorted(statuses.items())},
+            )
+        everything = [ms for samples in self.latencies.values() for ms in samples]
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "latency_ms": summarize(everything),
+            "endpoints": endpoints,
+        }
+
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": pct(50),
+        "p90": pct(90),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _session_cookie(headers, current):
+    """Забрать sessionid из Set-Cookie ответа (заголовки — пары строк)."""
+    prefix = settings.SESSION_COOKIE_NAME + "="
+    for name, value in headers:
+        if name.lower() == "set-cookie" and value.startswith(prefix):
+            morsel = SimpleCookie(value)[settings.SESSION_COOKIE_NAME]
+            return f"{settings.SESSION_COOKIE_NAME}={morsel.value}"
+    return current
+
+
+def _request_headers(call, cookie):
+    headers = [("host", HOST), ("accept-language", call.lang), ("accept", "application/json")]
+    if call.body:
+        headers.append(("content-type", "application/json"))
+        headers.append(("content-length", str(len(call.body))))
+    if cookie:
+        headers.append(("cookie", cookie))
+    return headers
+
+
+class WsgiDriver:
+    """Пул потоков поверх WSGI-callable."""
+
+    def __init__(self, application, concurrency, auth_cookie):
+        self.application = application
+        self.concurrency = concurrency
+        self.auth_cookie = auth_cookie
+        self.local = threading.local()
+
+    def _anon_cookie(self):
+        # у каждого потока свой «анонимный посетитель» — профиль живёт в его сессии
+        return getattr(self.local, "cookie", "")
+
+    def call(self, call):
+        cookie = self.auth_cookie if call.auth else self._anon_cookie()
+        environ = {
+            "REQUEST_METHOD": call.method,
+            "PATH_INFO": call.path,
+            "QUERY_STRING": call.query,
+            "SERVER_NAME": HOST,
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": HOST,
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(call.body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in _request_headers(call, cookie):
+            key = name.upper().replace("-", "_")
+            if key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[key] = value
+            else:
+                environ[f"HTTP_{key}"] = value
+
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured["status"] = int(status.split(" ", 1)[0])
+            captured["headers"] = headers
+
+        started = time.perf_counter()
+        try:
+            body = self.application(environ, start_response)
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            status = captured.get("status", 0)
+        except Exception:
+            status = 0
+        ms = (time.perf_counter() - started) * 1000
+        if not call.auth:
+            self.local.cookie = _session_cookie(captured.get("headers", ()), self._anon_cookie())
+        return status, ms
+
+    def run(self, calls, results):
+        def worker(call):
+            status, ms = self.call(call)
+            if results is not None:
+                results.add(call.endpoint, status, ms)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(worker, calls))
+
+
+class AsgiDriver:
+    """Пул корутин поверх ASGI-приложения (concurrency одновременных запросов)."""
+
+    def __init__(self, application, concurrency, auth_cookie):
+        self.application = application
+        self.concurrency = concurrency
+        self.auth_cookie = auth_cookie
+
+    async def call(self, call, cookie):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": call.method,
+            "scheme": "http",
+            "path": call.path,
+            "raw_path": call.path.encode(),
+            "query_string": call.query.encode(),
+            "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in _request_headers(call, cookie)],
+            "client": (HOST, 0),
+            "server": (HOST, 80),
+        }
+        body_sent = False
+        disconnect = asyncio.Event()
+        captured = {"status": 0, "headers": []}
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": call.body, "more_body": False}
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                disconnect.set()
+
+        started = time.perf_counter()
+        try:
+            await self.application(scope, receive, send)
+        except Exception:
+            captured["status"] = 0
+        finally:
+            disconnect.set()
+        return captured, (time.perf_counter() - started) * 1000
+
+    async def _run(self, calls, results):
+        queue = asyncio.Queue()
+        for call in calls:
+            queue.put_nowait(call)
+
+        async def worker():
+            cookie = ""
+            while not queue.empty():
+                call = queue.get_nowait()
+                captured, ms = await self.call(call, self.auth_cookie if call.auth else cookie)
+                if not call.auth:
+                    headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in captured["headers"]]
+                    cookie = _session_cookie(headers, cookie)
+                if results is not None:
+                    results.add(call.endpoint, captured["status"], ms)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    def run(self, calls, results):
+        asyncio.run(self._run(calls, results))
@@ -0,0 +1,120 @@
+# main/management/commands/bench_middleware.py
+import re
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from main import loadreplay
+
+# исходный MIDDLEWARE: стоковые мидлвари Django, сессия, пользователь и сообщения
+# на каждом запросе, CommonMiddleware дважды, CORS в самом конце
+LEGACY_MIDDLEWARE = [
+    'main.middleware.PerformanceMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.locale.LocaleMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+VISITORS = ("аноним", "с сессией")
+QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Цена MIDDLEWARE на запрос к каталогу: исходная цепочка, текущая без "
+        "STATELESS_PATHS и текущая (каталог без сессии, пользователя и сообщений), "
+        "для анонима и посетителя с сессией, под WSGI и ASGI"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--rounds", type=int, default=3, help="цепочки чередуются, берётся лучший раунд")
+        parser.add_argument("--path", default="/api/categories/")
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        cookie = loadreplay.bench_session_cookie()
+        chains = (
+            ("исходная", {"MIDDLEWARE": LEGACY_MIDDLEWARE}),
+            ("без STATELESS_PATHS", {"STATELESS_PATHS": ()}),
+            ("текущая", {}),
+        )
+        # тестовый клиент ходит на хост testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            clients, queries = {}, {}
+            for chain, overrides in chains:
+                # цепочка мидлварей собирается на первом запросе клиента
+                with override_settings(**overrides):
+                    for visitor in VISITORS:
+                        visitor_cookie = cookie if visitor != "аноним" else ""
+                        sync_client = self._client(Client, visitor_cookie)
+                        async_client = self._client(AsyncClient, visitor_cookie)
+                        response = sync_client.get(path)
+                        async_to_sync(async_client.get)(path)
+                        clients[chain, visitor] = (overrides, sync_client, async_client)
+                        queries[chain, visitor] = int(QUERIES_RE.search(response["Server-Timing"]).group(1))
+
+            best = {}
+            for _ in range(opts["rounds"]):
+                for key, (overrides, sync_client, async_client) in clients.items():
+                    with override_settings(**overrides):
+                        timings = (
+                            self._wsgi(sync_client, path, opts["repeat"]),
+                            self._asgi(async_client, path, opts["repeat"]),
+                        )
+                    best[key] = tuple(map(min, zip(best.get(key, timings), timings)))
+
+        for chain, _ in chains:
+            for visitor in VISITORS:
+                wsgi_ms, asgi_ms = best[chain, visitor]
+                self.stdout.write(
+                    f"{chain:20} {visitor:10} SQL {queries[chain, visitor]}  "
+                    f"WSGI {wsgi_ms:7.3f} ms  ASGI {asgi_ms:7.3f} ms"
+                )
+        for visitor in VISITORS:
+            for chain in ("исходная", "без STATELESS_PATHS"):
+                before, after = best[chain, visitor], best["текущая", visitor]
+                self.stdout.write(
+                    f"снято против «{chain}» ({visitor}): WSGI {before[0] - after[0]:.3f} ms, "
+                    f"ASGI {before[1] - after[1]:.3f} ms, "
+                    f"SQL {queries[chain, visitor] - queries['текущая', visitor]}"
+                )
+
+    @staticmethod
+    def _client(client_class, cookie):
+        client = client_class()
+        if cookie:
+            client.cookies.load(cookie)
+        return client
+
+    @staticmethod
+    def _wsgi(client, path, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.get(path)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    @staticmethod
+    def _asgi(client, path, repeat):
+        async def run():
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await client.get(path)
+                samples.append((time.perf_counter() - started) * 1000)
+            return statistics.median(samples)
+
+        return async_to_sync(run)()
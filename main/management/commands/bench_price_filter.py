@@ -0,0 +1,71 @@
+# main/management/commands/bench_price_filter.py
+import random
+import statistics
+import time
+from array import array
+
+from django.core.management.base import BaseCommand
+
+from main.catalog_index import CatalogIndex, get_index
+from main.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Фильтр по цене: план и время SQL-запроса (индексы product_cat_price_idx / "
+        "product_price_idx) против bisect в индексе каталога, и рост bisect "
+        "на синтетических массивах цен разного размера"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--width", type=int, default=1000, help="ширина диапазона цен")
+        parser.add_argument("--sizes", default="20000,200000,2000000",
+                            help="размеры синтетических каталогов для bisect")
+
+    def _median_ms(self, func):
+        func()
+        samples = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def handle(self, *args, **opts):
+        self.repeat = opts["repeat"]
+        width = opts["width"]
+
+        available = Product.objects.filter(available=True)
+        prices = sorted(available.values_list("price", flat=True))
+        if prices:
+            low = prices[len(prices) // 2]
+            high = low + width
+            category = Category.objects.order_by("-product_count").first()
+            index = get_index()
+            for slug in (None, category.slug if category else None):
+                qs = available.filter(price__gte=low, price__lte=high).order_by("price")
+                params = {"price_min": str(low), "price_max": str(high), "ordering": "price"}
+                if slug:
+                    qs = qs.filter(category_slug=slug)
+                    params["category"] = slug
+                label = f"category={slug} " if slug else ""
+                self.stdout.write(f"{label}price {low}..{high}: {qs.count()} товаров")
+                self.stdout.write(f"  план: {qs.explain()}")
+                self.stdout.write(f"  SQL:    {self._median_ms(lambda: list(qs.values_list('id', flat=True))):8.3f} ms")
+                self.stdout.write(f"  индекс: {self._median_ms(lambda: index.select(params)):8.3f} ms")
+        else:
+            self.stdout.write("в базе нет товаров в наличии — только синтетика")
+
+        # тот же _price_range на массивах разной длины: время должно расти как log n
+        for size in (int(part) for part in opts["sizes"].split(",") if part):
+            synthetic = CatalogIndex.__new__(CatalogIndex)
+            column = array("q", sorted(random.randrange(1_000, 1_000_000) for _ in range(size)))
+            synthetic.price_ranges = {None: (column, array("l", range(size)))}
+            rounds = 1000
+            started = time.perf_counter()
+            for _ in range(rounds):
+                synthetic._price_range(None, 500_000, 500_000 + width // 10)
+            per_call = (time.perf_counter() - started) / rounds * 1e6
+            self.stdout.write(f"bisect, {size:>9} цен: {per_call:6.2f} µs")
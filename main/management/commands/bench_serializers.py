@@ -0,0 +1,148 @@
+# main/management/commands/bench_serializers.py
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework import serializers
+
+from main.i18n import defer_product_texts, localize_news, normalize_language
+from main.models import Category, News, Product
+from main.perf import TimedSerializerMixin
+from main.serializers import NewsSerializer, ProductSerializer
+
+
+# Сериализаторы до разрешения языка один раз на запрос — как они были в
+# main/serializers.py: язык из request.LANGUAGE_CODE на каждой строке и каждом
+# поле, SerializerMethodField, ImageField с build_absolute_uri на каждую картинку.
+
+class LegacyNewsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    title          = serializers.SerializerMethodField()
+    desc           = serializers.SerializerMethodField()
+    banner_bg_url  = serializers.ImageField(source="banner_bg", read_only=True)
+    large_img_url  = serializers.ImageField(source="large_img", read_only=True)
+    photo_card     = serializers.ImageField(source="thumbnail", read_only=True)
+
+    class Meta:
+        model = News
+        fields = NewsSerializer.Meta.fields
+
+    def get_title(self, obj):
+        request = self.context.get("request", None)
+        lang    = getattr(request, "LANGUAGE_CODE", "")
+        if lang.startswith("uz"):
+            return obj.title_uz or obj.title_ru
+        if lang.startswith("en"):
+            return obj.title_en or obj.title_ru
+        return obj.title_ru
+
+    def get_desc(self, obj):
+        request = self.context.get("request", None)
+        lang    = getattr(request, "LANGUAGE_CODE", "")
+        if lang.startswith("uz"):
+            return obj.desc_uz or obj.desc_ru
+        if lang.startswith("en"):
+            return obj.desc_en or obj.desc_ru
+        return obj.desc_ru
+
+
+class LegacyProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    desc      = serializers.SerializerMethodField()
+    descFull  = serializers.SerializerMethodField()
+    big_img   = serializers.ImageField(read_only=True)
+    category  = serializers.SlugRelatedField(read_only=True, slug_field='slug')
+
+    class Meta:
+        model = Product
+        fields = ProductSerializer.Meta.fields
+
+    def get_desc(self, obj):
+        return {'ru': obj.desc_ru, 'uz': obj.desc_uz, 'en': obj.desc_en}
+
+    def get_descFull(self, obj):
+        lang = self.context['request'].LANGUAGE_CODE
+        return getattr(obj, f'desc_full_{lang}', '')
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает сериализацию списков News/Product: прежние сериализаторы (язык "
+        "и URL картинок на каждой строке) против текущих (колонки языка и префикс "
+        "URL один раз на список; с --db — ещё и без лишних колонок)"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--lang", default="en")
+        parser.add_argument("--db", action="store_true",
+                            help="дополнительно: queryset из текущей базы (чтение + сериализация)")
+
+    def _compare(self, legacy, new):
+        """Прогоны чередуются, чтобы дрейф машины не попадал в один вариант."""
+        samples = ([], [])
+        for _ in range(self.repeat):
+            for func, bucket in ((legacy, samples[0]), (new, samples[1])):
+                started = time.perf_counter()
+                func()
+                bucket.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples[0]), statistics.median(samples[1])
+
+    def _row(self, name, legacy, new):
+        legacy_ms, new_ms = self._compare(legacy, new)
+        speedup = legacy_ms / new_ms if new_ms else float("inf")
+        self.stdout.write(f"{name:<28} legacy {legacy_ms:9.1f}ms   new {new_ms:9.1f}ms   ×{speedup:.2f}")
+
+    def handle(self, *args, **opts):
+        self.repeat = opts["repeat"]
+        rows = opts["rows"]
+        request = RequestFactory().get("/api/", HTTP_HOST="127.0.0.1")
+        request.LANGUAGE_CODE = opts["lang"]
+        lang = normalize_language(opts["lang"])
+
+        news = [
+            News(id=i, title_ru=f"Новость {i}", title_en=f"News {i}" if i % 3 else "",
+                 desc_ru="Текст " * 40, desc_en="Text " * 40 if i % 3 else "", is_featured=not i,
+                 banner_bg=f"news/banner{i}.png", large_img=f"news/large{i}.png",
+                 thumbnail=f"news/thumbs/{i}.png")
+            for i in range(rows)
+        ]
+        category = Category(id=1, name="Hair", slug="hair")
+        products = [
+            Product(id=i, title=f"Product {i}", price=1000 + i, brand="Perioe", category=category,
+                    img=f"products/product{i % 22}.png", desc_ru="Кратко", desc_uz="Qisqa",
+                    desc_en="Short", desc_full_ru="Полное " * 80, desc_full_uz="To'liq " * 80,
+                    desc_full_en="Full " * 80)
+            for i in range(rows)
+        ]
+
+        self.stdout.write(f"rows={rows} lang={opts['lang']} repeat={self.repeat} (медиана)")
+        self._row(
+            "news (in memory)",
+            (lambda: LegacyNewsSerializer(news, many=True, context={"request": request}).data),
+            (lambda: NewsSerializer(news, many=True, context={"request": request}).data),
+        )
+        self._row(
+            "products (in memory)",
+            (lambda: LegacyProductSerializer(products, many=True, context={"request": request}).data),
+            (lambda: ProductSerializer(products, many=True, context={"request": request}).data),
+        )
+
+        if opts["db"]:
+            news_qs = News.objects.order_by("-is_featured", "-created_at")[:rows]
+            product_qs = Product.objects.filter(available=True).select_related("category")[:rows]
+            self._row(
+                "news (db)",
+                (lambda: LegacyNewsSerializer(news_qs.all(), many=True, context={"request": request}).data),
+                (lambda: NewsSerializer(
+                    localize_news(News.objects.order_by("-is_featured", "-created_at"), lang)[:rows],
+                    many=True, context={"request": request}).data),
+            )
+            self._row(
+                "products (db)",
+                (lambda: LegacyProductSerializer(product_qs.all(), many=True, context={"request": request}).data),
+                (lambda: ProductSerializer(
+                    defer_product_texts(Product.objects.filter(available=True).select_related("category"), lang)[:rows],
+                    many=True, context={"request": request}).data),
+            )
@@ -0,0 +1,45 @@
+# main/management/commands/export_feeds.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main import feeds
+from main.i18n import LANGUAGE_CODES
+
+
+def parse_list(allowed):
+    def parse(value):
+        items = [part.strip() for part in value.split(",") if part.strip()]
+        unknown = set(items) - set(allowed)
+        if unknown:
+            raise CommandError(f"неизвестно: {', '.join(sorted(unknown))}")
+        return items
+    return parse
+
+
+class Command(BaseCommand):
+    help = (
+        "Пишет gzip-фиды товаров (XML/CSV/JSONL на каждом языке) в FEED_DIR. "
+        "Фид, собранный из текущей версии каталога, пропускается"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", type=parse_list(feeds.FEED_FORMATS), default=list(feeds.FEED_FORMATS),
+                            help="через запятую: xml,csv,jsonl")
+        parser.add_argument("--lang", type=parse_list(LANGUAGE_CODES), default=list(LANGUAGE_CODES),
+                            help="через запятую: " + ",".join(LANGUAGE_CODES))
+        parser.add_argument("--base-url", default=getattr(settings, "FEED_BASE_URL", ""),
+                            help="префикс для ссылок на товары и картинки")
+        parser.add_argument("--force", action="store_true", help="собрать, даже если каталог не менялся")
+
+    def handle(self, *args, **opts):
+        for lang in opts["lang"]:
+            for fmt in opts["format"]:
+                started = time.perf_counter()
+                path, written = feeds.write_feed(lang, fmt, opts["base_url"].rstrip("/"), opts["force"])
+                if written:
+                    self.stdout.write(f"{path}: {path.stat().st_size} B за {time.perf_counter() - started:.1f}s")
+                else:
+                    self.stdout.write(f"{path}: каталог не менялся — пропуск")
@@ -0,0 +1,39 @@
+# main/management/commands/export_orders.py
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import exports
+from main.models import Order
+
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"ожидается дата YYYY-MM-DD: {value}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгрузка заказов для бухгалтерии, одна строка на позицию (CSV или JSONL). "
+        "Читает порциями через iterator() — память не зависит от периода"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=tuple(exports.FORMATS), default="csv")
+        parser.add_argument("--since", type=parse_day, help="с даты включительно (YYYY-MM-DD)")
+        parser.add_argument("--until", type=parse_day, help="по дату включительно (YYYY-MM-DD)")
+        parser.add_argument("--output", help="файл; по умолчанию stdout")
+        parser.add_argument("--chunk-size", type=int, default=exports.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **opts):
+        orders = exports.filter_period(Order.objects.all(), opts["since"], opts["until"])
+        chunks = exports.stream(orders, opts["format"], opts["chunk_size"])
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8", newline="") as fh:
+                fh.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,262 @@
+# main/management/commands/generate_synthetic_data.py
+import datetime
+import random
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import Brand, Category, Product, Profile, Order, Notification
+from main import rollups, search
+from main.caching import bump_catalog_version
+from main.signals import build_order_message
+
+# (ru, uz, en) — основа для трёхъязычных названий и описаний
+CATEGORY_BASES = [
+    ("Уход за волосами", "Soch parvarishi", "Hair care"),
+    ("Уход за телом", "Tana parvarishi", "Body care"),
+    ("Уход за лицом", "Yuz parvarishi", "Face care"),
+    ("Гигиена полости рта", "Og'iz gigiyenasi", "Oral care"),
+    ("Декоративная косметика", "Dekorativ kosmetika", "Make-up"),
+    ("Парфюмерия", "Parfyumeriya", "Perfume"),
+    ("Для дома", "Uy uchun", "Home care"),
+    ("Мини-форматы", "Mini formatlar", "Minis"),
+]
+PRODUCT_KINDS = [
+    ("Шампунь", "Shampun", "Shampoo"),
+    ("Кондиционер", "Konditsioner", "Conditioner"),
+    ("Гель для душа", "Dush geli", "Shower gel"),
+    ("Лосьон для тела", "Tana losoni", "Body lotion"),
+    ("Зубная паста", "Tish pastasi", "Toothpaste"),
+    ("Крем для лица", "Yuz kremi", "Face cream"),
+    ("Маска для волос", "Soch niqobi", "Hair mask"),
+    ("Пенка для умывания", "Yuvinish ko'pigi", "Cleansing foam"),
+    ("Сыворотка", "Zardob", "Serum"),
+    ("Скраб", "Skrab", "Scrub"),
+]
+FEATURES = [
+    ("с мятой", "yalpiz bilan", "with mint"),
+    ("с аргановым маслом", "argan yog'i bilan", "with argan oil"),
+    ("для сухой кожи", "quruq teri uchun", "for dry skin"),
+    ("с ароматом розы", "atirgul hidi bilan", "rose scented"),
+    ("для чувствительных дёсен", "sezgir milklar uchun", "for sensitive gums"),
+    ("с кератином", "keratin bilan", "with keratin"),
+    ("увлажняющий", "namlovchi", "moisturizing"),
+]
+BRANDS = [
+    "Perioe", "Elastine", "On The Body", "Veilment", "ON THE NATURAL", "Minis",
+    "Belif", "The Face Shop", "CNP", "Sooryehan", "Whoo", "Sulwhasoo",
+    "Ohui", "Beyond", "VDL", "Dr.Groot", "Bamboo Salt", "Reen", "Tech", "Saffron",
+]
+SIZES = ["50ml", "100ml", "150g", "200ml", "285g", "400ml", "500ml", "1L"]
+FIRST_NAMES = ["Алишер", "Дилноза", "Тимур", "Мадина", "Азиз", "Нигора", "Jasur", "Kamola", "Anna", "Sergey"]
+SURNAMES = ["Каримов", "Юсупова", "Ахмедов", "Рахимова", "Tursunov", "Nazarova", "Ivanov", "Petrova"]
+STREETS = ["Амира Темура", "Мустакиллик", "Навои", "Бабура", "Шота Руставели", "Mirobod", "Chilonzor"]
+PAYMENTS = [code for code, _ in Order.PAYMENT_CHOICES]
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Отключаем auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    fields = [m._meta.get_field("created_at") for m in models]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f in fields:
+            f.auto_now_add = True
+
+
+def chunks(total, size):
+    start = 0
+    while start < total:
+        yield start, min(size, total - start)
+        start += size
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетический каталог, пользователей, профили, заказы и "
+        "уведомления для нагрузочных замеров (bulk insert, воспроизводимо по --seed)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--categories", type=int, default=200)
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--anon-profiles", type=int, default=20_000)
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--anon-order-share", type=float, default=0.4,
+                            help="доля заказов без пользователя")
+        parser.add_argument("--days", type=int, default=365, help="глубина истории заказов")
+        parser.add_argument("--end-date", type=datetime.date.fromisoformat,
+                            help="последний день истории (YYYY-MM-DD), по умолчанию сегодня")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **opts):
+        self.rng = random.Random(opts["seed"])
+        self.batch_size = opts["batch_size"]
+        self.prefix = f"synth{opts['seed']}"
+        if Category.objects.filter(slug__startswith=f"{self.prefix}-").exists():
+            raise CommandError(f"Данные для --seed={opts['seed']} уже сгенерированы")
+
+        started = time.perf_counter()
+        categories = self.make_categories(opts["categories"])
+        products = self.make_products(opts["products"], categories)
+        # bulk_create не шлёт сигналы — счётчики категорий и брендов пересчитываем разом
+        Category.refresh_counters([c.pk for c in categories])
+        Brand.refresh_counters()
+        # и catalog_changed тоже не срабатывал: без новой версии кэши витрины,
+        # индексы каталога и export_feeds не увидят новых товаров
+        bump_catalog_version()
+        users = self.make_users(opts["users"])
+        self.make_anon_profiles(opts["anon_profiles"])
+
+        end = opts["end_date"] or timezone.localdate()
+        end_dt = timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+        self.make_orders(opts["orders"], products, users, opts["anon_order_share"],
+                         end_dt, opts["days"])
+        # итоги продаж тоже без сигналов — пересобираем по всем заказам
+        rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ готово за {time.perf_counter() - started:.1f}s"
+        ))
+
+    # ---------- каталог ------------------------------------------------------
+    def make_categories(self, count):
+        cats = []
+        for i in range(count):
+            ru, uz, en = CATEGORY_BASES[i % len(CATEGORY_BASES)]
+            n = i // len(CATEGORY_BASES) + 1
+            slug = f"{self.prefix}-{en.lower().replace(' ', '-')}-{n}"
+            cats.append(Category(name=f"{ru} {self.prefix}-{n}"[:50], slug=slug))
+        Category.objects.bulk_create(cats, batch_size=self.batch_size)
+        self.stdout.write(f"categories: {len(cats)}")
+        return cats
+
+    def make_products(self, count, categories):
+        rng = self.rng
+        result = []   # (id, title, price) — для позиций заказов
+        brands = {name: Brand.for_name(name) for name in BRANDS}
+        for offset, size in chunks(count, self.batch_size):
+            batch = []
+            for i in range(offset, offset + size):
+                cat = rng.choice(categories)
+                kind = rng.choice(PRODUCT_KINDS)
+                feat = rng.choice(FEATURES)
+                brand = rng.choice(BRANDS)
+                size_label = rng.choice(SIZES)
+                batch.append(Product(
+                    title=f"{brand} {kind[2]} {feat[2]} {size_label} #{i}",
+                    price=rng.randrange(9_000, 450_000, 500),
+                    img=f"products/product{rng.randint(1, 22)}.png",
+                    big_img=f"products/big/bigProduct{rng.randint(1, 22)}.png",
+                    desc_ru=f"{kind[0]} {feat[0]}, {size_label}.",
+                    desc_uz=f"{kind[1]} {feat[1]}, {size_label}.",
+                    desc_en=f"{kind[2]} {feat[2]}, {size_label}.",
+                    desc_full_ru=f"{kind[0]} {brand} {feat[0]}. " * rng.randint(3, 12),
+                    desc_full_uz=f"{brand} {kind[1]} {feat[1]}. " * rng.randint(3, 12),
+                    desc_full_en=f"{brand} {kind[2]} {feat[2]}. " * rng.randint(3, 12),
+                    brand=brands[brand].name,
+                    brand_ref=brands[brand],     # bulk_create не вызывает save()
+                    category=cat,
+                    category_slug=cat.slug,    # bulk_create не вызывает save()
+                    available=rng.random() > 0.1,
+                ))
+            with transaction.atomic():
+                Product.objects.bulk_create(batch)
+            result.extend((p.id, p.title, p.price) for p in batch)
+            self.stdout.write(f"products: {len(result)}/{count}")
+        return result
+
+    # ---------- пользователи -------------------------------------------------
+    def make_users(self, count):
+        User = get_user_model()
+        rng = self.rng
+        result = []   # (user, profile)
+        for offset, size in chunks(count, self.batch_size):
+            users, profiles = [], []
+            for i in range(offset, offset + size):
+                user = User(username=f"{self.prefix}_user{i}", email=f"{self.prefix}_user{i}@example.com")
+                user.set_unusable_password()
+                users.append(user)
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                for user in users:
+                    profiles.append(self.random_profile(user))
+                Profile.objects.bulk_create(profiles)
+            result.extend(zip(users, profiles))
+            self.stdout.write(f"users: {len(result)}/{count}")
+        return result
+
+    def make_anon_profiles(self, count):
+        done = 0
+        for offset, size in chunks(count, self.batch_size):
+            with transaction.atomic():
+                Profile.objects.bulk_create([self.random_profile(None) for _ in range(size)])
+            done += size
+            self.stdout.write(f"anon profiles: {done}/{count}")
+
+    def random_profile(self, user):
+        rng = self.rng
+        return Profile(
+            user=user,
+            name=rng.choice(FIRST_NAMES),
+            surname=rng.choice(SURNAMES),
+            email=user.email if user else "",
+            phone=f"+99890{rng.randint(0, 9_999_999):07d}",
+            address=f"Ташкент, {rng.choice(STREETS)} {rng.randint(1, 200)}",
+            birth_day=rng.randint(1, 28),
+            birth_month=rng.randint(1, 12),
+            birth_year=rng.randint(1960, 2007),
+            gender=rng.choice("MFX"),
+        )
+
+    # ---------- заказы и уведомления -----------------------------------------
+    def make_orders(self, count, products, users, anon_share, end_dt, days):
+        rng = self.rng
+        span = days * 86_400
+        done = 0
+        for offset, size in chunks(count, self.batch_size):
+            orders, profiles = [], []
+            for _ in range(size):
+                n_items = min(len(products), 1 + int(rng.expovariate(0.6)))
+                items = [
+                    {"id": pid, "title": title, "price": price, "quantity": rng.randint(1, 4)}
+                    for pid, title, price in rng.sample(products, n_items)
+                ]
+                user, profile = (None, None) if rng.random() < anon_share or not users else rng.choice(users)
+                source = profile or self.random_profile(None)
+                orders.append(Order(
+                    user=user,
+                    items=items,
+                    payment_method=rng.choice(PAYMENTS),
+                    created_at=end_dt - datetime.timedelta(seconds=rng.randint(1, span)),
+                    customer_name=source.name,
+                    customer_surname=source.surname,
+                    customer_phone=source.phone,
+                    customer_address=source.address,
+                ))
+                profiles.append(profile)
+
+            with explicit_created_at(Order, Notification), transaction.atomic():
+                # bulk_create не шлёт post_save — уведомления создаём сами
+                Order.objects.bulk_create(orders)
+                Notification.objects.bulk_create([
+                    Notification(
+                        notif_type="order",
+                        order=order,
+                        message=build_order_message(order, profile),
+                        created_at=order.created_at,
+                        is_read=rng.random() < 0.7,
+                    )
+                    for order, profile in zip(orders, profiles)
+                ])
+                search.index_orders(order.pk for order in orders)
+            done += size
+            self.stdout.write(f"orders: {done}/{count}")
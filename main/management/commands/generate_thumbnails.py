@@ -0,0 +1,34 @@
+# main/management/commands/generate_thumbnails.py
+from django.core.management.base import BaseCommand
+
+from main.models import Product
+from main.thumbnails import make_thumbnail, thumbnail_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт превью товаров для админки (Product.img_thumb) там, где их нет "
+        "или картинка сменилась в обход save() — импорт, bulk_create"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--force", action="store_true", help="пересоздать все превью")
+
+    def handle(self, *args, **opts):
+        created = skipped = 0
+        products = Product.objects.exclude(img="").exclude(img=None).only("id", "img", "img_thumb")
+        for product in products.iterator(chunk_size=opts["batch_size"]):
+            expected = thumbnail_name(product.img.name)
+            if product.img_thumb.name == expected and not opts["force"]:
+                continue
+            if opts["force"]:
+                product.img.storage.delete(expected)
+            name = make_thumbnail(product.img)
+            if name is None:
+                skipped += 1
+                continue
+            # update() — без сигналов: каталог витрины от превью не меняется
+            Product.objects.filter(pk=product.pk).update(img_thumb=name)
+            created += 1
+        self.stdout.write(f"Превью: создано {created}, оригинал не прочитан {skipped}")
@@ -0,0 +1,120 @@
+# main/management/commands/import_profile.py
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# что импортирует процесс каждого типа на холодном старте
+TARGETS = {
+    # любая manage.py-команда без системных проверок
+    "setup": "import django; django.setup()",
+    # web-воркер до первого ответа: приложение, мидлвари, URLconf (→ views, DRF)
+    "wsgi": (
+        "import KoreanCosmetics.wsgi; "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    "asgi": (
+        "import KoreanCosmetics.asgi; "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+}
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] из вывода python -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль импорта на холодном старте (python -X importtime): суммарное "
+        "время, самые дорогие модули и пакеты. С --budget-ms падает при превышении."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", default="setup",
+                            help=f"{', '.join(TARGETS)} или имя модуля (импортируется после setup)")
+        parser.add_argument("--repeat", type=int, default=5, help="прогонов; берётся медиана")
+        parser.add_argument("--top", type=int, default=25)
+        parser.add_argument("--budget-ms", type=float,
+                            help="порог; по умолчанию IMPORT_TIME_BUDGET_MS[target] из settings")
+        parser.add_argument("--json", action="store_true")
+
+    def _run_once(self, code):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "KoreanCosmetics.settings"))
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, env=env, cwd=str(settings.BASE_DIR),
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip().splitlines()[-1])
+        return wall_ms, parse_importtime(proc.stderr)
+
+    def handle(self, *args, **opts):
+        target = opts["target"]
+        code = TARGETS.get(target) or f"import django; django.setup(); import {target}"
+
+        runs = [self._run_once(code) for _ in range(max(1, opts["repeat"]))]
+        totals = [sum(r[1] for r in rows) / 1000 for _, rows in runs]
+        median_idx = totals.index(sorted(totals)[len(totals) // 2])
+        wall_ms, rows = runs[median_idx]
+        total_ms = totals[median_idx]
+
+        packages = {}
+        for name, self_us, _, _ in rows:
+            top = name.split(".", 1)[0]
+            packages[top] = packages.get(top, 0) + self_us
+        by_module = sorted(rows, key=lambda r: r[2], reverse=True)[:opts["top"]]
+        by_package = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:opts["top"]]
+
+        budgets = getattr(settings, "IMPORT_TIME_BUDGET_MS", {})
+        budget = opts["budget_ms"] if opts["budget_ms"] is not None else budgets.get(target)
+
+        report = {
+            "target": target,
+            "modules": len(rows),
+            "import_ms": round(total_ms, 1),
+            "import_ms_runs": [round(t, 1) for t in totals],
+            "process_wall_ms": round(wall_ms, 1),
+            "median_process_wall_ms": round(statistics.median(r[0] for r in runs), 1),
+            "budget_ms": budget,
+            "top_modules": [
+                {"module": n, "cumulative_ms": round(c / 1000, 2), "self_ms": round(s / 1000, 2)}
+                for n, s, c, _ in by_module
+            ],
+            "top_packages": [{"package": p, "self_ms": round(us / 1000, 2)} for p, us in by_package],
+        }
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(
+                f"{target}: {len(rows)} modules, import {report['import_ms']}ms "
+                f"(process {report['process_wall_ms']}ms)"
+            )
+            self.stdout.write("\nTop packages (self):")
+            for item in report["top_packages"]:
+                self.stdout.write(f"  {item['self_ms']:>8.2f}ms  {item['package']}")
+            self.stdout.write("\nTop modules (cumulative):")
+            for item in report["top_modules"]:
+                self.stdout.write(f"  {item['cumulative_ms']:>8.2f}ms  {item['module']}")
+
+        if budget is not None and total_ms > budget:
+            raise CommandError(f"{target}: import {total_ms:.1f}ms > budget {budget}ms")
@@ -0,0 +1,84 @@
+# main/management/commands/loadreplay.py
+import json
+import pathlib
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main import loadreplay
+
+
+def parse_mix(value):
+    """'catalog=30,product=20' → {'catalog': 30, 'product': 20}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in loadreplay.DEFAULT_MIX:
+            raise CommandError(f"неизвестный сценарий: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Гоняет взвешенную смесь запросов через WSGI/ASGI-приложение в процессе "
+        "и печатает JSON: rps, перцентили задержек и ошибки по эндпоинтам. "
+        "Пишет в текущую базу (заказы, профили) — запускайте на копии."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=("wsgi", "asgi"), default="wsgi")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--warmup", type=int, default=100, help="запросы вне статистики")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--mix", type=parse_mix, help="веса, напр. catalog=30,product=20,order=5")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="записать JSON в файл")
+
+    def handle(self, *args, **opts):
+        mix = opts["mix"] or loadreplay.DEFAULT_MIX
+        try:
+            scenario = loadreplay.Scenario(mix, seed=opts["seed"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        auth_cookie = loadreplay.bench_session_cookie()
+        warmup = [scenario.next() for _ in range(opts["warmup"])]
+        calls = [scenario.next() for _ in range(opts["requests"])]
+        # соединение команды больше не нужно; у воркеров будут свои
+        connection.close()
+
+        if opts["mode"] == "wsgi":
+            from KoreanCosmetics.wsgi import application
+            driver = loadreplay.WsgiDriver(application, opts["concurrency"], auth_cookie)
+        else:
+            from KoreanCosmetics.asgi import application
+            driver = loadreplay.AsgiDriver(application, opts["concurrency"], auth_cookie)
+
+        driver.run(warmup, None)
+        results = loadreplay.Results()
+        started = time.perf_counter()
+        driver.run(calls, results)
+        report = results.report(time.perf_counter() - started)
+        report.update(
+            mode=opts["mode"],
+            concurrency=opts["concurrency"],
+            mix=mix,
+            seed=opts["seed"],
+            commit=self._commit(),
+        )
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if opts["output"]:
+            pathlib.Path(opts["output"]).write_text(payload + "\n", encoding="utf-8")
+        self.stdout.write(payload)
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,77 @@
+# main/management/commands/perf_query_report.py
+import json
+import pathlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Сводка по логу медленных и повторяющихся (N+1) запросов"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=str(getattr(settings, "PERF_QUERY_LOG", "perf_queries.jsonl")),
+                            help="путь к JSONL-логу (ротированные .1, .2 … читаются тоже)")
+        parser.add_argument("--kind", choices=("slow", "duplicate"), help="только один тип записей")
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--json", action="store_true", help="вывести сводку как JSON")
+
+    def _log_files(self, path):
+        base = pathlib.Path(path)
+        files = sorted(base.parent.glob(base.name + ".*"), reverse=True)
+        if base.exists():
+            files.append(base)
+        return [f for f in files if f.suffix.lstrip(".").isdigit() or f == base]
+
+    def handle(self, *args, **opts):
+        groups = {}
+        for path in self._log_files(opts["log"]):
+            with path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if opts["kind"] and rec.get("kind") != opts["kind"]:
+                        continue
+                    key = (rec.get("kind"), rec.get("sql"))
+                    g = groups.get(key)
+                    if g is None:
+                        g = groups[key] = {
+                            "kind": key[0], "sql": key[1], "events": 0, "queries": 0,
+                            "total_ms": 0.0, "max_ms": 0.0,
+                            "routes": Counter(), "frames": Counter(),
+                        }
+                    g["events"] += 1
+                    g["queries"] += rec.get("count", 1)
+                    g["total_ms"] += rec.get("ms", 0.0)
+                    g["max_ms"] = max(g["max_ms"], rec.get("ms", 0.0))
+                    g["routes"][rec.get("route")] += 1
+                    if rec.get("frame"):
+                        g["frames"][rec["frame"]] += 1
+
+        top = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:opts["top"]]
+        for g in top:
+            g["total_ms"] = round(g["total_ms"], 3)
+            g["routes"] = dict(g["routes"].most_common(5))
+            g["frames"] = dict(g["frames"].most_common(3))
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(top, ensure_ascii=False, indent=2))
+            return
+
+        if not top:
+            self.stdout.write("Лог пуст")
+            return
+        for g in top:
+            self.stdout.write(self.style.WARNING(
+                f"[{g['kind']}] events={g['events']} queries={g['queries']} "
+                f"total={g['total_ms']}ms max={round(g['max_ms'], 3)}ms"
+            ))
+            self.stdout.write(f"  {g['sql'][:300]}")
+            for route, n in g["routes"].items():
+                self.stdout.write(f"  route: {route} ×{n}")
+            for frame, n in g["frames"].items():
+                self.stdout.write(f"  at: {frame} ×{n}")
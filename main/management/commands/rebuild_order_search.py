@@ -0,0 +1,22 @@
+# main/management/commands/rebuild_order_search.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает FTS5-индекс поиска заказов (main_order_search) — после "
+        "массовой загрузки заказов или правок в обход сигналов"
+    )
+
+    def handle(self, *args, **opts):
+        if not search.available():
+            raise CommandError("поиск заказов через FTS5 есть только на SQLite")
+        started = time.perf_counter()
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(f"Индекс поиска заказов перестроен за {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,37 @@
+# main/management/commands/reconcile_category_counters.py
+from django.core.management.base import BaseCommand
+
+from main.models import Brand, Category
+
+COUNTER_FIELDS = ("product_count", "min_price", "max_price")
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики товаров и цены у категорий и брендов (после bulk-операций)"
+
+    def handle(self, *args, **kwargs):
+        before = {c["pk"]: c for c in Category.objects.values("pk", *COUNTER_FIELDS)}
+        Category.refresh_counters()
+        drifted = [
+            c for c in Category.objects.values("pk", "slug", *COUNTER_FIELDS)
+            if any(before.get(c["pk"], {}).get(f) != c[f] for f in COUNTER_FIELDS)
+        ]
+        for c in drifted[:20]:
+            old = before[c["pk"]]
+            self.stdout.write(
+                f"  {c['slug']}: count {old['product_count']} → {c['product_count']}, "
+                f"price {old['min_price']}–{old['max_price']} → {c['min_price']}–{c['max_price']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(before)} categories, fixed {len(drifted)}"
+        ))
+
+        brands_before = dict(Brand.objects.values_list("pk", "product_count"))
+        Brand.refresh_counters()
+        fixed = sum(
+            brands_before.get(pk) != count
+            for pk, count in Brand.objects.values_list("pk", "product_count")
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(brands_before)} brands, fixed {fixed}"
+        ))
@@ -0,0 +1,317 @@
+# main/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.middleware import clickjacking, common, csrf, locale, security
+from django.urls import resolve
+from django.utils import translation
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+
+from . import perf
+from .caching import acatalog_version, catalog_version, response_key
+from .i18n import LANG_PARAM, query_language, request_language
+
+
+class PerformanceMiddleware:
+    """
+    Меряет каждый запрос: общее время, число и время SQL, время сериализации
+    DRF и размер ответа. Отдаёт это в заголовке Server-Timing и копит
+    гистограммы по маршрутам (см. /api/perf/).
+    При PERF_QUERY_INSPECTOR пишет медленные и повторяющиеся (N+1) запросы
+    в лог main.perf.queries.
+    Ставить первым в MIDDLEWARE, чтобы учитывать и остальные мидлвари.
+    Умеет и sync, и async: под ASGI не заставляет всю цепочку уходить в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PERF_INSTRUMENTATION", True)
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", True)
+        self.inspect_queries = getattr(settings, "PERF_QUERY_INSPECTOR", False)
+        self.slow_query_ms = getattr(settings, "PERF_SLOW_QUERY_MS", 100)
+        self.duplicate_threshold = getattr(settings, "PERF_DUPLICATE_QUERY_THRESHOLD", 5)
+        self.project_root = str(settings.BASE_DIR)
+        # под ASGI цепочка async: SQL async-вьюх идёт в потоках asgiref со своими
+        # соединениями, поэтому хук вешаем на каждое новое соединение
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            if self.enabled:
+                connection_created.connect(perf.install_query_hook_on_created, dispatch_uid="perf-query-hook")
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics, token = self._start()
+        try:
+            with perf.query_hook(connection):
+                response = self.get_response(request)
+        finally:
+            perf.finish_request(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        metrics, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.finish_request(token)
+        return self._finish(request, response, metrics)
+
+    def _start(self):
+        inspector = None
+        if self.inspect_queries:
+            inspector = perf.QueryInspector(
+                self.slow_query_ms, self.duplicate_threshold, self.project_root
+            )
+        return perf.start_request(inspector)
+
+    def _finish(self, request, response, metrics):
+        wall_ms = metrics.elapsed()
+        size = None if response.streaming else len(response.content)
+        route = perf.route_name(request)
+        perf.registry.record(route, metrics, wall_ms, size)
+        perf.report_queries(metrics, route, request)
+        if self.server_timing:
+            response["Server-Timing"] = perf.server_timing(metrics, wall_ms)
+        return response
+
+
+class InlineAsyncMixin:
+    """
+    Для стандартных мидлварей Django, которые только читают и пишут заголовки.
+    Под ASGI MiddlewareMixin гоняет каждый process_request/process_response
+    через sync_to_async — переход в поток и обратно (~0.1 мс) ради пары
+    проверок. Здесь они вызываются прямо в event loop, как это делает
+    corsheaders.CorsMiddleware. Под WSGI ничего не меняется.
+    Для мидлварей с походом в базу (сессии, сообщения) не годится.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response) and hasattr(self, "process_view"):
+            # handler смотрит, корутина ли process_view: синхронную зовёт через поток
+            sync_process_view = self.process_view
+
+            async def process_view(request, view_func, view_args, view_kwargs):
+                return sync_process_view(request, view_func, view_args, view_kwargs)
+
+            self.process_view = process_view
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, "process_request"):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, "process_response"):
+            response = self.process_response(request, response)
+        return response
+
+
+def is_stateless(request):
+    """GET/HEAD на STATELESS_PATHS: ответ не зависит ни от сессии, ни от пользователя."""
+    stateless = getattr(request, "_stateless", None)
+    if stateless is None:
+        stateless = request.method in ("GET", "HEAD") and request.path_info.startswith(
+            tuple(getattr(settings, "STATELESS_PATHS", ()))
+        )
+        request._stateless = stateless
+    return stateless
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+class StatefulOnlyMixin:
+    """
+    Сессия, пользователь и сообщения — только для запросов, которым они нужны.
+    На stateless-запросах (каталог, новости) мидлварь сразу отдаёт запрос
+    дальше: ни чтения сессии из базы, ни Set-Cookie и Vary: Cookie в ответе,
+    а под ASGI — ни одного перехода в поток.
+    """
+
+    def __call__(self, request):
+        if is_stateless(request):
+            self.skip(request)
+            # в async-режиме это корутина — её дождётся вызывающий
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def skip(self, request):
+        pass
+
+
+class SecurityMiddleware(InlineAsyncMixin, security.SecurityMiddleware):
+    pass
+
+
+class CommonMiddleware(InlineAsyncMixin, common.CommonMiddleware):
+    pass
+
+
+class LocaleMiddleware(InlineAsyncMixin, locale.LocaleMiddleware):
+    """
+    Плюс ?lang=: язык в самом URL сильнее Accept-Language. Такой ответ от
+    заголовков запроса не зависит, поэтому Vary: Accept-Language на нём нет —
+    прокси держит одну копию на URL.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        lang = query_language(request)
+        if lang:
+            translation.activate(lang)
+            request.LANGUAGE_CODE = lang
+
+    def process_response(self, request, response):
+        if query_language(request):
+            response.headers.setdefault("Content-Language", translation.get_language())
+            return response
+        return super().process_response(request, response)
+
+
+class CsrfViewMiddleware(InlineAsyncMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class SessionMiddleware(StatefulOnlyMixin, sessions.SessionMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(StatefulOnlyMixin, InlineAsyncMixin, auth.AuthenticationMiddleware):
+    # process_request только вешает ленивые request.user / request.auser
+
+    def skip(self, request):
+        # без сессии пользователя не узнать: на stateless-путях всегда аноним
+        request.user = AnonymousUser()
+        request.auser = _anonymous_user
+
+
+class MessageMiddleware(StatefulOnlyMixin, messages.MessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(InlineAsyncMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
+
+
+class ResponseCacheMiddleware:
+    """
+    Общий кэш готовых JSON-ответов для GET на STATELESS_PATHS: они одинаковы
+    для всех посетителей с одним языком. Ставить сразу после LocaleMiddleware.
+
+    Ключ — версия каталога + язык, уже сведённый к одному из LANGUAGES
+    (не сырой Accept-Language: «ru», «ru-RU,ru;q=0.9» и «ru;q=1» — одна
+    запись), + хост, путь и параметры без lang (см. caching.response_key).
+    Изменение каталога поднимает версию, и старые ответы больше не читаются.
+
+    Для прокси/CDN ответ получает Cache-Control: public, max-age и
+    Vary: Accept-Language (от LocaleMiddleware) — но прокси делит кэш по
+    сырому заголовку. Поэтому у ответа без ?lang= есть Content-Location
+    на канонический URL с ?lang=xx: у него Vary по языку нет, и клиент,
+    который ходит на него, получает одну копию на язык.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "RESPONSE_CACHE", True)
+        self.max_age = getattr(settings, "RESPONSE_CACHE_MAX_AGE", 60)
+        self.max_size = getattr(settings, "RESPONSE_CACHE_MAX_SIZE", 1_000_000)
+        self.timeout = getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._cacheable(request):
+            return self.get_response(request)
+
+        key = response_key(catalog_version(), request_language(request), request)
+        response = cache.get(key)
+        if response is not None:
+            return self._hit(request, response)
+        response = self.get_response(request)
+        if self._shareable(response):
+            if self._prepare(response):
+                cache.set(key, response, self.timeout)
+            self._locate(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self._cacheable(request):
+            return await self.get_response(request)
+
+        key = response_key(await acatalog_version(), request_language(request), request)
+        response = await cache.aget(key)
+        if response is not None:
+            return self._hit(request, response)
+        response = await self.get_response(request)
+        if self._shareable(response):
+            if self._prepare(response):
+                await cache.aset(key, response, self.timeout)
+            self._locate(request, response)
+        return response
+
+    def _cacheable(self, request):
+        # HEAD не кэшируем (пустое тело под тем же ключом), browsable API — тоже
+        return (
+            self.enabled
+            and request.method == "GET"
+            and is_stateless(request)
+            and "format" not in request.GET
+            and "text/html" not in request.headers.get("Accept", "")
+        )
+
+    def _hit(self, request, response):
+        # вьюха не вызывалась — маршрут для метрик PerformanceMiddleware
+        request.resolver_match = resolve(request.path_info, getattr(request, "urlconf", None))
+        self._locate(request, response)
+        return response
+
+    @staticmethod
+    def _shareable(response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not response.has_header("Cache-Control")
+            and response.get("Content-Type", "").startswith("application/json")
+        )
+
+    def _prepare(self, response):
+        """Заголовки для общих кэшей; True — ответ можно положить в свой кэш."""
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return len(response.content) <= self.max_size
+
+    @staticmethod
+    def _locate(request, response):
+        # запись в кэше общая для ?lang= и согласованного языка — заголовок не храним
+        if query_language(request):
+            return
+        query = sorted(
+            (name, values) for name, values in request.GET.lists() if name != LANG_PARAM
+        )
+        query.append((LANG_PARAM, request_language(request)))
+        response["Content-Location"] = f"{request.path}?{urlencode(query, doseq=True)}"
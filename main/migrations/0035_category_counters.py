@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:51
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Category = apps.get_model('main', 'Category')
+    Product = apps.get_model('main', 'Product')
+    available = Product.objects.filter(
+        category=models.OuterRef('pk'), available=True
+    ).order_by().values('category')
+    Category.objects.update(
+        product_count=Coalesce(
+            models.Subquery(available.annotate(n=models.Count('pk')).values('n')), 0
+        ),
+        min_price=models.Subquery(available.annotate(p=models.Min('price')).values('p')),
+        max_price=models.Subquery(available.annotate(p=models.Max('price')).values('p')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_alter_order_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='max_price',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Макс. цена'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='min_price',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Мин. цена'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Товаров в наличии'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0036_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-is_featured', '-created_at'], name='news_featured_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-created_at', '-id'], name='news_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0037_news_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='img_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='thumbs/', verbose_name='Превью'),
+        ),
+    ]
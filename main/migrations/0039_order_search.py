@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+from django.db import migrations
+
+# SQL зафиксирован здесь, а не берётся из main.search: миграция должна
+# создавать ровно ту таблицу, что была на момент её написания.
+SEARCH_TABLE = 'main_order_search'
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS main_order_search USING fts5(
+    number, customer, phone, address, items,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+BACKFILL_SQL = """
+INSERT OR REPLACE INTO main_order_search (rowid, number, customer, phone, address, items)
+SELECT o.id,
+       o.id,
+       ifnull(o.customer_name, '') || ' ' || ifnull(o.customer_surname, '') || ' '
+           || ifnull(p.name, '') || ' ' || ifnull(p.surname, '') || ' ' || ifnull(u.username, ''),
+       ifnull(o.customer_phone, '') || ' '
+           || ifnull(replace(replace(replace(replace(replace(o.customer_phone, '+', ''), ' ', ''), '-', ''), '(', ''), ')', ''), '') || ' '
+           || ifnull(p.phone, '') || ' '
+           || ifnull(replace(replace(replace(replace(replace(p.phone, '+', ''), ' ', ''), '-', ''), '(', ''), ')', ''), ''),
+       ifnull(o.customer_address, '') || ' ' || ifnull(p.address, ''),
+       (SELECT group_concat(json_extract(i.value, '$.title'), ' ')
+          FROM json_each(o.items) AS i WHERE i.type = 'object')
+  FROM main_order AS o
+  LEFT JOIN auth_user AS u ON u.id = o.user_id
+  LEFT JOIN main_profile AS p ON p.user_id = o.user_id
+"""
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0038_product_img_thumb'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
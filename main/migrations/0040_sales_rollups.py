@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0039_order_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('units', models.IntegerField(default=0, verbose_name='Штук')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка, UZS')),
+                ('category_id', models.PositiveIntegerField(verbose_name='ID категории')),
+            ],
+            options={
+                'verbose_name': 'Продажи категории за день',
+                'verbose_name_plural': 'Продажи категорий по дням',
+                'ordering': ['-day'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('day', 'category_id'), name='daily_category_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('units', models.IntegerField(default=0, verbose_name='Штук')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка, UZS')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличными'), ('payme', 'Payme'), ('click', 'Click'), ('apelsin', 'Apelsin')], max_length=20, verbose_name='Способ оплаты')),
+            ],
+            options={
+                'verbose_name': 'Продажи по способу оплаты за день',
+                'verbose_name_plural': 'Продажи по дням',
+                'ordering': ['-day'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('day', 'payment_method'), name='daily_payment_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('units', models.IntegerField(default=0, verbose_name='Штук')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Выручка, UZS')),
+                ('product_id', models.PositiveIntegerField(verbose_name='ID товара')),
+            ],
+            options={
+                'verbose_name': 'Продажи товара за день',
+                'verbose_name_plural': 'Продажи товаров по дням',
+                'ordering': ['-day'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('day', 'product_id'), name='daily_product_sales_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0041_order_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Остаток'),
+        ),
+    ]
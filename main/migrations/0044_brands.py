@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:24
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+
+def brand_key(name):
+    # копия Brand.key: в миграции методов модели нет
+    name = " ".join(name.split())
+    return slugify(name, allow_unicode=True) or "brand-" + hashlib.md5(
+        name.casefold().encode(), usedforsecurity=False
+    ).hexdigest()[:12]
+
+
+def deduplicate_brands(apps, schema_editor):
+    """
+    Все варианты написания (регистр, пробелы, пунктуация) → одна запись Brand
+    с самым частым написанием. Один UPDATE на вариант, не на товар.
+    """
+    Brand = apps.get_model('main', 'Brand')
+    Product = apps.get_model('main', 'Product')
+
+    variants = {}
+    for name, count in (
+        Product.objects.exclude(brand='').order_by().values_list('brand')
+        .annotate(n=Count('pk')).values_list('brand', 'n')
+    ):
+        if name.strip():
+            variants.setdefault(brand_key(name), []).append((name, count))
+
+    canonical = {
+        key: " ".join(min(names, key=lambda item: (-item[1], item[0]))[0].split())
+        for key, names in variants.items()
+    }
+    Brand.objects.bulk_create(
+        [Brand(name=name, slug=key) for key, name in canonical.items()], batch_size=500
+    )
+    ids = dict(Brand.objects.values_list('slug', 'pk'))
+    for key, names in variants.items():
+        Product.objects.filter(brand__in=[name for name, _ in names]).update(
+            brand_ref_id=ids[key], brand=canonical[key]
+        )
+
+    available = Product.objects.filter(
+        brand_ref=OuterRef('pk'), available=True
+    ).order_by().values('brand_ref')
+    Brand.objects.update(product_count=Coalesce(
+        Subquery(available.annotate(n=Count('pk')).values('n')), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0043_product_price_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Brand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(allow_unicode=True, max_length=120, unique=True)),
+                ('product_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Товаров в наличии')),
+            ],
+            options={
+                'verbose_name': 'Бренд',
+                'verbose_name_plural': 'Бренды',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='brand_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='main.brand', verbose_name='Бренд (справочник)'),
+        ),
+        migrations.RunPython(deduplicate_brands, migrations.RunPython.noop),
+    ]
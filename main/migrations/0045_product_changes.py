@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0044_brands'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveBigIntegerField(unique=True, verbose_name='Товар')),
+                ('deleted_at', models.DateTimeField(db_index=True, verbose_name='Удалён')),
+            ],
+            options={
+                'verbose_name': 'Удалённый товар',
+                'verbose_name_plural': 'Удалённые товары',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменён'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:02
+
+import hashlib
+
+from django.db import migrations
+
+
+def rekey_blank_brand(apps, schema_editor):
+    """
+    Бренд с пустым slug (название из одной пунктуации) получает ключ как в
+    новом Brand.key. Если под ним уже слиплись разные бренды, разделить их
+    нельзя: текст brand у товаров уже приведён к одному названию.
+    """
+    Brand = apps.get_model('main', 'Brand')
+    for brand in Brand.objects.filter(slug=''):
+        name = " ".join(brand.name.split())
+        brand.slug = "brand-" + hashlib.md5(name.casefold().encode(), usedforsecurity=False).hexdigest()[:12]
+        brand.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0045_product_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_blank_brand, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 # main/models.py
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -10,6 +14,11 @@ class Category(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True, blank=True, null=True)  # nullable → False\
 
+    # денормализованные счётчики по доступным товарам (см. refresh_counters)
+    product_count = models.PositiveIntegerField(_("Товаров в наличии"), default=0, editable=False)
+    min_price = models.PositiveIntegerField(_("Мин. цена"), null=True, blank=True, editable=False)
+    max_price = models.PositiveIntegerField(_("Макс. цена"), null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name = _('Категория')
         verbose_name_plural = _('Категории')
@@ -18,7 +27,80 @@ class Category(models.Model):
         # если slug не задали руками ― строим из name
         if not self.slug:
             self.slug = slugify(self.name)
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        # товары фильтруются по своей копии slug (индекс available+category_slug+price)
+        if not adding:
+            self.products.exclude(category_slug=self.slug).update(
+                category_slug=self.slug, updated_at=timezone.now()
+            )
+
+    @classmethod
+    def refresh_counters(cls, category_ids=None):
+        """
+        Пересчитать product_count / min_price / max_price одним UPDATE
+        с коррелированными подзапросами. category_ids=None — все категории.
+        """
+        available = Product.objects.filter(
+            category=models.OuterRef('pk'), available=True
+        ).order_by().values('category')
+        qs = cls.objects.all()
+        if category_ids is not None:
+            qs = qs.filter(pk__in=[pk for pk in category_ids if pk is not None])
+        return qs.update(
+            product_count=Coalesce(
+                models.Subquery(available.annotate(n=models.Count('pk')).values('n')), 0
+            ),
+            min_price=models.Subquery(available.annotate(p=models.Min('price')).values('p')),
+            max_price=models.Subquery(available.annotate(p=models.Max('price')).values('p')),
+        )
+
+    def __str__(self):
+        return self.name
+
+
+class Brand(models.Model):
+    """
+    Справочник брендов. Product.brand остаётся текстом для API и фидов,
+    но совпадает с Brand.name; фильтр по бренду идёт по brand_ref_id.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    # ключ склейки вариантов написания: «Perioe», «PERIOE », «perioe» → perioe
+    slug = models.SlugField(max_length=120, unique=True, allow_unicode=True)
+    product_count = models.PositiveIntegerField(_("Товаров в наличии"), default=0, editable=False)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _('Бренд')
+        verbose_name_plural = _('Бренды')
+
+    @staticmethod
+    def key(name):
+        name = " ".join(name.split())
+        # из одной пунктуации slugify даёт "" — такие бренды не должны слипаться в один
+        return slugify(name, allow_unicode=True) or "brand-" + hashlib.md5(
+            name.casefold().encode(), usedforsecurity=False
+        ).hexdigest()[:12]
+
+    @classmethod
+    def for_name(cls, name):
+        """Бренд по любому варианту написания; новый — с этим написанием."""
+        name = " ".join(name.split())
+        brand, _ = cls.objects.get_or_create(slug=cls.key(name), defaults={"name": name})
+        return brand
+
+    @classmethod
+    def refresh_counters(cls, brand_ids=None):
+        """Как Category.refresh_counters: один UPDATE с подзапросом."""
+        available = Product.objects.filter(
+            brand_ref=models.OuterRef('pk'), available=True
+        ).order_by().values('brand_ref')
+        qs = cls.objects.all()
+        if brand_ids is not None:
+            qs = qs.filter(pk__in=[pk for pk in brand_ids if pk is not None])
+        return qs.update(product_count=Coalesce(
+            models.Subquery(available.annotate(n=models.Count('pk')).values('n')), 0
+        ))
 
     def __str__(self):
         return self.name
@@ -41,6 +123,14 @@ class Product(models.Model):
         blank=True,
         null=True
     )
+    # превью для списка в админке (main/thumbnails.py), заполняется само
+    img_thumb = models.ImageField(
+        _("Превью"),
+        upload_to="thumbs/",
+        blank=True,
+        null=True,
+        editable=False
+    )
 
     # краткие описания
     desc_ru = models.TextField(_("Краткое описание (RU)"), blank=True)
@@ -53,6 +143,16 @@ class Product(models.Model):
     desc_full_en = models.TextField(_("Полное описание (EN)"), blank=True)
 
     brand = models.CharField(max_length=100, blank=True)
+    # заполняется в save() по тексту brand
+    brand_ref = models.ForeignKey(
+        Brand,
+        verbose_name=_("Бренд (справочник)"),
+        on_delete=models.PROTECT,
+        related_name="products",
+        null=True,
+        blank=True,
+        editable=False,
+    )
     category = models.ForeignKey(
         Category,
         on_delete=models.PROTECT,
@@ -65,17 +165,54 @@ class Product(models.Model):
     )
 
     available = models.BooleanField(default=True)
+    # для /api/products/changes/ — ставится при save(); массовые UPDATE выставляют сами
+    updated_at = models.DateTimeField(_("Изменён"), auto_now=True, db_index=True)
+    # остаток на складе; пусто — не учитывается (товар без ограничения)
+    stock = models.PositiveIntegerField(_("Остаток"), null=True, blank=True)
 
     class Meta:
         ordering = ['id']
         verbose_name = _('Товар')
         verbose_name_plural = _('Товары')
+        indexes = [
+            # витрина: ?category=…&price_min=…&price_max=… — диапазон по одному индексу.
+            # available — условием, а не первой колонкой: filter(available=True) в SQLite
+            # превращается в голое WHERE "available", и по колонке индекса его не ищут
+            models.Index(
+                fields=['category_slug', 'price'], name='product_cat_price_idx',
+                condition=models.Q(available=True),
+            ),
+            models.Index(fields=['price'], name='product_price_idx', condition=models.Q(available=True)),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_refs()
+        return instance
+
+    def _remember_refs(self):
+        # категория и бренд, с которыми товар лежит в базе: при переносе счётчики
+        # (signals.update_category_counters) пересчитываются и у прежних.
+        # Отложенные поля (.only/.defer) не читаем — их поправит reconcile_category_counters
+        self._old_category_id = self.__dict__.get("category_id")
+        self._old_brand_id = self.__dict__.get("brand_ref_id")
 
     def save(self, *args, **kwargs):
-        # поддерживаем синхронизацию с категорией
-        if self.category:
-            self.category_slug = self.category.slug
-        super().save(*args, **kwargs)
+        # счётчики категорий и брендов пересчитываются в post_save — в той же транзакции
+        with transaction.atomic(using=kwargs.get("using")):
+            # поддерживаем синхронизацию с категорией
+            if self.category:
+                self.category_slug = self.category.slug
+            # бренд — запись справочника, текст приводим к её написанию
+            self.brand_ref = Brand.for_name(self.brand) if self.brand.strip() else None
+            if self.brand_ref:
+                self.brand = self.brand_ref.name
+            # закончился — снимаем с витрины (так же делает резервирование в main/stock.py)
+            if self.stock == 0:
+                self.available = False
+            super().save(*args, **kwargs)
+        self._remember_refs()
 
     def __str__(self):
         return self.title
@@ -158,6 +295,10 @@ class Order(models.Model):
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        indexes = [
+            # выгрузки и отчёты за период (main/exports.py)
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
 class Notification(models.Model):
     TYPE_CHOICES = [
         ("order", "Новый заказ"),
@@ -212,7 +353,108 @@ class News(models.Model):
         verbose_name = _("Новость")
         verbose_name_plural = _("Новости")
         ordering = ["-is_featured", "-created_at"]
+        indexes = [
+            # список /api/news/ и карусель (is_featured=True по дате)
+            models.Index(fields=["-is_featured", "-created_at"], name="news_featured_created_idx"),
+            # архив: keyset-пагинация по дате
+            models.Index(fields=["-created_at", "-id"], name="news_created_idx"),
+        ]
 
     def __str__(self):
         # Всегда возвращаем непустую строку
         return self.title_ru or self.title_en or self.title_uz or f"Новость #{self.pk}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Единственная строка-счётчик: растёт при любом изменении товаров, категорий
+    и новостей. Входит в ключи кэша каталога (см. main/caching.py).
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Версия каталога")
+        verbose_name_plural = _("Версия каталога")
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        """Поднять версию и вернуть новую (читается в той же транзакции — это наша)."""
+        if not cls.objects.filter(pk=1).update(version=models.F("version") + 1):
+            return cls.objects.get_or_create(pk=1, defaults={"version": 1})[0].version
+        return cls.current()
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class ProductTombstone(models.Model):
+    """
+    Удалённые товары — чтобы /api/products/changes/ мог сказать клиенту
+    «этого больше нет». Хранятся PRODUCT_TOMBSTONE_DAYS, дальше клиенту
+    с таким старым токеном нужна полная синхронизация.
+    """
+    product_id = models.PositiveBigIntegerField(_("Товар"), unique=True)
+    deleted_at = models.DateTimeField(_("Удалён"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Удалённый товар")
+        verbose_name_plural = _("Удалённые товары")
+
+    def __str__(self):
+        return f"#{self.product_id} @ {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class SalesRollup(models.Model):
+    """
+    Дневные итоги продаж (main/rollups.py): обновляются при создании
+    и удалении заказа, целиком пересобираются командой rebuild_sales_rollups.
+    """
+    day = models.DateField(_("День"))
+    # без Positive: вычитание удалённого заказа идёт тем же upsert
+    orders = models.IntegerField(_("Заказов"), default=0)
+    units = models.IntegerField(_("Штук"), default=0)
+    revenue = models.BigIntegerField(_("Выручка, UZS"), default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ["-day"]
+
+
+class DailyProductSales(SalesRollup):
+    # id из Order.items — товар мог быть удалён, поэтому не ForeignKey
+    product_id = models.PositiveIntegerField(_("ID товара"))
+
+    class Meta(SalesRollup.Meta):
+        verbose_name = _("Продажи товара за день")
+        verbose_name_plural = _("Продажи товаров по дням")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product_id"], name="daily_product_sales_uniq"),
+        ]
+
+
+class DailyCategorySales(SalesRollup):
+    # 0 — товар без известной категории
+    category_id = models.PositiveIntegerField(_("ID категории"))
+
+    class Meta(SalesRollup.Meta):
+        verbose_name = _("Продажи категории за день")
+        verbose_name_plural = _("Продажи категорий по дням")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category_id"], name="daily_category_sales_uniq"),
+        ]
+
+
+class DailyPaymentSales(SalesRollup):
+    payment_method = models.CharField(_("Способ оплаты"), max_length=20, choices=Order.PAYMENT_CHOICES)
+
+    class Meta(SalesRollup.Meta):
+        verbose_name = _("Продажи по способу оплаты за день")
+        verbose_name_plural = _("Продажи по дням")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "payment_method"], name="daily_payment_sales_uniq"),
+        ]
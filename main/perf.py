@@ -0,0 +1,344 @@
+# main/perf.py
+"""
+Инструментация производительности.
+
+На каждый запрос PerformanceMiddleware заводит RequestMetrics и кладёт его в
+contextvar; хук execute_wrapper на соединении (ставится на время запроса)
+и TimedSerializerMixin дописывают туда время SQL и сериализации. По
+завершении запроса метрики сливаются в гистограммы маршрута (по имени URL:
+product-list, api_order_create, …).
+
+Если включён детектор запросов, хук дополнительно собирает медленные запросы
+и повторяющиеся формы SQL (N+1) и в конце запроса пишет их JSON-строками в
+логгер "main.perf.queries" (в settings — RotatingFileHandler).
+"""
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+_current = ContextVar("perf_metrics", default=None)
+
+query_logger = logging.getLogger("main.perf.queries")
+
+
+class RequestMetrics:
+    """Метрики одного запроса (миллисекунды / байты)."""
+
+    __slots__ = (
+        "started", "db_time", "db_queries", "serializer_time", "_ser_depth",
+        "inspector",
+    )
+
+    def __init__(self, inspector=None):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.serializer_time = 0.0
+        self._ser_depth = 0
+        self.inspector = inspector
+
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request(inspector=None):
+    metrics = RequestMetrics(inspector)
+    token = _current.set(metrics)
+    return metrics, token
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+# ---------- хук на SQL -------------------------------------------------------
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        metrics.db_time += duration
+        metrics.db_queries += 1
+        if metrics.inspector is not None:
+            metrics.inspector.observe(sql, duration)
+
+
+def query_hook(connection):
+    """Хук на время одного запроса: with perf.query_hook(connection): …"""
+    if _execute_wrapper in connection.execute_wrappers:
+        # уже стоит (соединение из потока ASGI, см. ниже) — второй раз не считаем
+        return contextlib.nullcontext()
+    return connection.execute_wrapper(_execute_wrapper)
+
+
+def install_query_hook_on_created(sender, connection, **kwargs):
+    """
+    Обработчик connection_created для async-цепочки: SQL идёт в потоке asgiref
+    со своим соединением (у каждого запроса — свой поток), и with из event loop
+    туда не дотянуться. Хук ставим первым: connection.execute_wrapper() снимает
+    последний элемент списка, и чужой with должен снять свой, а не наш.
+    """
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute_wrapper)
+
+
+# ---------- детектор медленных и повторяющихся запросов ---------------------
+
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.join(_HERE, "perf.py"), os.path.join(_HERE, "middleware.py")}
+
+
+def sql_shape(sql):
+    """Форма запроса: списки IN (%s, %s, …) схлопываются в один плейсхолдер."""
+    return _IN_LIST_RE.sub("(%s…)", sql)
+
+
+def _is_project_file(filename, project_root):
+    return (
+        filename is not None
+        and filename.startswith(project_root)
+        and "site-packages" not in filename
+        and filename not in _SKIP_FILES
+    )
+
+
+def origin_frame(project_root):
+    """
+    Ближайший к SQL кадр стека из кода проекта (не Django, не site-packages).
+    Унаследованные методы (ProductSerializer → DRF) опознаём по классу self.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if _is_project_file(code.co_filename, project_root):
+            rel = os.path.relpath(code.co_filename, project_root)
+            return f"{rel}:{frame.f_lineno} in {code.co_name}"
+        owner = type(frame.f_locals.get("self", None))
+        module = sys.modules.get(owner.__module__)
+        if _is_project_file(getattr(module, "__file__", None), project_root):
+            return f"{owner.__module__}.{owner.__qualname__}.{code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryInspector:
+    """
+    Запросы одного HTTP-запроса, сгруппированные по форме SQL (sql_shape).
+    Форму считаем один раз на новый текст запроса, дальше — dict-lookup.
+    Кадр стека снимаем только для медленных запросов и на пороговом
+    повторе формы — в том числе когда повторы различаются длиной IN (…).
+    """
+
+    __slots__ = ("slow_ms", "dup_threshold", "project_root", "shapes", "shape_of", "slow")
+
+    def __init__(self, slow_ms, dup_threshold, project_root):
+        self.slow_ms = slow_ms
+        self.dup_threshold = dup_threshold
+        self.project_root = project_root
+        self.shapes = {}     # форма → [count, total_ms, frame]
+        self.shape_of = {}   # sql → запись его формы в shapes
+        self.slow = []       # (sql, ms, frame)
+
+    def observe(self, sql, duration):
+        entry = self.shape_of.get(sql)
+        if entry is None:
+            entry = self.shapes.setdefault(sql_shape(sql), [0, 0.0, None])
+            self.shape_of[sql] = entry
+        entry[0] += 1
+        entry[1] += duration
+        if entry[0] == self.dup_threshold and entry[2] is None:
+            entry[2] = origin_frame(self.project_root)
+        if duration >= self.slow_ms:
+            self.slow.append((sql, duration, origin_frame(self.project_root)))
+
+    def records(self):
+        """Записи для лога."""
+        for sql, duration, frame in self.slow:
+            yield {
+                "kind": "slow",
+                "sql": sql_shape(sql),
+                "ms": round(duration, 3),
+                "frame": frame,
+            }
+        for shape, (count, total, frame) in self.shapes.items():
+            if count >= self.dup_threshold:
+                yield {
+                    "kind": "duplicate",
+                    "sql": shape,
+                    "count": count,
+                    "ms": round(total, 3),
+                    "frame": frame,
+                }
+
+
+def report_queries(metrics, route, request):
+    inspector = metrics.inspector
+    if inspector is None:
+        return
+    ts = time.time()
+    for record in inspector.records():
+        record.update(ts=round(ts, 3), route=route, method=request.method, path=request.path)
+        query_logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+# ---------- сериализация -----------------------------------------------------
+
+class TimedSerializerMixin:
+    """
+    Считает время to_representation. Для many=True вызывается на каждую строку,
+    поэтому учитываем только внешний уровень вложенности.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        metrics._ser_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics._ser_depth -= 1
+            if not metrics._ser_depth:
+                metrics.serializer_time += (time.perf_counter() - started) * 1000
+
+
+# ---------- гистограммы ------------------------------------------------------
+
+def _geometric_bounds(start, stop, factor):
+    bounds = []
+    value = start
+    while value < stop:
+        bounds.append(value)
+        value *= factor
+    bounds.append(stop)
+    return tuple(bounds)
+
+
+TIME_BOUNDS = _geometric_bounds(0.05, 60_000, 1.2)       # мс
+COUNT_BOUNDS = _geometric_bounds(1, 100_000, 1.2)        # штуки
+SIZE_BOUNDS = _geometric_bounds(64, 256 * 1024 ** 2, 1.2)  # байты
+
+
+class Histogram:
+    """Гистограмма с фиксированными геометрическими корзинами (~10% точности)."""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                upper = self.bounds[idx] if idx < len(self.bounds) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+
+class RouteStats:
+    __slots__ = ("wall_ms", "db_ms", "db_queries", "serializer_ms", "response_bytes")
+
+    def __init__(self):
+        self.wall_ms = Histogram(TIME_BOUNDS)
+        self.db_ms = Histogram(TIME_BOUNDS)
+        self.db_queries = Histogram(COUNT_BOUNDS)
+        self.serializer_ms = Histogram(TIME_BOUNDS)
+        self.response_bytes = Histogram(SIZE_BOUNDS)
+
+
+class StatsRegistry:
+    """Агрегаты по маршрутам в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, metrics, wall_ms, size):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.wall_ms.add(wall_ms)
+            stats.db_ms.add(metrics.db_time)
+            stats.db_queries.add(metrics.db_queries)
+            stats.serializer_ms.add(metrics.serializer_time)
+            if size is not None:
+                stats.response_bytes.add(size)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {
+                    name: getattr(stats, name).summary()
+                    for name in RouteStats.__slots__
+                }
+                for route, stats in sorted(self._routes.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = StatsRegistry()
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match.url_name or "unnamed"
+
+
+def server_timing(metrics, wall_ms):
+    parts = [
+        f"total;dur={wall_ms:.1f}",
+        f'db;dur={metrics.db_time:.1f};desc="{metrics.db_queries} queries"',
+    ]
+    if metrics.serializer_time:
+        parts.append(f"serializer;dur={metrics.serializer_time:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,183 @@
+# main/rollups.py
+"""
+Дневные итоги продаж по товарам, категориям и способам оплаты.
+
+Заказ раскладывается в Totals (день, ключ) → [заказов, штук, выручка];
+при создании/удалении заказа Totals одного заказа прибавляется (вычитается)
+к таблицам через INSERT … ON CONFLICT DO UPDATE. Полная пересборка
+(rebuild) разбирает историю кусками по id в пуле процессов — разбор JSON
+items здесь самая дорогая часть — и записывает таблицы заново.
+"""
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import (
+    DailyCategorySales, DailyPaymentSales, DailyProductSales, Order, Product,
+)
+
+# таблица → имя колонки-ключа
+ROLLUPS = (
+    (DailyProductSales, "product_id"),
+    (DailyCategorySales, "category_id"),
+    (DailyPaymentSales, "payment_method"),
+)
+UNKNOWN_CATEGORY = 0
+
+
+class Totals:
+    """Три словаря (день, ключ) → [orders, units, revenue]; складываются через merge()."""
+
+    def __init__(self):
+        self.by_product, self.by_category, self.by_payment = {}, {}, {}
+
+    def tables(self):
+        return zip((model for model, _ in ROLLUPS), (self.by_product, self.by_category, self.by_payment))
+
+    def add_order(self, created_at, payment_method, items, categories):
+        day = timezone.localdate(created_at)
+        products = {}
+        for item in items or ():
+            if not isinstance(item, dict):
+                continue
+            try:
+                pid = int(item.get("id") or 0)
+                quantity = int(item.get("quantity") or 0)
+                price = int(item.get("price") or 0)
+            except (TypeError, ValueError):
+                continue
+            line = products.setdefault(pid, [0, 0])
+            line[0] += quantity
+            line[1] += quantity * price
+
+        per_category = {}
+        for pid, (units, revenue) in products.items():
+            _add(self.by_product, (day, pid), 1, units, revenue)
+            line = per_category.setdefault(categories.get(pid, UNKNOWN_CATEGORY), [0, 0])
+            line[0] += units
+            line[1] += revenue
+        for category_id, (units, revenue) in per_category.items():
+            _add(self.by_category, (day, category_id), 1, units, revenue)
+        _add(
+            self.by_payment, (day, payment_method), 1,
+            sum(units for units, _ in products.values()),
+            sum(revenue for _, revenue in products.values()),
+        )
+
+    def merge(self, other):
+        for (_, mine), (_, theirs) in zip(self.tables(), other.tables()):
+            for key, (orders, units, revenue) in theirs.items():
+                _add(mine, key, orders, units, revenue)
+        return self
+
+
+def _add(table, key, orders, units, revenue):
+    row = table.get(key)
+    if row is None:
+        table[key] = [orders, units, revenue]
+    else:
+        row[0] += orders
+        row[1] += units
+        row[2] += revenue
+
+
+def product_categories(product_ids=None):
+    queryset = Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=product_ids)
+    return dict(queryset.values_list("id", "category_id"))
+
+
+def apply(totals, sign=1):
+    """Прибавить (sign=-1 — вычесть) итоги к таблицам одним запросом на таблицу."""
+    for (model, column), (_, rows) in zip(ROLLUPS, totals.tables()):
+        if not rows:
+            continue
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (day, {column}, orders, units, revenue) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT (day, {column}) DO UPDATE SET "
+            f"orders = {table}.orders + excluded.orders, "
+            f"units = {table}.units + excluded.units, "
+            f"revenue = {table}.revenue + excluded.revenue"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                (day, key, sign * orders, sign * units, sign * revenue)
+                for (day, key), (orders, units, revenue) in rows.items()
+            ])
+
+
+def record_order(order, sign=1):
+    """
+    post_save/post_delete заказа: его вклад в дневные итоги. Категория
+    берётся текущая — если товар с тех пор переносили, итоги поправит rebuild().
+    """
+    totals = Totals()
+    ids = [item.get("id") for item in order.items or () if isinstance(item, dict)]
+    totals.add_order(order.created_at, order.payment_method, order.items, product_categories(ids))
+    apply(totals, sign)
+
+
+# ---------- полная пересборка ----------------------------------------------------
+
+_worker_categories = {}
+
+
+def _init_worker(categories):
+    global _worker_categories
+    import django
+    django.setup()
+    _worker_categories = categories
+
+
+def aggregate_range(bounds, categories=None):
+    """Итоги заказов с id в [low, high) — выполняется в процессе пула."""
+    low, high = bounds
+    categories = _worker_categories if categories is None else categories
+    totals = Totals()
+    rows = Order.objects.filter(pk__gte=low, pk__lt=high).order_by().values_list(
+        "created_at", "payment_method", "items"
+    )
+    for created_at, payment_method, items in rows.iterator(chunk_size=2000):
+        totals.add_order(created_at, payment_method, items, categories)
+    return totals
+
+
+def rebuild(workers=None, chunk_size=20_000, progress=None):
+    """Пересчитать все таблицы из заказов. workers=1 — без пула, в этом процессе."""
+    categories = product_categories()
+    bounds = Order.objects.order_by().values_list("pk", flat=True)
+    low, high = bounds.order_by("pk").first(), bounds.order_by("-pk").first()
+    ranges = [] if low is None else [
+        (start, min(start + chunk_size, high + 1)) for start in range(low, high + 1, chunk_size)
+    ]
+
+    totals = Totals()
+    if workers == 1 or len(ranges) <= 1:
+        for done, chunk in enumerate(ranges, 1):
+            totals.merge(aggregate_range(chunk, categories))
+            if progress:
+                progress(done, len(ranges))
+    else:
+        # импорт здесь: rollups грузится с main.signals в каждом воркере,
+        # а multiprocessing нужен только пересборке
+        from concurrent.futures import ProcessPoolExecutor
+
+        # дочерние процессы не должны унаследовать открытое соединение
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(categories,)) as pool:
+            for done, part in enumerate(pool.map(aggregate_range, ranges), 1):
+                totals.merge(part)
+                if progress:
+                    progress(done, len(ranges))
+
+    # сотни тысяч строк: executemany без создания экземпляров моделей
+    with transaction.atomic(), connection.cursor() as cursor:
+        for (model, column), (_, rows) in zip(ROLLUPS, totals.tables()):
+            table = connection.ops.quote_name(model._meta.db_table)
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.executemany(
+                f"INSERT INTO {table} (day, {column}, orders, units, revenue) VALUES (%s, %s, %s, %s, %s)",
+                [(day, key, *values) for (day, key), values in rows.items()],
+            )
+    return totals
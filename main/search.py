@@ -0,0 +1,114 @@
+# main/search.py
+"""
+Поиск заказов для админки: FTS5-таблица main_order_search (rowid = id заказа)
+с номером, клиентом, телефоном, адресом и названиями позиций. Документ
+собирается в SQL из заказа, профиля и JSON items, так что одна и та же
+выборка служит и для одного заказа, и для полной перестройки.
+
+Только SQLite; на других базах available() → False и админка ищет
+обычным search_fields.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = "main_order_search"
+
+CREATE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    number, customer, phone, address, items,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+
+# телефон дублируем одними цифрами: «+998 90 111» находится и как 99890111…
+def _digits(column):
+    for char in "+ -()":
+        column = f"replace({column}, '{char}', '')"
+    return column
+
+
+def _words(*columns):
+    # concat_ws появился только в SQLite 3.44
+    return " || ' ' || ".join(f"ifnull({column}, '')" for column in columns)
+
+
+# OR REPLACE по rowid: переиндексация одним запросом, без DELETE
+DOCUMENT_SQL = f"""
+INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, number, customer, phone, address, items)
+SELECT o.id,
+       o.id,
+       {_words("o.customer_name", "o.customer_surname", "p.name", "p.surname", "u.username")},
+       {_words("o.customer_phone", _digits("o.customer_phone"), "p.phone", _digits("p.phone"))},
+       {_words("o.customer_address", "p.address")},
+       (SELECT group_concat(json_extract(i.value, '$.title'), ' ')
+          FROM json_each(o.items) AS i WHERE i.type = 'object')
+  FROM main_order AS o
+  LEFT JOIN auth_user AS u ON u.id = o.user_id
+  LEFT JOIN main_profile AS p ON p.user_id = o.user_id
+"""
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def available():
+    return connection.vendor == "sqlite"
+
+
+def _reindex(where, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"{DOCUMENT_SQL} WHERE {where}", params)
+
+
+def index_orders(order_ids):
+    """(Пере)индексировать заказы по id — после создания или правки."""
+    order_ids = list(order_ids)
+    if not available() or not order_ids:
+        return
+    _reindex(f"o.id IN ({', '.join(['%s'] * len(order_ids))})", order_ids)
+
+
+def index_user_orders(user_id):
+    """Профиль изменился — обновляем имя/телефон во всех заказах пользователя."""
+    if available() and user_id:
+        _reindex("o.user_id = %s", [user_id])
+
+
+def unindex_orders(order_ids):
+    order_ids = list(order_ids)
+    if not available() or not order_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(order_ids))})",
+            order_ids,
+        )
+
+
+def rebuild(db=None):
+    """Перестроить индекс целиком (миграция, manage.py rebuild_order_search)."""
+    with (db or connection).cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(DOCUMENT_SQL)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(term):
+    """
+    Строка из админки → запрос FTS5: каждое слово как префикс, все через AND.
+    Кавычки и операторы пользователя не пропускаем. None — искать нечего.
+    """
+    tokens = TOKEN_RE.findall(term or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def matching_orders(expression):
+    """Подзапрос id заказов для filter(pk__in=...)."""
+    return RawSQL(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", (expression,)
+    )
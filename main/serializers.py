@@ -1,25 +1,88 @@
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
-from .models import Category, Profile, News
-
-class CategorySerializer(serializers.ModelSerializer):
+from rest_framework.settings import api_settings
+from .models import Brand, Category, Profile, News
+from .perf import TimedSerializerMixin
+from .i18n import NEWS_FIELDS, PRODUCT_FULL_DESC, serializer_language
+
+
+class LanguageField(serializers.ReadOnlyField):
+    """
+    Текст на языке запроса. Колонка выбирается при привязке поля к
+    сериализатору — для many=True это один раз на список, — а на строке
+    остаётся чтение атрибута: ни serializer_language(), ни поиска по словарям.
+    columns: язык → (колонка, колонка-fallback для пустого значения).
+    """
+
+    def __init__(self, columns, **kwargs):
+        self.columns = columns
+        super().__init__(**kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.column, self.fallback = self.columns[serializer_language(parent)]
+
+    def get_attribute(self, instance):
+        return getattr(instance, self.column) or getattr(instance, self.fallback)
+
+
+class MediaURLField(serializers.ImageField):
+    """
+    Как ImageField: абсолютный URL файла. Для файлов из FileSystemStorage
+    префикс (схема, хост, MEDIA_URL) строится один раз на поле, а на
+    строке — только filepath_to_uri(name), без storage.url() и
+    request.build_absolute_uri() на каждую картинку.
+    """
+
+    _prefix = None
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if self._prefix is None:
+            request = self.context.get("request")
+            if (
+                request is None
+                or not getattr(self, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+                or value.storage.__class__ is not FileSystemStorage  # у других хранилищ свой url()
+            ):
+                return super().to_representation(value)
+            self._prefix = request.build_absolute_uri(value.storage.base_url)
+        return self._prefix + filepath_to_uri(value.name).lstrip("/")
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model  = Category
-        fields = ('id', 'name', 'slug')
+        fields = ('id', 'name', 'slug', 'product_count', 'min_price', 'max_price')
+
+
+class BrandSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model  = Brand
+        fields = ('id', 'name', 'slug', 'product_count')
 
 
 from rest_framework import serializers
 from .models import Product
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaURLField,
+    }
+
     # локализованные поля
     desc      = serializers.SerializerMethodField()
-    descFull  = serializers.SerializerMethodField()
+    # полное описание – только на текущем языке запроса
+    descFull  = LanguageField({lang: (column, column) for lang, column in PRODUCT_FULL_DESC.items()})
 
     # ► big_img будет вычисляться из существующего поля image_big
     #   (переименуйте source, если у вас другое имя, либо
     #   оставьте метод get_big_img, чтобы построить URL вручную).
-    big_img = serializers.ImageField(read_only=True)
+    big_img = MediaURLField(read_only=True)
 
     category  = serializers.SlugRelatedField(
         read_only=True,
@@ -45,13 +108,18 @@ class ProductSerializer(serializers.ModelSerializer):
             'en': obj.desc_en,
         }
 
-    def get_descFull(self, obj):
-        """Полное описание – только на текущем языке запроса"""
-        lang = self.context['request'].LANGUAGE_CODE   # 'ru', 'uz', 'en'
-        return getattr(obj, f'desc_full_{lang}', '')
 
+class ProductCardSerializer(ProductSerializer):
+    """Облегчённая карточка для главной: без полного описания и большой картинки."""
 
-class ProfileSerializer(serializers.ModelSerializer):
+    class Meta(ProductSerializer.Meta):
+        fields = (
+            "id", "title", "brand", "category",
+            "price", "available", "img", "desc",
+        )
+
+
+class ProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model  = Profile
         fields = (
@@ -61,13 +129,13 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 
 
-class NewsSerializer(serializers.ModelSerializer):
-    # вычисляемые поля
-    title          = serializers.SerializerMethodField()
-    desc           = serializers.SerializerMethodField()
-    banner_bg_url  = serializers.ImageField(source="banner_bg", read_only=True)
-    large_img_url  = serializers.ImageField(source="large_img", read_only=True)
-    photo_card     = serializers.ImageField(source="thumbnail", read_only=True)
+class NewsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # вычисляемые поля: текст на языке запроса, пустой — русский
+    title          = LanguageField({lang: f["title"] for lang, f in NEWS_FIELDS.items()})
+    desc           = LanguageField({lang: f["desc"] for lang, f in NEWS_FIELDS.items()})
+    banner_bg_url  = MediaURLField(source="banner_bg", read_only=True)
+    large_img_url  = MediaURLField(source="large_img", read_only=True)
+    photo_card     = MediaURLField(source="thumbnail", read_only=True)
 
     class Meta:
         model  = News
@@ -80,22 +148,3 @@ class NewsSerializer(serializers.ModelSerializer):
             "photo_card",
             "is_featured",
         ]
-
-    def get_title(self, obj):
-        # вытягиваем текущий язык из request
-        request = self.context.get("request", None)
-        lang    = getattr(request, "LANGUAGE_CODE", "")
-        if lang.startswith("uz"):
-            return obj.title_uz or obj.title_ru
-        if lang.startswith("en"):
-            return obj.title_en or obj.title_ru
-        return obj.title_ru
-
-    def get_desc(self, obj):
-        request = self.context.get("request", None)
-        lang    = getattr(request, "LANGUAGE_CODE", "")
-        if lang.startswith("uz"):
-            return obj.desc_uz or obj.desc_ru
-        if lang.startswith("en"):
-            return obj.desc_en or obj.desc_ru
-        return obj.desc_ru
@@ -1,13 +1,68 @@
 # main/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
-from .models import Order, Notification
+from .caching import bump_catalog_version
+from . import autocomplete, rollups, search, sync
+from .models import Brand, Category, Product, Profile, Order, Notification, News
+from .thumbnails import make_thumbnail, thumbnail_name
 
 User = get_user_model()
 
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def update_category_counters(sender, instance, raw=False, **kwargs):
+    """Прежние категория и бренд — из Product._remember_refs, без лишнего SELECT."""
+    if raw:
+        return
+    Category.refresh_counters({instance.category_id, getattr(instance, "_old_category_id", None)})
+    Brand.refresh_counters({instance.brand_ref_id, getattr(instance, "_old_brand_id", None)})
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_thumbnail(sender, instance, raw=False, **kwargs):
+    """Превью для админки пересоздаём только когда сменилась картинка."""
+    if raw:
+        return
+    expected = thumbnail_name(instance.img.name) if instance.img else None
+    if (instance.img_thumb.name or None) == expected:
+        return
+    name = make_thumbnail(instance.img) if expected else None
+    # update() — без повторного post_save
+    Product.objects.filter(pk=instance.pk).update(img_thumb=name)
+    instance.img_thumb = name
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    """Офлайн-клиенты узнают об удалении через /api/products/changes/ (main/sync.py)."""
+    sync.record_deletion(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def catalog_changed(sender, instance, signal, raw=False, **kwargs):
+    """Любая правка витрины → новая версия каталога (и новые ключи кэша)."""
+    if raw:
+        return
+    version = bump_catalog_version()
+    if sender is Product:
+        # подсказки поиска (main/autocomplete.py) правим по одному товару,
+        # без пересборки — индекс догоняет ровно ту версию, что дала эта правка
+        if signal is post_delete:
+            autocomplete.product_deleted(instance.pk, version)
+        else:
+            autocomplete.product_saved(instance, version)
+
+
 @receiver(post_save, sender=Order)
 def create_order_notification(sender, instance, created, **kwargs):
     """
@@ -17,8 +72,59 @@ def create_order_notification(sender, instance, created, **kwargs):
     if not created:
         return
 
+    # Сохраняем уведомление
+    Notification.objects.create(
+        notif_type="order",
+        order=instance,
+        message=build_order_message(instance)
+    )
+
+
+@receiver(post_save, sender=Order)
+def index_order(sender, instance, raw=False, **kwargs):
+    """Строка поиска заказов для админки (main/search.py)."""
+    if raw:
+        return
+    search.index_orders([instance.pk])
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order(sender, instance, **kwargs):
+    search.unindex_orders([instance.pk])
+
+
+@receiver(post_save, sender=Order)
+def add_order_to_rollups(sender, instance, created, raw=False, **kwargs):
+    """
+    Дневные итоги продаж (main/rollups.py). Считается только создание:
+    позиции заказа после оформления не правятся; если правили —
+    manage.py rebuild_sales_rollups.
+    """
+    if raw or not created:
+        return
+    rollups.record_order(instance)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    rollups.record_order(instance, sign=-1)
+
+
+@receiver(post_save, sender=Profile)
+def reindex_profile_orders(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_user_orders(instance.user_id)
+
+
+def build_order_message(instance, profile=None):
+    """
+    Текст уведомления о заказе. profile можно передать заранее
+    (массовая генерация), иначе берётся user.profile.
+    """
     user = instance.user
-    profile = getattr(user, "profile", None) if user else None
+    if user and profile is None:
+        profile = getattr(user, "profile", None)
 
     # Имя и фамилия
     if user:
@@ -66,11 +172,4 @@ def create_order_notification(sender, instance, created, **kwargs):
         lines.append(f"  • {title} × {qty} — {subtotal} UZS")
 
     # Финальный текст
-    message = "\n".join(lines)
-
-    # Сохраняем уведомление
-    Notification.objects.create(
-        notif_type="order",
-        order=instance,
-        message=message
-    )
+    return "\n".join(lines)
@@ -0,0 +1,71 @@
+# main/stock.py
+"""
+Резервирование остатков при оформлении заказа.
+
+На каждую позицию — один условный UPDATE:
+    UPDATE product SET stock = stock - n, available = (stock <> n)
+     WHERE id = … AND available AND (stock IS NULL OR stock >= n)
+База сама гарантирует, что остаток не уйдёт в минус: из двух
+одновременных заказов на последнюю штуку UPDATE пройдёт только у одного.
+Вызывается внутри transaction.atomic() вместе с созданием заказа —
+если хоть одна позиция не зарезервировалась, откатывается всё.
+"""
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Brand, Category, Product
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f"нет в наличии: {product_ids}")
+        self.product_ids = product_ids
+
+
+def order_quantities(items):
+    """items из заказа → {product_id: штук}; ValueError на мусор."""
+    quantities = {}
+    for item in items:
+        pid, quantity = int(item["id"]), int(item.get("quantity", 1))
+        if quantity <= 0:
+            raise ValueError(f"quantity должно быть > 0 (товар {pid})")
+        quantities[pid] = quantities.get(pid, 0) + quantity
+    return quantities
+
+
+def reserve(quantities):
+    """
+    Списать остатки. Должна выполняться в уже открытой транзакции;
+    при нехватке бросает OutOfStock (все ещё не прошедшие позиции в списке).
+    """
+    failed = []
+    now = timezone.now()
+    # в порядке id — одинаковый порядок блокировок у конкурирующих заказов
+    for pid in sorted(quantities):
+        n = quantities[pid]
+        updated = Product.objects.filter(
+            Q(stock__isnull=True) | Q(stock__gte=n), pk=pid, available=True,
+        ).update(
+            stock=F("stock") - n,
+            # UPDATE мимо save(): auto_now сам не сработает, а снятие с продажи клиенты должны увидеть
+            updated_at=now,
+            # CASE видит значение stock до UPDATE
+            available=Case(When(stock=n, then=False), default=F("available")),
+        )
+        if not updated:
+            failed.append(pid)
+    if failed:
+        raise OutOfStock(failed)
+
+    # UPDATE не шлёт сигналы: распроданные сами обновляют счётчики и версию каталога
+    sold_out = {
+        pk: (category_id, brand_id)
+        for pk, category_id, brand_id in Product.objects.filter(pk__in=list(quantities), stock=0)
+        .values_list("pk", "category_id", "brand_ref_id")
+    }
+    if sold_out:
+        Category.refresh_counters({category_id for category_id, _ in sold_out.values()})
+        Brand.refresh_counters({brand_id for _, brand_id in sold_out.values()})
+        bump_catalog_version()
+    return sold_out
@@ -0,0 +1,85 @@
+# main/sync.py
+"""
+Дельта-синхронизация каталога для офлайн-клиентов: /api/products/changes/?since=<token>
+
+Токен — момент времени (микросекунды UTC в base36). Ответ: товары в
+наличии, изменённые после него (по индексу updated_at), и id товаров,
+которых у клиента быть не должно — удалённых (ProductTombstone) или
+снятых с продажи. Новый токен берётся на PRODUCT_CHANGES_OVERLAP секунд
+раньше начала выборки: транзакция, начатая до запроса и закоммиченная
+после, попадёт в следующую синхронизацию (повтор товара клиенту не
+страшен — это upsert по id).
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Product, ProductTombstone
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    """Старше срока хранения tombstone — удаления могли потеряться, нужна полная синхронизация."""
+
+
+def make_token(moment):
+    micros = (moment - EPOCH) // datetime.timedelta(microseconds=1)
+    return _base36(micros)
+
+
+def parse_token(token):
+    try:
+        micros = int(token, 36)
+    except (TypeError, ValueError):
+        raise InvalidToken(token)
+    if micros < 0:
+        raise InvalidToken(token)
+    since = EPOCH + datetime.timedelta(microseconds=micros)
+    if since < retention_start():
+        raise ExpiredToken(token)
+    return since
+
+
+def _base36(number):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    result = ""
+    while True:
+        number, rest = divmod(number, 36)
+        result = digits[rest] + result
+        if not number:
+            return result
+
+
+def retention_start(now=None):
+    days = getattr(settings, "PRODUCT_TOMBSTONE_DAYS", 90)
+    return (now or timezone.now()) - datetime.timedelta(days=days)
+
+
+def changes(queryset, since=None):
+    """
+    (изменённые товары, id к удалению у клиента, новый токен).
+    queryset — товары в наличии со всеми нужными сериализатору join/defer.
+    since=None — первая синхронизация: весь каталог, удалять нечего.
+    """
+    overlap = datetime.timedelta(seconds=getattr(settings, "PRODUCT_CHANGES_OVERLAP", 5))
+    token = make_token(timezone.now() - overlap)
+    if since is None:
+        return list(queryset), [], token
+
+    updated = list(queryset.filter(updated_at__gt=since))
+    unavailable = Product.objects.filter(updated_at__gt=since, available=False).values_list("pk", flat=True)
+    deleted = ProductTombstone.objects.filter(deleted_at__gt=since).values_list("product_id", flat=True)
+    return updated, sorted({*unavailable, *deleted}), token
+
+
+def record_deletion(product_id):
+    """post_delete товара: tombstone + уборка тех, что старше срока хранения."""
+    now = timezone.now()
+    ProductTombstone.objects.update_or_create(product_id=product_id, defaults={"deleted_at": now})
+    ProductTombstone.objects.filter(deleted_at__lt=retention_start(now)).delete()
@@ -1,3 +1,1338 @@
-from django.test import TestCase
+"""
+Регрессионные тесты производительности: число SQL-запросов и время ответа
+для всех маршрутов main/urls.py и списков в админке.
 
-# Create your tests here.
+Базовые времена лежат в main/perf_baselines.json. Перезаписать их:
+    PERF_UPDATE_BASELINES=1 python manage.py test main
+Допуск — PERF_REGRESSION_FACTOR (по умолчанию ×3) плюс PERF_REGRESSION_SLACK_MS.
+"""
+import csv
+import datetime
+import gzip
+import importlib
+import io
+import json
+import os
+import pathlib
+import statistics
+import tempfile
+import threading
+import time
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.response import Response
+
+from . import async_views, autocomplete, catalog_index, feeds, perf, rollups, stock, sync
+from .i18n import localize_news
+from .management.commands.bench_serializers import LegacyNewsSerializer, LegacyProductSerializer
+from .models import (
+    Brand, CatalogVersion, Category, Product, Profile, Order, Notification, News,
+    DailyCategorySales, DailyPaymentSales, DailyProductSales,
+)
+from .serializers import NewsSerializer, ProductSerializer
+
+BASELINES_PATH = pathlib.Path(__file__).with_name("perf_baselines.json")
+UPDATE_BASELINES = os.environ.get("PERF_UPDATE_BASELINES") == "1"
+REGRESSION_FACTOR = float(os.environ.get("PERF_REGRESSION_FACTOR", "3"))
+REGRESSION_SLACK_MS = float(os.environ.get("PERF_REGRESSION_SLACK_MS", "20"))
+TIMING_RUNS = 5
+
+User = get_user_model()
+
+
+def seed_catalog(categories=5, products_per_category=8):
+    cats = [Category.objects.create(name=f"Категория {i}") for i in range(categories)]
+    products = []
+    for cat in cats:
+        for i in range(products_per_category):
+            products.append(Product.objects.create(
+                title=f"{cat.name} товар {i}",
+                price=10_000 + i * 1_500,
+                brand=("Perioe", "Elastine", "On The Body")[i % 3],
+                category=cat,
+                available=i % 5 != 0,
+                desc_ru="Описание", desc_uz="Tavsif", desc_en="Description",
+                desc_full_ru="Полное", desc_full_uz="To'liq", desc_full_en="Full",
+            ))
+    return cats, products
+
+
+def seed_news(count=6):
+    return [
+        News.objects.create(
+            title_ru=f"Новость {i}", title_en=f"News {i}",
+            desc_ru="Текст", is_featured=i == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def seed_orders(products, users, count=12):
+    orders = []
+    for i in range(count):
+        user = users[i % len(users)] if i % 3 else None
+        items = [
+            {"id": p.id, "title": p.title, "price": p.price, "quantity": 1 + j}
+            for j, p in enumerate(products[i % 5:i % 5 + 3])
+        ]
+        orders.append(Order.objects.create(
+            user=user, items=items, payment_method="cash",
+            customer_name=f"Клиент {i}", customer_phone="+998900000000",
+        ))
+    return orders
+
+
+# бюджеты меряют саму вьюху, а не попадание в общий кэш ответов (см. ResponseCacheTests)
+@override_settings(RESPONSE_CACHE=False)
+class PerfTestCase(TestCase):
+    """Общие проверки: потолок числа запросов и сравнение с базовым временем."""
+
+    baselines = {}
+    measured = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if BASELINES_PATH.exists():
+            PerfTestCase.baselines = json.loads(BASELINES_PATH.read_text(encoding="utf-8"))
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BASELINES and PerfTestCase.measured:
+            merged = dict(PerfTestCase.baselines, **PerfTestCase.measured)
+            BASELINES_PATH.write_text(
+                json.dumps(merged, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+            )
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        # версия каталога и документы витрины не должны переживать откат теста
+        cache.clear()
+
+    def assertMaxQueries(self, limit, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+        executed = len(ctx.captured_queries)
+        if executed > limit:
+            sql = "\n".join(q["sql"] for q in ctx.captured_queries)
+            self.fail(f"{executed} queries executed, limit {limit}:\n{sql}")
+        return result
+
+    def assertNoRegression(self, name, func, *args, **kwargs):
+        samples = []
+        for _ in range(TIMING_RUNS):
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            samples.append((time.perf_counter() - started) * 1000)
+        median = statistics.median(samples)
+        PerfTestCase.measured[name] = round(median, 3)
+        baseline = self.baselines.get(name)
+        if baseline is None or UPDATE_BASELINES:
+            return
+        allowed = baseline * REGRESSION_FACTOR + REGRESSION_SLACK_MS
+        self.assertLessEqual(
+            median, allowed,
+            f"{name}: {median:.1f}ms against baseline {baseline:.1f}ms",
+        )
+
+    def check(self, name, limit, method, url, status=200, **kwargs):
+        """Один маршрут: статус, потолок запросов, время относительно базового."""
+        call = getattr(self.client, method)
+        response = self.assertMaxQueries(limit, call, url, **kwargs)
+        self.assertEqual(response.status_code, status, response.content[:500])
+        self.assertNoRegression(name, call, url, **kwargs)
+        return response
+
+
+class ApiPerformanceTests(PerfTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog()
+        cls.news = seed_news()
+        cls.user = User.objects.create_user("buyer", password="pass")
+        Profile.objects.create(user=cls.user, name="Ali", phone="+998901112233")
+        cls.orders = seed_orders(cls.products, [cls.user])
+        cls.staff = User.objects.create_user("staff", password="pass", is_staff=True)
+
+    def test_api_root(self):
+        self.check("api-root", 0, "get", "/api/")
+
+    def test_category_list(self):
+        response = self.check("category-list", 1, "get", "/api/categories/")
+        self.assertEqual(len(response.json()), len(self.categories))
+        # счётчики приходят вместе со списком — меню не нужен запрос на категорию
+        first = response.json()[0]
+        self.assertEqual(
+            first["product_count"],
+            Product.objects.filter(category__slug=first["slug"], available=True).count(),
+        )
+
+    def test_product_list_price_range(self):
+        category = self.categories[2]
+        response = self.check(
+            "product-list-price", 1, "get",
+            f"/api/products/?category={category.slug}&price_min=11500&price_max=16000&ordering=price",
+        )
+        expected = Product.objects.filter(
+            category=category, available=True, price__gte=11500, price__lte=16000,
+        ).order_by("price")
+        self.assertEqual([p["id"] for p in response.json()], [p.pk for p in expected])
+        self.assertTrue(response.json())
+
+    def test_category_detail(self):
+        slug = self.categories[0].slug
+        self.check("category-detail", 1, "get", f"/api/categories/{slug}/")
+
+    def test_product_list(self):
+        response = self.check("product-list", 1, "get", "/api/products/")
+        self.assertEqual(len(response.json()), Product.objects.filter(available=True).count())
+
+    def test_product_list_filtered_and_ordered(self):
+        slug = self.categories[1].slug
+        self.check(
+            "product-list-filtered", 1, "get",
+            f"/api/products/?category__slug={slug}&brand__icontains=peri&ordering=-price",
+        )
+
+    def test_product_detail(self):
+        product = Product.objects.filter(available=True).first()
+        self.check("product-detail", 1, "get", f"/api/products/{product.pk}/")
+
+    def test_product_batch(self):
+        unavailable = Product.objects.filter(available=False).first()
+        wanted = [self.products[3].pk, 999_999, unavailable.pk, self.products[1].pk]
+        url = "/api/products/batch/?ids=" + ",".join(map(str, wanted))
+        # версия каталога + один in_bulk; повтор — из кэша
+        response = self.check("product-batch", 2, "get", url)
+        items = response.json()["items"]
+        self.assertEqual([item["id"] for item in items], wanted)
+        self.assertEqual(
+            [item["status"] for item in items],
+            ["ok" if self.products[3].available else "unavailable", "missing", "unavailable",
+             "ok" if self.products[1].available else "unavailable"],
+        )
+        self.assertMaxQueries(0, self.client.get, url)
+
+    def test_product_batch_post(self):
+        ids = [p.pk for p in self.products[:30]]
+        response = self.check(
+            "product-batch-post", 2, "post", "/api/products/batch/",
+            data=json.dumps({"ids": ids}), content_type="application/json",
+        )
+        self.assertEqual([item["id"] for item in response.json()["items"]], ids)
+        response = self.client.get("/api/products/batch/?ids=1,abc")
+        self.assertEqual(response.status_code, 400)
+        for body in ([1, 2], 7, "ids"):
+            response = self.client.post(
+                "/api/products/batch/", data=json.dumps(body), content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_news_list(self):
+        response = self.check("news-list", 1, "get", "/api/news/")
+        self.assertTrue(response.json()[0]["is_featured"])
+
+    def test_news_detail(self):
+        self.check("news-detail", 1, "get", f"/api/news/{self.news[0].pk}/")
+
+    def test_news_featured(self):
+        # версия каталога + новости; повторный запрос — только кэш
+        response = self.check("news-featured", 2, "get", "/api/news/featured/")
+        self.assertEqual([n["id"] for n in response.json()], [self.news[0].pk])
+        self.assertMaxQueries(0, self.client.get, "/api/news/featured/")
+
+        self.news[1].is_featured = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news[1].save()
+        ids = {n["id"] for n in self.client.get("/api/news/featured/").json()}
+        self.assertEqual(ids, {self.news[0].pk, self.news[1].pk})
+
+    def test_news_archive(self):
+        response = self.check("news-archive", 1, "get", "/api/news/archive/?page_size=4")
+        seen = [n["id"] for n in response.json()["results"]]
+        next_url = response.json()["next"]
+        while next_url:
+            data = self.client.get(next_url).json()
+            seen += [n["id"] for n in data["results"]]
+            next_url = data["next"]
+        self.assertEqual(seen, [n.pk for n in reversed(self.news)])
+
+    def test_news_language_fallback(self):
+        News.objects.filter(pk=self.news[1].pk).update(title_en="")
+        data = {n["id"]: n for n in self.client.get("/api/news/", HTTP_ACCEPT_LANGUAGE="en").json()}
+        self.assertEqual(data[self.news[0].pk]["title"], "News 0")
+        self.assertEqual(data[self.news[1].pk]["title"], "Новость 1")   # перевода нет → ru
+        self.assertEqual(data[self.news[0].pk]["desc"], "Текст")
+
+    def test_product_full_description_language(self):
+        product = self.products[1]
+        for header, expected in (("en-us", "Full"), ("uz", "To'liq"), ("ru", "Полное")):
+            response = self.client.get(f"/api/products/{product.pk}/", HTTP_ACCEPT_LANGUAGE=header)
+            self.assertEqual(response.json()["descFull"], expected, header)
+
+    def test_home(self):
+        # версия каталога + категории + новости + две подборки; дальше — из кэша
+        response = self.check("home", 5, "get", "/api/home/", HTTP_ACCEPT_LANGUAGE="en")
+        data = response.json()
+        self.assertEqual(len(data["categories"]), len(self.categories))
+        self.assertEqual(data["news"][0]["title"], "News 0")
+        self.assertNotIn("descFull", data["products"]["new"][0])
+        self.assertMaxQueries(0, self.client.get, "/api/home/", HTTP_ACCEPT_LANGUAGE="en")
+
+    def test_home_is_rebuilt_after_catalog_change(self):
+        self.client.get("/api/home/")
+        product = Product.objects.filter(available=True).order_by("price").first()
+        product.price = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        cheapest = self.client.get("/api/home/").json()["products"]["cheapest"][0]
+        self.assertEqual((cheapest["id"], cheapest["price"]), (product.id, 1))
+
+    def test_profile_anonymous(self):
+        self.check("profile-list-anon", 0, "get", "/api/profile/")
+
+    def test_profile_authenticated(self):
+        self.client.force_login(self.user)
+        # сессия + пользователь + профиль
+        self.check("profile-list-auth", 3, "get", "/api/profile/")
+
+    def test_profile_upsert_authenticated(self):
+        self.client.force_login(self.user)
+        payload = json.dumps({"name": "Ali", "surname": "V", "email": "", "phone": "1"})
+        # сессия + пользователь + savepoint/get_or_create + update + поиск заказов
+        self.check(
+            "profile-upsert-auth", 7, "post", "/api/profile/",
+            data=payload, content_type="application/json",
+        )
+
+    def test_order_create_anonymous(self):
+        payload = json.dumps({
+            "items": [{"id": p.id, "title": p.title, "price": p.price, "quantity": 2}
+                      for p in self.products if p.available][:10],
+            "payment_method": "payme",
+        })
+        # savepoint + UPDATE остатка на каждую из 10 позиций + распроданные
+        # + заказ + уведомление + строка поиска + категории товаров и три итога продаж
+        self.check(
+            "order-create-anon", 20, "post", "/api/orders/",
+            status=201, data=payload, content_type="application/json",
+        )
+
+    def test_order_create_authenticated(self):
+        self.client.force_login(self.user)
+        payload = json.dumps({
+            "items": [{"id": p.id, "title": p.title, "price": p.price, "quantity": 1}
+                      for p in self.products if p.available][:10],
+            "payment_method": "cash",
+        })
+        # сессия + пользователь + профиль + savepoint + 10 UPDATE остатков + распроданные
+        # + заказ + уведомление + строка поиска + категории товаров и три итога продаж
+        self.check(
+            "order-create-auth", 23, "post", "/api/orders/",
+            status=201, data=payload, content_type="application/json",
+        )
+        self.assertEqual(
+            Notification.objects.filter(order__user=self.user).count(),
+            Order.objects.filter(user=self.user).count(),
+        )
+
+    def test_notifications_list(self):
+        self.check("notifications-anon", 0, "get", "/api/notifications/", status=302)
+        self.client.force_login(self.user)
+        # сессия + пользователь + уведомления одним JOIN
+        response = self.check("notifications-list", 3, "get", "/api/notifications/")
+        self.assertEqual(len(response.json()), Order.objects.filter(user=self.user).count())
+
+    def test_notification_mark_read(self):
+        self.client.force_login(self.user)
+        notification = Notification.objects.filter(order__user=self.user).first()
+        self.check(
+            "notification-mark-read", 4, "post", f"/api/notifications/{notification.pk}/read/",
+        )
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+
+    def test_csrf_cookie(self):
+        response = self.check("csrf", 0, "get", "/api/csrf/")
+        self.assertIn("csrftoken", response.cookies)
+
+    def test_perf_stats_requires_staff(self):
+        self.check("perf-stats-anon", 0, "get", "/api/perf/", status=403)
+        self.client.force_login(self.staff)
+        self.client.get("/api/products/")
+        response = self.check("perf-stats", 2, "get", "/api/perf/")
+        self.assertIn("product-list", response.json())
+
+    def test_sales_daily(self):
+        self.check("sales-daily-anon", 0, "get", "/api/sales/daily/", status=403)
+        self.client.force_login(self.staff)
+        # сессия + пользователь + одна агрегация по таблице итогов
+        response = self.check("sales-daily", 3, "get", "/api/sales/daily/?days=90")
+        [today] = response.json()["rows"]
+        self.assertEqual(today["orders"], len(self.orders))
+        self.assertEqual(
+            today["revenue"],
+            sum(i["price"] * i["quantity"] for o in self.orders for i in o.items),
+        )
+        response = self.check("sales-daily-by-category", 3, "get", "/api/sales/daily/?by=category")
+        self.assertEqual(
+            sum(row["revenue"] for row in response.json()["rows"]), today["revenue"]
+        )
+        self.assertEqual(self.client.get("/api/sales/daily/?by=user").status_code, 400)
+        self.assertEqual(self.client.get("/api/sales/daily/?by=product&key=abc").status_code, 400)
+        response = self.client.get(f"/api/sales/daily/?by=category&key={self.categories[0].pk}")
+        self.assertEqual({row["key"] for row in response.json()["rows"]}, {self.categories[0].pk})
+
+    def test_inspector_frame_for_in_list_variants(self):
+        inspector = perf.QueryInspector(slow_ms=10_000, dup_threshold=3, project_root=str(settings.BASE_DIR))
+        for n in range(2, 6):
+            # N+1 пачками: тексты разные, форма одна
+            inspector.observe(f"SELECT * FROM main_product WHERE id IN ({', '.join(['%s'] * n)})", 0.1)
+        [record] = inspector.records()
+        self.assertEqual((record["kind"], record["count"]), ("duplicate", 4))
+        self.assertIn("test_inspector_frame_for_in_list_variants", record["frame"])
+
+    def test_query_hook_is_request_scoped(self):
+        def marker(execute, *args):
+            return execute(*args)
+
+        with connection.execute_wrapper(marker):
+            response = self.client.get("/api/categories/")
+            # чужой with снимает свой хук, а не хук PerformanceMiddleware
+            self.assertIs(connection.execute_wrappers[-1], marker)
+        self.assertNotIn(perf._execute_wrapper, connection.execute_wrappers)
+        self.assertIn("queries", response["Server-Timing"])
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/products/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    def test_spa_fallback(self):
+        self.check("spa-fallback", 0, "get", "/catalog/some-page")
+
+
+class CategoryCounterTests(TestCase):
+
+    def setUp(self):
+        self.hair = Category.objects.create(name="Волосы", slug="hair")
+        self.body = Category.objects.create(name="Тело", slug="body")
+
+    def counters(self, category):
+        category.refresh_from_db()
+        return category.product_count, category.min_price, category.max_price
+
+    def test_counters_follow_product_changes(self):
+        cheap = Product.objects.create(title="A", price=100, category=self.hair)
+        Product.objects.create(title="B", price=300, category=self.hair)
+        Product.objects.create(title="C", price=50, category=self.hair, available=False)
+        self.assertEqual(self.counters(self.hair), (2, 100, 300))
+
+        cheap.category = self.body
+        cheap.save()
+        self.assertEqual(self.counters(self.hair), (1, 300, 300))
+        self.assertEqual(self.counters(self.body), (1, 100, 100))
+
+        cheap.delete()
+        self.assertEqual(self.counters(self.body), (0, None, None))
+
+    def test_move_reads_old_category_from_loaded_instance(self):
+        product = Product.objects.create(title="A", price=100, category=self.hair)
+        product = Product.objects.get(pk=product.pk)
+        product.category = self.body
+        with CaptureQueriesContext(connection) as ctx:
+            product.save()
+        # прежняя категория — из состояния экземпляра, а не SELECT перед UPDATE
+        self.assertFalse(any(q["sql"].startswith('SELECT "main_product"') for q in ctx.captured_queries))
+        self.assertEqual(self.counters(self.hair)[0], 0)
+        self.assertEqual(self.counters(self.body)[0], 1)
+
+    def test_counter_failure_rolls_back_product(self):
+        product = Product.objects.create(title="A", price=100, category=self.hair)
+        product.price = 999
+        with mock.patch.object(Category, "refresh_counters", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.price, 100)
+
+    def test_reconcile_fixes_drift_after_bulk_update(self):
+        Product.objects.create(title="A", price=100, category=self.hair)
+        Product.objects.filter(category=self.hair).update(available=False)   # без сигналов
+        self.assertEqual(self.counters(self.hair)[0], 1)
+        call_command("reconcile_category_counters", stdout=io.StringIO())
+        self.assertEqual(self.counters(self.hair), (0, None, None))
+
+
+class SerializerTests(TestCase):
+    """Текущие сериализаторы отдают то же, что прежние (bench_serializers.Legacy*)."""
+
+    def test_same_output_as_legacy(self):
+        category = Category.objects.create(name="Уход", slug="care")
+        Product.objects.create(
+            title="Serum", price=100, category=category, img="products/сыворотка 1.png",
+            desc_ru="Кратко", desc_full_ru="Полное", desc_full_en="",
+        )
+        News.objects.create(title_ru="Новость", title_en="News", desc_ru="Текст",
+                            banner_bg="news/banner.png", thumbnail="")
+        News.objects.create(title_ru="Только по-русски", desc_ru="Текст", large_img="news/large img.png")
+        for lang in ("ru", "uz", "en"):
+            with self.subTest(lang=lang):
+                request = RequestFactory().get("/api/")
+                request.LANGUAGE_CODE = lang
+                context = {"request": request}
+                products = Product.objects.select_related("category")
+                news = News.objects.order_by("pk")
+                self.assertEqual(
+                    ProductSerializer(products, many=True, context=context).data,
+                    LegacyProductSerializer(products, many=True, context=context).data,
+                )
+                self.assertEqual(
+                    NewsSerializer(localize_news(news, lang), many=True, context=context).data,
+                    LegacyNewsSerializer(news, many=True, context=context).data,
+                )
+
+
+class SyntheticDataTests(TestCase):
+
+    def generate(self, seed):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "generate_synthetic_data", f"--seed={seed}", "--categories=2", "--products=20",
+                "--users=2", "--anon-profiles=2", "--orders=5", stdout=io.StringIO(),
+            )
+
+    def test_seed_run_bumps_catalog_version(self):
+        self.generate(7)
+        before = CatalogVersion.current()
+        # бренды уже есть — кроме bulk_create, ничего не пишется; версию поднимает сама команда
+        self.generate(8)
+        self.assertGreater(CatalogVersion.current(), before)
+        self.assertEqual(Product.objects.filter(category__slug__startswith="synth8-").count(), 20)
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.categories, self.products = seed_catalog(categories=2, products_per_category=3)
+
+    def order(self, *lines, payment="cash"):
+        return Order.objects.create(
+            items=[{"id": p.id, "title": p.title, "price": p.price, "quantity": q} for p, q in lines],
+            payment_method=payment,
+        )
+
+    def snapshot(self):
+        return {
+            model.__name__: sorted(model.objects.values_list("day", column, "orders", "units", "revenue"))
+            for model, column in rollups.ROLLUPS
+        }
+
+    def test_incremental_matches_rebuild(self):
+        _, body = self.categories
+        a, b, c = self.products[0], self.products[1], self.products[3]
+        self.order((a, 2), (b, 1))
+        self.order((a, 1), (c, 3), payment="payme")
+        self.order((a, 1), (a, 1))    # одна позиция дважды — один заказ товара
+        dropped = self.order((c, 1), payment="click")
+        dropped.delete()
+
+        day = timezone.localdate()
+        self.assertEqual(
+            DailyProductSales.objects.values_list("orders", "units", "revenue").get(day=day, product_id=a.id),
+            (3, 5, 5 * a.price),
+        )
+        self.assertEqual(
+            DailyCategorySales.objects.values_list("orders", "revenue").get(day=day, category_id=body.id),
+            (1, 3 * c.price),
+        )
+        self.assertEqual(
+            DailyPaymentSales.objects.values_list("orders", flat=True).get(day=day, payment_method="click"),
+            0,
+        )
+
+        incremental = self.snapshot()
+        rollups.rebuild(workers=1, chunk_size=2)
+        rebuilt = self.snapshot()
+        # после пересборки пустых (вычтенных) строк нет
+        incremental["DailyPaymentSales"] = [r for r in incremental["DailyPaymentSales"] if r[2]]
+        incremental["DailyProductSales"] = [r for r in incremental["DailyProductSales"] if r[2]]
+        self.assertEqual(incremental, rebuilt)
+
+
+class OrderExportTests(TestCase):
+
+    def setUp(self):
+        _, self.products = seed_catalog(categories=1, products_per_category=3)
+        self.user = User.objects.create_user("buyer", password="pass")
+        self.orders = seed_orders(self.products, [self.user], count=4)
+        # вчерашний заказ — вне периода «сегодня»
+        Order.objects.filter(pk=self.orders[0].pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=1)
+        )
+
+    def test_command_jsonl_period(self):
+        out = io.StringIO()
+        today = timezone.localdate().isoformat()
+        call_command("export_orders", "--format", "jsonl", "--since", today, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            {row["order_id"] for row in rows}, {o.pk for o in self.orders[1:]}
+        )
+        # заказ без позиций — одна строка с пустым товаром
+        self.assertEqual(len(rows), sum(max(len(o.items), 1) for o in self.orders[1:]))
+        row = rows[0]
+        self.assertEqual(row["line_total"], row["price"] * row["quantity"])
+
+    def test_admin_action_streams_csv(self):
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin_user)
+        response = self.client.post("/admin/main/order/", {
+            "action": "export_csv",
+            "_selected_action": [self.orders[1].pk, self.orders[2].pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        lines = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual(lines[0][0], "order_id")
+        self.assertEqual(len(lines) - 1, len(self.orders[1].items) + len(self.orders[2].items))
+        self.assertEqual(lines[1][3], "buyer")
+
+
+class ProductFeedTests(TestCase):
+
+    def setUp(self):
+        _, self.products = seed_catalog(categories=2, products_per_category=3)
+        self.feed_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.feed_dir.cleanup)
+        settings_override = self.settings(FEED_DIR=pathlib.Path(self.feed_dir.name), FEED_BASE_URL="https://shop.test")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def export(self, *args):
+        out = io.StringIO()
+        call_command("export_feeds", *args, stdout=out)
+        return out.getvalue()
+
+    def test_export_skips_unchanged_catalog(self):
+        self.assertNotIn("пропуск", self.export())
+        self.assertEqual(len(list(pathlib.Path(self.feed_dir.name).glob("*.gz"))), 9)
+        self.assertEqual(self.export("--lang", "en").count("пропуск"), 3)
+
+        self.products[1].price = 1
+        self.products[1].save()
+        self.assertNotIn("пропуск", self.export("--lang", "en", "--format", "xml"))
+
+        with gzip.open(feeds.feed_path("en", "xml"), "rt", encoding="utf-8") as fh:
+            root = ElementTree.parse(fh).getroot()
+        offers = {int(o.get("id")): o for o in root.iter("offer")}
+        self.assertEqual(set(offers), {p.pk for p in self.products if p.available})
+        offer = offers[self.products[1].pk]
+        self.assertEqual(offer.findtext("price"), "1")
+        self.assertEqual(offer.findtext("description"), "Full")
+        self.assertTrue(offer.findtext("url").startswith("https://shop.test/products/"))
+
+    def test_view_streams_or_serves_pregenerated(self):
+        response = self.client.get("/api/feeds/uz.jsonl")
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[0]["description"], "To'liq")
+
+        self.export("--lang", "uz", "--format", "jsonl")
+        response = self.client.get("/api/feeds/uz.jsonl", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()[0],
+            json.dumps(rows[0], ensure_ascii=False),
+        )
+        self.assertEqual(self.client.get("/api/feeds/de.xml").status_code, 404)
+
+
+class BrandTests(PerfTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog(categories=2, products_per_category=6)
+
+    def test_brand_list_and_filter(self):
+        response = self.check("brand-list", 1, "get", "/api/brands/")
+        brands = {b["slug"]: b for b in response.json()}
+        self.assertEqual(set(brands), {"perioe", "elastine", "on-the-body"})
+        self.assertEqual(
+            brands["perioe"]["product_count"],
+            Product.objects.filter(brand="Perioe", available=True).count(),
+        )
+        self.assertEqual(self.client.get("/api/brands/on-the-body/").json()["name"], "On The Body")
+
+        expected = [p.pk for p in self.products if p.brand == "Elastine" and p.available]
+        for query in ("brand=elastine", "brand=ELASTINE ", f"brand_id={brands['elastine']['id']}"):
+            with self.subTest(query=query):
+                response = self.check("product-list-brand", 1, "get", f"/api/products/?{query}")
+                self.assertEqual([p["id"] for p in response.json()], expected)
+
+    def test_save_links_brand_and_counts(self):
+        product = self.products[1]
+        product.brand = "  PERIOE "
+        product.save()
+        product.refresh_from_db()
+        self.assertEqual((product.brand, product.brand_ref.slug), ("Perioe", "perioe"))
+
+        product.brand = "Missha"
+        product.save()
+        self.assertEqual(Brand.objects.get(slug="missha").product_count, 1)
+        self.assertEqual(
+            Brand.objects.get(slug="perioe").product_count,
+            Product.objects.filter(brand_ref__slug="perioe", available=True).count(),
+        )
+
+    def test_punctuation_only_names_keep_separate_brands(self):
+        first, second = Brand.for_name("!!!"), Brand.for_name("&")
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertTrue(first.slug and second.slug)
+        # ключ по-прежнему не зависит от регистра и пробелов
+        self.assertEqual(Brand.for_name(" !!! ").pk, first.pk)
+        self.assertEqual(Brand.for_name("Sulwhasoo").slug, "sulwhasoo")
+
+    def test_migration_deduplicates_variants(self):
+        migration = importlib.import_module("main.migrations.0044_brands")
+        ids = [p.pk for p in self.products]
+        # как было до справочника: свободный текст в нескольких написаниях
+        Product.objects.update(brand_ref=None)
+        Brand.objects.all().delete()
+        Product.objects.filter(pk__in=ids[:3]).update(brand="PERIOE")
+        Product.objects.filter(pk__in=ids[3:5]).update(brand="perioe ")
+        Product.objects.filter(pk__in=ids[5:]).update(brand="Elastine")
+
+        migration.deduplicate_brands(django_apps, None)
+
+        self.assertEqual(dict(Brand.objects.values_list("slug", "name")), {"perioe": "PERIOE", "elastine": "Elastine"})
+        self.assertEqual(Product.objects.filter(brand="PERIOE", brand_ref__slug="perioe").count(), 5)
+        self.assertFalse(Product.objects.filter(brand_ref=None).exists())
+        self.assertEqual(
+            Brand.objects.get(slug="elastine").product_count,
+            Product.objects.filter(pk__in=ids[5:], available=True).count(),
+        )
+
+
+class CatalogIndexTests(PerfTestCase):
+    """CATALOG_INDEX: /api/products/ из памяти отвечает так же, как через базу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog()
+
+    def setUp(self):
+        super().setUp()
+        catalog_index.reset()
+        self.addCleanup(catalog_index.reset)
+
+    def fetch(self, url, indexed):
+        with self.settings(CATALOG_INDEX=indexed):
+            response = self.client.get(url, HTTP_ACCEPT_LANGUAGE="uz")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_database(self):
+        slug = self.categories[1].slug
+        for query in (
+            "", "?ordering=-price", "?ordering=title", "?brand=Perioe&ordering=-id",
+            f"?category__slug={slug}&brand__icontains=el", "?ordering=-price,title",
+            f"?category__slug={slug}&ordering=price", "?category__slug=missing",
+            "?ordering=unknown", "?price_min=12000&price_max=16000&ordering=-price",
+            f"?category={slug}&price_max=14500", f"?category={slug}&category__slug=other",
+            "?price_min=11500.5&brand=Elastine&ordering=title", "?price_max=1",
+            "?brand=on-the-body", "?brand=ELASTINE&brand__icontains=ast",
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.fetch(f"/api/products/{query}", True),
+                    self.fetch(f"/api/products/{query}", False),
+                )
+
+    def test_bad_price_falls_back_to_filter_validation(self):
+        with self.settings(CATALOG_INDEX=True):
+            self.assertEqual(self.client.get("/api/products/?price_min=abc").status_code, 400)
+
+    def test_warm_index_skips_database(self):
+        with self.settings(CATALOG_INDEX=True):
+            self.client.get("/api/products/?ordering=price")
+            response = self.check("product-list-index", 0, "get", "/api/products/?ordering=price")
+        prices = [p["price"] for p in response.json()]
+        self.assertEqual(prices, sorted(prices))
+
+    def test_rebuilt_after_catalog_change(self):
+        self.fetch("/api/products/", True)
+        product = self.products[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.available = False
+            product.save()
+        ids = [p["id"] for p in self.fetch("/api/products/", True)]
+        self.assertNotIn(product.pk, ids)
+
+
+class AutocompleteTests(PerfTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Уход")
+        cls.products = [
+            Product.objects.create(title=title, brand=brand, price=price, category=category)
+            for title, brand, price in (
+                ("Perioe Toothpaste Breath Care", "Perioe", 30_000),
+                ("Elastine Perfume Shampoo", "Elastine", 90_000),
+                ("Sulwhasoo First Care Serum", "Sulwhasoo", 250_000),
+                ("Mise en scène Hair Serum", "Mise en scène", 70_000),
+            )
+        ]
+
+    def setUp(self):
+        super().setUp()
+        autocomplete.reset()
+        self.addCleanup(autocomplete.reset)
+
+    def titles(self, query):
+        response = self.client.get("/api/products/autocomplete/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["title"] for item in response.json()]
+
+    def test_normalize_across_scripts(self):
+        self.assertEqual(autocomplete.normalize("Периое"), autocomplete.normalize("PERIOE"))
+        self.assertEqual(autocomplete.normalize("Sulvhasu"), autocomplete.normalize("Сулвхасу"))
+        self.assertEqual(autocomplete.normalize("o‘g‘it"), autocomplete.normalize("ўғит"))
+
+    def test_prefix_translit_and_typos(self):
+        self.assertEqual(self.titles("Периое"), ["Perioe Toothpaste Breath Care"])
+        self.assertEqual(self.titles("эласт"), ["Elastine Perfume Shampoo"])
+        self.assertEqual(self.titles("sulwhasoo serum"), ["Sulwhasoo First Care Serum"])
+        self.assertEqual(self.titles("elastnie"), ["Elastine Perfume Shampoo"])    # опечатка
+        self.assertEqual(self.titles("scene"), ["Mise en scène Hair Serum"])        # диакритика
+        # бренд совпал — выше, чем слово из названия
+        self.assertEqual(self.titles("seru")[0], "Sulwhasoo First Care Serum")
+        self.assertEqual(self.titles("care sulw"), ["Sulwhasoo First Care Serum"])
+        self.assertEqual(self.titles("qwertyuiop"), [])
+        self.assertEqual(self.titles(""), [])
+
+    def test_incremental_updates(self):
+        self.titles("perioe")
+        index = autocomplete.get_index()
+        category = self.products[0].category
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(title="Perioe Pumping Herb", brand="Perioe", price=35_000, category=category)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].available = False
+            self.products[1].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[2].delete()
+
+        self.assertEqual(len(self.titles("периое")), 2)
+        self.assertEqual(self.titles("elastine"), [])
+        self.assertEqual(self.titles("sulwhasoo"), [])
+        # всё учтено по сигналам — индекс тот же, без пересборки
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertNotIn(autocomplete.normalize("Sulwhasoo")[0], index.word_products)
+
+    def test_foreign_bump_forces_rebuild(self):
+        self.titles("perioe")
+        index = autocomplete.get_index()
+        CatalogVersion.bump()   # правка другого воркера — в этом индексе её нет
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].title = "Elastine Kiss Shampoo"
+            self.products[1].save()
+        self.assertEqual(index.version, CatalogVersion.current() - 2)
+        self.assertEqual(self.titles("kiss"), ["Elastine Kiss Shampoo"])
+        self.assertIsNot(autocomplete.get_index(), index)
+
+    def test_keystroke_without_queries(self):
+        self.titles("p")
+        response = self.check("product-autocomplete", 0, "get", "/api/products/autocomplete/?q=perio")
+        self.assertEqual(len(response.json()), 1)
+
+
+class ProductChangesTests(PerfTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog(categories=2, products_per_category=6)
+
+    def sync(self, token=None):
+        with self.settings(PRODUCT_CHANGES_OVERLAP=0):
+            url = "/api/products/changes/" + (f"?since={token}" if token else "")
+            return self.check("product-changes" if token else "product-changes-initial", 3, "get", url)
+
+    def test_delta_after_edits(self):
+        first = self.sync().json()
+        self.assertEqual(
+            sorted(p["id"] for p in first["updated"]),
+            sorted(p.pk for p in self.products if p.available),
+        )
+        self.assertEqual(first["deleted"], [])
+
+        edited, hidden, removed, sold = self.products[1], self.products[2], self.products[3], self.products[4]
+        edited.price = 1
+        edited.save()
+        hidden.available = False
+        hidden.save()
+        removed_id = removed.pk
+        removed.delete()
+        Product.objects.filter(pk=sold.pk).update(stock=1)
+        with transaction.atomic():
+            stock.reserve({sold.pk: 1})
+        created = Product.objects.create(title="Новинка", price=5, brand="Perioe", category=self.categories[0])
+
+        delta = self.sync(first["token"]).json()
+        self.assertEqual(sorted(p["id"] for p in delta["updated"]), sorted([edited.pk, created.pk]))
+        self.assertEqual(delta["deleted"], sorted([hidden.pk, removed_id, sold.pk]))
+        again = self.sync(delta["token"]).json()
+        self.assertEqual((again["updated"], again["deleted"]), ([], []))
+        self.assertGreaterEqual(sync.parse_token(again["token"]), sync.parse_token(delta["token"]))
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/products/changes/?since=@@").status_code, 400)
+        old = sync.make_token(timezone.now() - datetime.timedelta(days=365))
+        response = self.client.get(f"/api/products/changes/?since={old}")
+        self.assertEqual((response.status_code, response.json()["reset"]), (410, True))
+
+
+@override_settings(ROOT_URLCONF="KoreanCosmetics.urls_asgi", RESPONSE_CACHE=False)
+class AsyncViewsTests(TestCase):
+    """ASGI-маршруты (main/async_views.py) отвечают так же, как синхронные вьюсеты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog(categories=2, products_per_category=6)
+        cls.news = seed_news(3)
+        cls.user = User.objects.create_user("buyer", password="pass")
+        seed_orders(cls.products, [cls.user], count=4)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalog_index.reset()
+        self.addCleanup(catalog_index.reset)
+
+    def fetch_async(self, url, **kwargs):
+        return async_to_sync(self.async_client.get)(url, **kwargs)
+
+    def fetch_sync(self, url, **kwargs):
+        with self.settings(ROOT_URLCONF="KoreanCosmetics.urls"):
+            return self.client.get(url, **kwargs)
+
+    def assertSameResponse(self, url, lang="uz"):
+        headers = {"accept-language": lang}
+        expected = self.fetch_sync(url, headers=headers)
+        response = self.fetch_async(url, headers=headers)
+        # DRF Response — значит, ответил синхронный вьюсет, а не async-путь
+        self.assertNotIsInstance(response, Response)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        for header in ("Content-Type", "Allow", "Vary"):
+            self.assertEqual(response.get(header), expected.get(header), header)
+        return response
+
+    def test_matches_sync_views(self):
+        slug = self.categories[1].slug
+        hidden = next(p for p in self.products if not p.available)
+        for url in (
+            "/api/products/", "/api/products/?ordering=-price", f"/api/products/?category={slug}",
+            "/api/products/?brand=perioe&price_min=12000", "/api/products/?price_min=abc",
+            f"/api/products/{self.products[1].pk}/", f"/api/products/{hidden.pk}/",
+            "/api/categories/", f"/api/categories/{slug}/", "/api/categories/missing/",
+            "/api/news/", f"/api/news/{self.news[1].pk}/",
+        ):
+            for lang in ("ru", "en"):
+                with self.subTest(url=url, lang=lang):
+                    self.assertSameResponse(url, lang)
+
+    def test_catalog_index(self):
+        with self.settings(CATALOG_INDEX=True):
+            for url in ("/api/products/?ordering=price", "/api/products/?brand=Elastine"):
+                with self.subTest(url=url):
+                    self.assertSameResponse(url)
+
+    def test_other_routes_and_formats_fall_back(self):
+        response = self.fetch_async("/api/products/", headers={"accept": "text/html"})
+        self.assertIsInstance(response, Response)
+        self.assertEqual(response.status_code, 200)
+        response = self.fetch_async("/api/products/autocomplete/?q=tovar")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(resolve("/api/products/", urlconf="KoreanCosmetics.urls_asgi").func,
+                         async_views.product_list)
+
+    def test_notifications(self):
+        self.assertEqual(self.fetch_async("/api/notifications/").status_code, 302)
+        self.async_client.force_login(self.user)
+        self.client.force_login(self.user)
+        response = self.fetch_async("/api/notifications/")
+        self.assertEqual(response.json(), self.fetch_sync("/api/notifications/").json())
+        self.assertEqual(len(response.json()), Order.objects.filter(user=self.user).count())
+
+    def test_csrf_still_checked_in_async_chain(self):
+        # CsrfViewMiddleware.process_view под ASGI идёт в event loop, но проверяет так же
+        client = AsyncClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        notification = Notification.objects.filter(order__user=self.user).first()
+        url = f"/api/notifications/{notification.pk}/read/"
+        self.assertEqual(async_to_sync(client.post)(url).status_code, 403)
+        token = async_to_sync(client.get)("/api/csrf/").cookies["csrftoken"].value
+        response = async_to_sync(client.post)(url, headers={"x-csrftoken": token})
+        self.assertEqual(response.status_code, 200)
+
+    def test_async_middleware_chain_measures_requests(self):
+        response = self.fetch_async("/api/categories/")
+        # метрики в contextvar доходят и до сериализатора внутри async-вьюхи
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+
+
+class StatelessMiddlewareTests(TestCase):
+    """STATELESS_PATHS: каталог без сессии и пользователя, остальное — как раньше."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog(categories=1, products_per_category=3)
+        cls.user = User.objects.create_user("buyer", password="pass")
+
+    def test_catalog_get_skips_session_and_user(self):
+        self.client.force_login(self.user)
+        for url in ("/api/products/", "/api/categories/", f"/api/products/{self.products[1].pk}/"):
+            with self.subTest(url=url):
+                # только сам запрос каталога: ни django_session, ни auth_user
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(any("django_session" in q["sql"] or "auth_user" in q["sql"]
+                                     for q in ctx.captured_queries))
+                self.assertNotIn("Cookie", response.get("Vary", ""))
+                self.assertNotIn("sessionid", response.cookies)
+
+    def test_stateful_endpoints_keep_session_and_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(client.get("/api/notifications/").status_code, 200)
+        # DRF сверяет CSRF у залогиненного пользователя — значит, сессия и user на месте
+        payload = {"name": "Мадина", "surname": "Н", "email": "", "phone": "+998900000000"}
+        self.assertEqual(client.post("/api/profile/", payload).status_code, 403)
+        token = client.get("/api/csrf/").cookies["csrftoken"].value
+        response = client.post("/api/profile/", payload, headers={"x-csrftoken": token})
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        # POST на путь каталога — не stateless
+        self.assertEqual(client.post("/api/products/batch/", {"ids": "1"}).status_code, 403)
+
+    def test_cors_runs_before_common_and_csrf(self):
+        origin = {"origin": "https://shop.example"}
+        response = self.client.options(
+            "/api/orders/", headers={**origin, "access-control-request-method": "POST"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Access-Control-Allow-Origin"], "https://shop.example")
+        # редирект APPEND_SLASH от CommonMiddleware тоже с CORS-заголовками —
+        # иначе браузер покажет фронту CORS-ошибку вместо редиректа
+        response = self.client.get("/api/products", headers=origin)
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Access-Control-Allow-Origin"], "https://shop.example")
+
+
+class ResponseCacheTests(TestCase):
+    """Общий кэш ответов STATELESS_PATHS: ключ по нормализованному языку, заголовки для прокси."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog(categories=1, products_per_category=3)
+        cls.news = seed_news(2)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get(self, url, accept_language=None):
+        headers = {"accept-language": accept_language} if accept_language else {}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_negotiated_language_is_normalized(self):
+        first, _ = self.get("/api/news/", "ru")
+        # другой сырой Accept-Language, тот же язык — та же запись, без SQL
+        second, queries = self.get("/api/news/", "ru-RU,ru;q=0.9,en;q=0.8")
+        self.assertEqual(queries, 0)
+        self.assertEqual(second.content, first.content)
+        english, queries = self.get("/api/news/", "en")
+        self.assertGreater(queries, 0)
+        self.assertEqual(english["Content-Language"], "en")
+
+    def test_proxy_headers(self):
+        response, _ = self.get("/api/categories/?b=2&a=1", "uz")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=60", response["Cache-Control"])
+        self.assertIn("Accept-Language", response["Vary"])
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual(response["Content-Location"], "/api/categories/?a=1&b=2&lang=uz")
+
+    def test_lang_param_is_canonical(self):
+        negotiated, _ = self.get("/api/news/", "uz")
+        canonical, queries = self.get("/api/news/?lang=uz", "en")
+        # ?lang= сильнее заголовка и делит запись с согласованным uz
+        self.assertEqual(queries, 0)
+        self.assertEqual(canonical.content, negotiated.content)
+        self.assertEqual(canonical["Content-Language"], "uz")
+        self.assertNotIn("Accept-Language", canonical.get("Vary", ""))
+        self.assertFalse(canonical.has_header("Content-Location"))
+        # индекс каталога ?lang= не сбивает на запрос в базу
+        response, _ = self.get("/api/products/?lang=en&ordering=price")
+        self.assertEqual(len(response.json()), 2)  # products[0] не в наличии
+
+    def test_catalog_change_invalidates(self):
+        product = self.products[1]
+        url = f"/api/products/{product.pk}/"
+        self.get(url, "ru")
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = 12345
+            product.save()
+        response, queries = self.get(url, "ru")
+        self.assertGreater(queries, 0)
+        self.assertEqual(float(response.json()["price"]), 12345)
+
+    @override_settings(ROOT_URLCONF="KoreanCosmetics.urls_asgi")
+    def test_async_chain(self):
+        get = async_to_sync(AsyncClient().get)
+        first = get("/api/categories/", headers={"accept-language": "uz-UZ"})
+        second = get("/api/categories/", headers={"accept-language": "uz"})
+        self.assertEqual(second.content, first.content)
+        self.assertIn('"0 queries"', second["Server-Timing"])
+        self.assertEqual(second["Content-Location"], "/api/categories/?lang=uz")
+
+    def test_only_stateless_json_is_cached(self):
+        self.get("/api/products/?format=api", "ru")
+        _, queries = self.get("/api/products/?format=api", "ru")
+        self.assertGreater(queries, 0)
+        response = self.client.head("/api/categories/")
+        self.assertFalse(response.has_header("Cache-Control") and response.content)
+        user = User.objects.create_user("buyer", password="pass")
+        self.client.force_login(user)
+        response, _ = self.get("/api/notifications/")
+        self.assertFalse(response.has_header("Cache-Control"))
+
+
+class StockReservationTests(TestCase):
+
+    def setUp(self):
+        # первый товар из seed_catalog снят с продажи — берём следующие
+        _, (_, self.serum, self.cream) = seed_catalog(categories=1, products_per_category=3)
+        Product.objects.filter(pk=self.serum.pk).update(stock=3)
+
+    def post_order(self, *lines):
+        return self.client.post("/api/orders/", json.dumps({
+            "items": [{"id": p.pk, "title": p.title, "price": p.price, "quantity": q} for p, q in lines],
+            "payment_method": "cash",
+        }), content_type="application/json")
+
+    def test_reserve_and_sell_out(self):
+        self.assertEqual(self.post_order((self.serum, 2), (self.cream, 5)).status_code, 201)
+        self.serum.refresh_from_db()
+        self.assertEqual((self.serum.stock, self.serum.available), (1, True))
+        category = self.serum.category
+        count_before = Category.objects.get(pk=category.pk).product_count
+
+        # нехватка одной позиции откатывает весь заказ
+        response = self.post_order((self.cream, 1), (self.serum, 2))
+        self.assertEqual((response.status_code, response.json()["products"]), (409, [self.serum.pk]))
+        self.assertEqual(Order.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post_order((self.serum, 1)).status_code, 201)
+        self.serum.refresh_from_db()
+        self.assertEqual((self.serum.stock, self.serum.available), (0, False))
+        self.assertEqual(Category.objects.get(pk=category.pk).product_count, count_before - 1)
+        self.assertEqual(self.post_order((self.serum, 1)).status_code, 409)
+
+        self.cream.refresh_from_db()
+        self.assertIsNone(self.cream.stock)     # без учёта остатка — без ограничений
+        self.assertEqual(self.post_order((self.cream, 0)).status_code, 400)
+
+    def test_admin_save_with_zero_stock_hides_product(self):
+        self.cream.stock = 0
+        self.cream.save()
+        self.assertFalse(Product.objects.get(pk=self.cream.pk).available)
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Много потоков покупают один товар — продаётся ровно остаток, без Python-блокировок."""
+
+    THREADS = 24
+    STOCK = 7
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # общая in-memory база тестов на конкурентной записи сразу отвечает
+        # "table is locked" — здесь нужен файл в боевом режиме SQLITE_CONCURRENT
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        memory_settings, memory_connection = connections.settings["default"], connections["default"]
+        connections.settings["default"] = {
+            **memory_settings,
+            "NAME": pathlib.Path(tmp.name) / "checkout.sqlite3",
+            "OPTIONS": {**memory_settings["OPTIONS"], **settings.SQLITE_CONCURRENT_OPTIONS},
+        }
+        # потоки покупателей откроют свои соединения уже по новым настройкам
+        connections["default"] = connections.create_connection("default")
+
+        def restore():
+            connections["default"].close()
+            connections.settings["default"] = memory_settings
+            connections["default"] = memory_connection
+
+        cls.addClassCleanup(restore)
+        call_command("migrate", verbosity=0, interactive=False)
+
+    def test_no_oversell(self):
+        self.assertEqual(connection.vendor, "sqlite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+        category = Category.objects.create(name="Сыворотки")
+        product = Product.objects.create(title="Serum", price=100, category=category, stock=self.STOCK)
+        payload = json.dumps({
+            "items": [{"id": product.pk, "title": product.title, "price": 100, "quantity": 1}],
+            "payment_method": "cash",
+        })
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def buyer():
+            try:
+                client = Client()
+                barrier.wait()
+                statuses.append(client.post("/api/orders/", payload, content_type="application/json").status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buyer) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] * self.STOCK + [409] * (self.THREADS - self.STOCK))
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.available), (0, False))
+        self.assertEqual(Order.objects.count(), self.STOCK)
+        self.assertEqual(DailyProductSales.objects.get(product_id=product.pk).units, self.STOCK)
+
+
+class AdminPerformanceTests(PerfTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories, cls.products = seed_catalog()
+        seed_news()
+        users = []
+        for i in range(4):
+            user = User.objects.create_user(f"user{i}", password="pass")
+            Profile.objects.create(user=user, name=f"Имя {i}", address=f"Адрес {i}")
+            users.append(user)
+        Profile.objects.create(name="Аноним")
+        cls.orders = seed_orders(cls.products, users, count=20)
+        Notification.objects.filter(order__in=cls.orders[::2]).update(is_read=True)
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    # сессия + пользователь + count + выборка (+ фильтры/выпадающие списки)
+    def test_category_changelist(self):
+        self.check("admin-category", 5, "get", "/admin/main/category/")
+
+    def test_product_changelist(self):
+        # сессия + пользователь + count + строки с категорией + категории фильтра
+        # + версия каталога и бренды (дальше — из кэша)
+        response = self.check("admin-product", 7, "get", "/admin/main/product/")
+        self.assertContains(response, "?brand=Elastine")
+        self.assertMaxQueries(5, self.client.get, "/admin/main/product/")
+
+    def test_product_changelist_brand_filter(self):
+        response = self.client.get("/admin/main/product/?brand=Perioe")
+        expected = Product.objects.filter(brand="Perioe").count()
+        self.assertEqual(response.context["cl"].result_count, expected)
+
+    def test_product_changelist_estimated_count(self):
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=10):
+            cl = self.client.get("/admin/main/product/").context["cl"]
+            pks = Product.objects.aggregate(low=Min("pk"), high=Max("pk"))
+            self.assertEqual(cl.result_count, pks["high"] - pks["low"] + 1)
+            # с фильтром оценки нет — счёт останавливается на пороге
+            cl = self.client.get("/admin/main/product/?available__exact=1").context["cl"]
+            self.assertEqual(cl.result_count, 10)
+
+    def test_product_thumbnail(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            buffer = io.BytesIO()
+            Image.new("RGB", (800, 600), "pink").save(buffer, "PNG")
+            product = self.products[0]
+            product.img = SimpleUploadedFile("big.png", buffer.getvalue())
+            product.save()
+            product.refresh_from_db()
+            self.assertTrue(product.img_thumb.name.endswith(".webp"))
+            with Image.open(product.img_thumb.path) as thumb:
+                self.assertEqual(max(thumb.size), 120)
+
+            response = self.client.get("/admin/main/product/")
+            self.assertContains(response, product.img_thumb.url)
+            self.assertNotContains(response, f'src="{product.img.url}"')
+
+    def test_profile_changelist(self):
+        self.check("admin-profile", 5, "get", "/admin/main/profile/")
+
+    def test_order_changelist(self):
+        response = self.check("admin-order", 5, "get", "/admin/main/order/")
+        self.assertContains(response, "Имя 1")
+
+    def test_order_search(self):
+        # имя из профиля, регистр не важен; JSON items не сканируется
+        cl = self.check("admin-order-search", 5, "get", "/admin/main/order/?q=имя+1+user1").context["cl"]
+        user1 = User.objects.get(username="user1")
+        self.assertEqual({o.pk for o in cl.result_list}, {o.pk for o in self.orders if o.user_id == user1.pk})
+
+        def found(term):
+            return {o.pk for o in self.client.get("/admin/main/order/", {"q": term}).context["cl"].result_list}
+
+        title = self.orders[0].items[0]["title"]
+        self.assertIn(self.orders[0].pk, found(title))
+        self.assertEqual(found("998900000000"), {o.pk for o in self.orders})   # телефон без «+»
+        # кавычки и операторы FTS5 из строки поиска — просто слова, не синтаксис
+        self.assertEqual(found('Клиент 7" OR *'), set())
+        self.assertEqual(len(found('"')), len(self.orders))
+
+        # правка профиля видна в поиске по старым заказам
+        profile = Profile.objects.get(name="Имя 2")
+        profile.surname = "Ким"
+        profile.save()
+        self.assertEqual(found("Ким"), {o.pk for o in self.orders if o.user_id == profile.user_id})
+
+        self.orders[3].delete()
+        self.assertNotIn(self.orders[3].pk, found("Клиент 3"))
+
+    def test_order_change_form(self):
+        order = self.orders[1]
+        self.check("admin-order-change", 9, "get", f"/admin/main/order/{order.pk}/change/")
+
+    def test_news_changelist(self):
+        self.check("admin-news", 5, "get", "/admin/main/news/")
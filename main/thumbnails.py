@@ -0,0 +1,46 @@
+# main/thumbnails.py
+"""
+Маленькие превью товаров для админки. Генерируются один раз (при сохранении
+товара или командой generate_thumbnails) и лежат рядом с оригиналами:
+products/product1.png → thumbs/120/products/product1.webp.
+Путь сохраняется в Product.img_thumb, так что список в админке не трогает
+файловую систему.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+
+ADMIN_THUMB_SIZE = 120    # px по большей стороне; в списке показываем 60px (retina)
+
+
+def thumbnail_name(name, size=ADMIN_THUMB_SIZE):
+    stem, _ = posixpath.splitext(name)
+    return posixpath.join("thumbs", str(size), f"{stem}.webp")
+
+
+def make_thumbnail(field_file, size=ADMIN_THUMB_SIZE):
+    """
+    Уменьшенная копия картинки в webp (в том же storage); возвращает имя
+    файла или None, если оригинала нет/он не читается.
+    """
+    # Pillow нужен только здесь — не тянем его при старте воркера
+    from PIL import Image, UnidentifiedImageError
+
+    if not field_file:
+        return None
+    storage = field_file.storage
+    target = thumbnail_name(field_file.name, size)
+    if storage.exists(target):
+        return target
+    try:
+        with storage.open(field_file.name, "rb") as src:
+            image = Image.open(src)
+            image.thumbnail((size, size))
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            out = io.BytesIO()
+            image.save(out, "WEBP", quality=80)
+    except (OSError, UnidentifiedImageError):
+        return None
+    return storage.save(target, ContentFile(out.getvalue()))
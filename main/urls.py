@@ -1,26 +1,34 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from django.views.decorators.csrf import ensure_csrf_cookie
-from django.http import JsonResponse
-from .views import csrf_cookie
+from .views import csrf_cookie, api_perf_stats, api_home, api_sales_daily, api_product_feed
 
 from .views import (
     CategoryViewSet,
+    BrandViewSet,
     ProductViewSet,
     ProfileViewSet,
     NewsViewSet,
     api_order_create,
+    api_notifications_list,
+    api_notification_mark_read,
 )
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'products',   ProductViewSet,   basename='product')
+router.register(r'brands',     BrandViewSet,     basename='brand')
 router.register(r'profile',    ProfileViewSet,   basename='profile')
 router.register(r'news',         NewsViewSet,          basename='news')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('home/', api_home, name='api_home'),
     path('orders/', api_order_create, name='api_order_create'),
-    path("csrf/", csrf_cookie)
+    path('notifications/', api_notifications_list, name='api_notifications_list'),
+    path('notifications/<int:pk>/read/', api_notification_mark_read, name='api_notification_mark_read'),
+    path("csrf/", csrf_cookie),
+    path("perf/", api_perf_stats, name="api_perf_stats"),
+    path("sales/daily/", api_sales_daily, name="api_sales_daily"),
+    path("feeds/<str:lang>.<str:fmt>", api_product_feed, name="api_product_feed"),
 
 ]
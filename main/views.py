@@ -1,14 +1,31 @@
-from rest_framework import viewsets, permissions, status, filters
-from .models import Product, Category, Profile, Order, Notification, News
-from .serializers import ProductSerializer, CategorySerializer, ProfileSerializer, NewsSerializer
+from rest_framework import viewsets, permissions, status
+from rest_framework.pagination import CursorPagination
+from .models import (
+    Brand, Product, Category, Profile, Order, Notification, News,
+    DailyCategorySales, DailyPaymentSales, DailyProductSales,
+)
+from .serializers import (
+    ProductSerializer, ProductCardSerializer, BrandSerializer, CategorySerializer, ProfileSerializer, NewsSerializer,
+)
+from . import autocomplete, catalog_index, feeds, perf, stock, sync
+from .caching import cached_catalog, catalog_version
+from .filters import ProductFilter, StableOrderingFilter
+from .i18n import request_language, localize_news, defer_product_texts
+from django.conf import settings
 from rest_framework.response import Response
+from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.exceptions import ValidationError
 from django.db import transaction
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 import json
-from django.http import JsonResponse
+import hashlib
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
+from django.db.models import Sum
+from django.utils import timezone
+import datetime
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 
 
@@ -19,30 +36,139 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'  # /api/categories/<slug>/
 
 
+class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+    """ /api/brands/ — со счётчиком товаров в наличии; /api/brands/<slug>/ """
+    queryset = Brand.objects.all()
+    serializer_class = BrandSerializer
+    lookup_field = 'slug'
+    lookup_value_regex = '[^/]+'
+
+
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     """
     /api/products/                         ― все доступные
     /api/products/?category=hair-care      ― по slug категории
-    /api/products/?brand=Perioe            ― по бренду
+    /api/products/?brand=perioe            ― по бренду (slug или название)
+    /api/products/?brand_id=3              ― по id бренда
+    /api/products/?price_min=1000&price_max=5000 ― по цене (включительно)
     /api/products/?ordering=price          ― сортировка (price / title)
     """
     serializer_class = ProductSerializer
-    queryset = Product.objects.filter(available=True)
+    # category нужен сериализатору (slug) — тянем одним JOIN, без N+1
+    queryset = Product.objects.filter(available=True).select_related('category')
 
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = {
-        'category__slug': ['exact'],
-        'brand': ['exact', 'icontains'],
-    }
+    filter_backends = [DjangoFilterBackend, StableOrderingFilter]
+    filterset_class = ProductFilter
     ordering_fields = ['id', 'price', 'title']
     ordering = ['id']
 
+    def get_queryset(self):
+        # полное описание нужно только на языке запроса — остальные не читаем
+        return defer_product_texts(super().get_queryset(), request_language(self.request))
+
     # обязательно передаём request в сериалайзер → полные URL картинок
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx['request'] = self.request
+        ctx['language'] = request_language(self.request)
         return ctx
 
+    def list(self, request, *args, **kwargs):
+        # CATALOG_INDEX: фильтры/сортировка по индексу в памяти (main/catalog_index.py);
+        # незнакомые ему параметры — обычным путём через базу
+        if not catalog_index.enabled() or not catalog_index.CatalogIndex.supports(request.query_params):
+            return super().list(request, *args, **kwargs)
+        index = catalog_index.get_index()
+        rows = index.select(request.query_params)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(index.render(page, request_language(request), request))
+        return Response(index.render(rows, request_language(request), request))
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def suggest(self, request):
+        """
+        /api/products/autocomplete/?q=периое&limit=10
+        Подсказки для строки поиска — по названию и бренду, без оглядки на
+        алфавит и с поправкой на опечатки; отвечает из памяти (main/autocomplete.py).
+        """
+        query = request.query_params.get('q', '').strip()
+        default = getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+        try:
+            limit = min(int(request.query_params.get('limit', default)), default * 5)
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        if not query or limit <= 0:
+            return Response([])
+        return Response(autocomplete.search(query, limit))
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        /api/products/changes/?since=<token>
+        Дельта для офлайн-копии каталога: {"token", "updated": [...], "deleted": [id, ...]}.
+        Без since — весь каталог и первый токен; токен старше срока хранения
+        удалений → 410, клиенту нужна полная синхронизация.
+        """
+        raw = request.query_params.get('since')
+        try:
+            since = sync.parse_token(raw) if raw else None
+        except sync.ExpiredToken:
+            return Response({'error': 'Токен устарел, нужна полная синхронизация', 'reset': True},
+                            status=status.HTTP_410_GONE)
+        except sync.InvalidToken:
+            raise ValidationError({'since': 'Неверный токен'})
+        updated, deleted, token = sync.changes(self.get_queryset(), since)
+        return Response({
+            'token': token,
+            'updated': self.get_serializer(updated, many=True).data,
+            'deleted': deleted,
+        })
+
+    @action(detail=False, methods=['get', 'post'], url_path='batch')
+    def batch(self, request):
+        """
+        /api/products/batch/?ids=1,2,3  или  POST {"ids": [1, 2, 3]}
+        Обновление корзины одним запросом: товары в порядке запроса,
+        отсутствующие — {"id", "status": "missing"}, снятые с продажи —
+        с "status": "unavailable".
+        """
+        if request.method == 'POST':
+            if not isinstance(request.data, dict):
+                raise ValidationError({'ids': 'Ожидается объект {"ids": [...]}'})
+            raw = request.data.get('ids')
+        else:
+            raw = request.query_params.get('ids', '')
+        if isinstance(raw, str):
+            raw = [part for part in raw.split(',') if part.strip()]
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in raw or []))
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'Ожидается список целых id'})
+        limit = getattr(settings, 'PRODUCT_BATCH_MAX', 200)
+        if len(ids) > limit:
+            raise ValidationError({'ids': f'Не больше {limit} id за запрос'})
+
+        def build():
+            found = defer_product_texts(Product.objects.select_related('category')).in_bulk(ids)
+            cards = ProductCardSerializer(
+                [found[pk] for pk in ids if pk in found], many=True,
+                context=self.get_serializer_context(),
+            ).data
+            by_id = {card['id']: card for card in cards}
+            items = []
+            for pk in ids:
+                card = by_id.get(pk)
+                if card is None:
+                    items.append({'id': pk, 'status': 'missing'})
+                else:
+                    items.append(dict(card, status='ok' if card['available'] else 'unavailable'))
+            return {'items': items}
+
+        key = hashlib.md5(','.join(map(str, ids)).encode()).hexdigest()
+        lang = request_language(request)
+        return Response(cached_catalog(('products-batch', lang, request.scheme, request.get_host(), key), build))
+
 
 class ProfileViewSet(viewsets.ModelViewSet):
     """
@@ -132,15 +258,26 @@ def api_order_create(request):
         customer_phone = customer_phone or getattr(prof, "phone", "")
         customer_address = customer_address or getattr(prof, "address", "")
 
-    order = Order.objects.create(
-        user=user,
-        items=items,
-        payment_method=payment_method,
-        customer_name=customer_name,
-        customer_surname=customer_surname,
-        customer_phone=customer_phone,
-        customer_address=customer_address
-    )
+    try:
+        quantities = stock.order_quantities(items)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return JsonResponse({"error": "items: ожидается список {id, quantity, …}"}, status=400)
+
+    # остатки и заказ — одна транзакция: не хватило хоть одной позиции → ничего не списано
+    try:
+        with transaction.atomic():
+            stock.reserve(quantities)
+            order = Order.objects.create(
+                user=user,
+                items=items,
+                payment_method=payment_method,
+                customer_name=customer_name,
+                customer_surname=customer_surname,
+                customer_phone=customer_phone,
+                customer_address=customer_address
+            )
+    except stock.OutOfStock as exc:
+        return JsonResponse({"error": "Нет в наличии", "products": exc.product_ids}, status=409)
 
     # не создаём здесь Notification — это делает сигнал post_save
     return JsonResponse({"id": order.id}, status=201)
@@ -152,16 +289,16 @@ def api_notifications_list(request):
     Отдаёт все уведомления по заказам данного пользователя.
     """
     qs = Notification.objects.filter(order__user=request.user)
-    data = [
-        {
-            "id": n.id,
-            "message": n.message,
-            "created_at": n.created_at.isoformat(),
-            "is_read": n.is_read,
-        }
-        for n in qs
-    ]
-    return JsonResponse(data, safe=False)
+    return JsonResponse([notification_data(n) for n in qs], safe=False)
+
+
+def notification_data(n):
+    return {
+        "id": n.id,
+        "message": n.message,
+        "created_at": n.created_at.isoformat(),
+        "is_read": n.is_read,
+    }
 
 
 @login_required
@@ -180,17 +317,179 @@ def api_notification_mark_read(request, pk):
     return JsonResponse({"status": "ok"})
 
 
+class NewsArchivePagination(CursorPagination):
+    """Keyset по (created_at, id): страница стоит одинаково и на сотой странице."""
+    ordering = ("-created_at", "-id")
+    page_size = getattr(settings, "NEWS_ARCHIVE_PAGE_SIZE", 20)
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
 class NewsViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API для новостей: GET /api/news/ и GET /api/news/{id}/
+    /api/news/featured/            ― главные новости для карусели (из кэша)
+    /api/news/archive/?cursor=...  ― все новости по дате, постранично
     """
     queryset = News.objects.order_by("-is_featured", "-created_at")
     serializer_class = NewsSerializer
 
+    def get_queryset(self):
+        return localize_news(super().get_queryset(), request_language(self.request))
+
+    @action(detail=False, methods=['get'])
+    def featured(self, request):
+        # News в catalog_changed — сохранение новости поднимает версию и сбрасывает ключ
+        lang = request_language(request)
+
+        def build():
+            news = localize_news(News.objects.filter(is_featured=True).order_by("-created_at"), lang)
+            data = NewsSerializer(news, many=True, context=self.get_serializer_context()).data
+            return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+        body = cached_catalog(("news-featured", lang, request.scheme, request.get_host()), build)
+        return HttpResponse(body, content_type="application/json")
+
+    @action(detail=False, methods=['get'], pagination_class=NewsArchivePagination)
+    def archive(self, request):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+@require_http_methods(["GET"])
+def api_home(request):
+    """
+    Главная одним запросом: категории со счётчиками, новости и подборки товаров.
+    Документ собирается из уже существующих сериализаторов и кэшируется
+    по языку, хосту (абсолютные URL картинок) и версии каталога.
+    """
+    lang = request_language(request)
+
+    def build():
+        context = {"request": request, "language": lang}
+        limit = getattr(settings, "HOME_PRODUCTS_LIMIT", 8)
+        products = defer_product_texts(
+            Product.objects.filter(available=True).select_related("category")
+        )
+        document = {
+            "catalog_version": catalog_version(),
+            "categories": CategorySerializer(
+                Category.objects.all(), many=True, context=context
+            ).data,
+            "news": NewsSerializer(
+                localize_news(News.objects.order_by("-is_featured", "-created_at"), lang)
+                [:getattr(settings, "HOME_NEWS_LIMIT", 5)],
+                many=True, context=context,
+            ).data,
+            "products": {
+                "new": ProductCardSerializer(
+                    products.order_by("-id")[:limit], many=True, context=context
+                ).data,
+                "cheapest": ProductCardSerializer(
+                    products.order_by("price", "id")[:limit], many=True, context=context
+                ).data,
+            },
+        }
+        # в кэше держим готовый JSON — попадание не тратит время на кодирование
+        return json.dumps(document, cls=DjangoJSONEncoder).encode()
+
+    body = cached_catalog(("home", lang, request.scheme, request.get_host()), build)
+    return HttpResponse(body, content_type="application/json")
+
+
+# ?by= → (таблица итогов, колонка-ключ)
+SALES_BREAKDOWNS = {
+    "payment_method": (DailyPaymentSales, "payment_method"),
+    "category": (DailyCategorySales, "category_id"),
+    "product": (DailyProductSales, "product_id"),
+}
+
+
+@require_http_methods(["GET"])
+def api_sales_daily(request):
+    """
+    Продажи по дням из таблиц-итогов (только для staff), заказы не читаются.
+    /api/sales/daily/?days=90                    ― итого за день
+    /api/sales/daily/?by=category                ― разбивка (payment_method / category / product)
+    /api/sales/daily/?by=product&key=42          ― один товар
+    Дни без продаж в ответ не попадают.
+    """
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+    try:
+        days = min(max(int(request.GET.get("days", 90)), 1), 366)
+    except ValueError:
+        return JsonResponse({"error": "days должно быть числом"}, status=400)
+    by = request.GET.get("by")
+    if by is not None and by not in SALES_BREAKDOWNS:
+        return JsonResponse({"error": f"by: одно из {', '.join(SALES_BREAKDOWNS)}"}, status=400)
+
+    key = (request.GET.get("key") or None) if by else None
+    if key is not None and by != "payment_method":
+        try:
+            key = int(key)
+        except ValueError:
+            return JsonResponse({"error": "key должно быть числом"}, status=400)
+
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    model, column = SALES_BREAKDOWNS[by or "payment_method"]
+    queryset = model.objects.filter(day__gte=since)
+    if key is not None:
+        queryset = queryset.filter(**{column: key})
+    group = ("day", column) if by else ("day",)
+    rows = (
+        queryset.order_by(*group).values(*group)
+        .annotate(orders=Sum("orders"), units=Sum("units"), revenue=Sum("revenue"))
+    )
+    data = []
+    for row in rows:
+        row["day"] = row["day"].isoformat()
+        if by:
+            row["key"] = row.pop(column)
+        data.append(row)
+    return JsonResponse({"since": since.isoformat(), "by": by, "rows": data})
+
+
+@require_http_methods(["GET"])
+def api_product_feed(request, lang, fmt):
+    """
+    /api/feeds/ru.xml, /api/feeds/en.csv, /api/feeds/uz.jsonl …
+    Если export_feeds уже собрал фид из текущей версии каталога — отдаём
+    готовый gzip как есть; иначе генерируем потоком, не держа каталог в памяти.
+    """
+    if lang not in feeds.LANGUAGE_CODES or fmt not in feeds.FEED_FORMATS:
+        return JsonResponse({"error": "Not found"}, status=404)
+    content_type = feeds.FEED_FORMATS[fmt]
+    base_url = getattr(settings, "FEED_BASE_URL", "") or f"{request.scheme}://{request.get_host()}"
+    path = feeds.feed_path(lang, fmt)
+    accepts_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    if accepts_gzip and feeds.is_current(path, base_url=base_url):
+        response = FileResponse(path.open("rb"), content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = StreamingHttpResponse(feeds.feed_chunks(lang, fmt, base_url), content_type=content_type)
+    response["Vary"] = "Accept-Encoding"
+    return response
+
 
 @ensure_csrf_cookie
 def csrf_cookie(request):
     return JsonResponse({'detail': 'CSRF cookie set'})
 
 
+@require_http_methods(["GET", "DELETE"])
+def api_perf_stats(request):
+    """
+    p50/p95/p99 по маршрутам из PerformanceMiddleware (только для staff).
+    DELETE — сбросить накопленные гистограммы.
+    """
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+    if request.method == "DELETE":
+        perf.registry.reset()
+        return JsonResponse({"status": "ok"})
+    return JsonResponse(perf.registry.snapshot())
+
+
 